@@ -0,0 +1,149 @@
+"""
+Compare the TCP and Unix-domain-socket transports of the TTS server.
+
+Starts tts_server.py on a spare port with --uds and TTS_DEBUG=1 (for the
+/debug/payload endpoint), then measures, for each transport:
+
+  - per-request overhead: GET /health latency, reusing one keep-alive
+    connection and opening a new connection per request
+  - large-payload transfer: time to download payloads sized like
+    spooled audio results
+
+Usage:
+  python bench_transport.py [--requests 1000] [--sizes 1,16,64] [--rounds 5]
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_server.py")
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket at *path*."""
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def _get(conn: http.client.HTTPConnection, path: str) -> bytes:
+    conn.request("GET", path)
+    resp = conn.getresponse()
+    body = resp.read()
+    if resp.status != 200:
+        raise RuntimeError(f"GET {path}: HTTP {resp.status}")
+    return body
+
+
+def _wait_ready(connect, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            sys.exit(f"[bench] server exited with code {proc.returncode}")
+        try:
+            conn = connect()
+            _get(conn, "/health")
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    sys.exit("[bench] server did not come up")
+
+
+def _latency(connect, n: int, reuse: bool) -> list[float]:
+    times = []
+    conn = connect() if reuse else None
+    for _ in range(n):
+        start = time.perf_counter()
+        c = conn or connect()
+        _get(c, "/health")
+        if not reuse:
+            c.close()
+        times.append(time.perf_counter() - start)
+    if conn:
+        conn.close()
+    return times
+
+
+def _transfer(connect, size: int, rounds: int) -> float:
+    """Best-of-*rounds* seconds to download *size* bytes on a warm connection."""
+    conn = connect()
+    _get(conn, "/debug/payload?bytes=0")
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        body = _get(conn, f"/debug/payload?bytes={size}")
+        best = min(best, time.perf_counter() - start)
+        assert len(body) == size
+    conn.close()
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TCP vs Unix socket transport benchmark")
+    parser.add_argument("--requests", type=int, default=1000, help="/health requests per mode")
+    parser.add_argument("--sizes", default="1,16,64", help="payload sizes in MB")
+    parser.add_argument("--rounds", type=int, default=5, help="downloads per payload size")
+    parser.add_argument("--port", type=int, default=9976)
+    args = parser.parse_args()
+
+    if not hasattr(socket, "AF_UNIX"):
+        sys.exit("[bench] Unix domain sockets are not supported on this platform")
+
+    uds = os.path.join(tempfile.mkdtemp(prefix="tts-bench-"), "tts.sock")
+    env = dict(os.environ, TTS_DEBUG="1")
+    proc = subprocess.Popen([sys.executable, SERVER, "--port", str(args.port), "--uds", uds],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    transports = {
+        "tcp": lambda: http.client.HTTPConnection("127.0.0.1", args.port, timeout=30),
+        "uds": lambda: UnixHTTPConnection(uds),
+    }
+    try:
+        for connect in transports.values():
+            _wait_ready(connect, proc)
+
+        print(f"GET /health x{args.requests}")
+        print(f"  {'transport':<10}{'connection':<12}{'p50 ms':>9}{'p95 ms':>9}{'req/s':>9}")
+        for name, connect in transports.items():
+            for reuse in (True, False):
+                _latency(connect, min(50, args.requests), reuse)  # warm up
+                times = sorted(_latency(connect, args.requests, reuse))
+                p50 = times[len(times) // 2] * 1000
+                p95 = times[int(len(times) * 0.95)] * 1000
+                rps = len(times) / sum(times)
+                mode = "keep-alive" if reuse else "per-request"
+                print(f"  {name:<10}{mode:<12}{p50:>9.3f}{p95:>9.3f}{rps:>9.0f}")
+
+        print(f"\nGET /debug/payload (best of {args.rounds})")
+        print(f"  {'MB':>6}{'tcp ms':>10}{'tcp MB/s':>10}{'uds ms':>10}{'uds MB/s':>10}")
+        for mb in (float(s) for s in args.sizes.split(",")):
+            size = int(mb * 1024 * 1024)
+            row = f"  {mb:>6g}"
+            for connect in transports.values():
+                secs = _transfer(connect, size, args.rounds)
+                row += f"{secs * 1000:>10.1f}{mb / secs:>10.0f}"
+            print(row)
+    finally:
+        proc.terminate()
+        proc.wait()
+        try:
+            os.unlink(uds)
+            os.rmdir(os.path.dirname(uds))
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
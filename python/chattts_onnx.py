@@ -0,0 +1,573 @@
+"""
+ONNX Runtime backend for ChatTTS (CPU).
+
+ChatTTS synthesizes in three stages: the GPT samples audio hidden states
+autoregressively, the DVAE decoder turns them into a mel spectrogram, and
+Vocos turns the mel spectrogram into a waveform.  This module exports all
+three networks to ONNX and runs them with ONNX Runtime's CPU execution
+provider.  Vocos's final inverse STFT is done in NumPy, since ONNX has no
+ISTFT operator.
+
+For the GPT only the transformer forward pass is exported, one generation
+step at a time with the KV cache passed in and out.  ChatTTS's sampling
+loop (embeddings, heads, logits processors, streaming) keeps running in
+Python around it.  TTS_ONNX_GPT=0 keeps the GPT on PyTorch.
+
+The server uses this backend when TTS_CHATTTS_BACKEND=onnx.  Exported models
+are cached in TTS_ONNX_DIR (default python/asset/onnx) and re-exported
+automatically when the checkpoint changes.
+
+Usage:
+  pip install onnx onnxruntime
+  python chattts_onnx.py export   # export now (otherwise done on first use)
+  python chattts_onnx.py verify   # compare output against the PyTorch path
+  python chattts_onnx.py bench    # load time and real-time factor, torch vs onnx
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+import types
+
+import numpy as np
+
+ONNX_DIR = os.environ.get("TTS_ONNX_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "asset", "onnx")
+# ONNX Runtime intra-op threads (0 = one per physical core)
+_THREADS = int(os.environ.get("TTS_ONNX_THREADS", "0"))
+# Run the GPT's forward pass on ONNX Runtime as well
+_GPT = os.environ.get("TTS_ONNX_GPT", "1") != "0"
+_OPSET = 17
+_SAMPLE_RATE = 24000
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def _graphs(chat):
+    """Export-friendly wrappers around chat.decoder and chat.vocos."""
+    import torch
+
+    class DecoderGraph(torch.nn.Module):
+        # DVAE.forward(mode="decode") without the VQ layer and in-place ops
+        def __init__(self, dvae):
+            super().__init__()
+            self.decoder = dvae.decoder
+            self.out_conv = dvae.out_conv
+            self.register_buffer("coef", dvae.coef.detach().clone())
+
+        def forward(self, hidden):
+            b, c, t = hidden.shape
+            x = hidden.reshape(b, 2, c // 2, t).permute(0, 2, 3, 1).flatten(2)
+            return self.out_conv(self.decoder(x)) * self.coef
+
+    class VocosSpectrum(torch.nn.Module):
+        # Vocos.decode() up to the complex spectrum fed to the ISTFT
+        def __init__(self, vocos):
+            super().__init__()
+            self.backbone = vocos.backbone
+            self.out = vocos.head.out
+
+        def forward(self, mel):
+            x = self.out(self.backbone(mel)).transpose(1, 2)
+            mag, phase = x.chunk(2, dim=1)
+            return torch.clip(torch.exp(mag), max=1e2), phase
+
+    return DecoderGraph(chat.decoder).eval(), VocosSpectrum(chat.vocos).eval()
+
+
+def _istft_config(chat) -> dict:
+    istft = chat.vocos.head.istft
+    config = {
+        "n_fft": istft.n_fft,
+        "hop_length": istft.hop_length,
+        "win_length": istft.win_length,
+        "padding": istft.padding,
+    }
+    if config["n_fft"] % config["hop_length"]:
+        raise ValueError(f"Unsupported Vocos ISTFT config: {config}")
+    return config
+
+
+def _weights_digest(chat) -> str:
+    """Fingerprint of the decoder and vocoder weights the export came from."""
+    digest = hashlib.sha1()
+    for name, module in (("decoder", chat.decoder), ("vocos", chat.vocos)):
+        for key, tensor in sorted(module.state_dict().items()):
+            digest.update(f"{name}.{key}{tuple(tensor.shape)}".encode())
+            digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return digest.hexdigest()
+
+
+def export(chat, out_dir: str = ONNX_DIR) -> dict:
+    """Export the decoder and vocoder of a loaded Chat to *out_dir*."""
+    import torch
+
+    os.makedirs(out_dir, exist_ok=True)
+    decoder, vocos = _graphs(chat)
+    channels = decoder.decoder.conv_in[0].in_channels * 2
+    n_mels = vocos.backbone.embed.in_channels
+
+    kwargs = {"opset_version": _OPSET, "do_constant_folding": True}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False  # dynamic frame axes via the tracing exporter
+
+    started = time.perf_counter()
+    with torch.no_grad():
+        torch.onnx.export(
+            decoder, (torch.randn(1, channels, 32),),
+            os.path.join(out_dir, "decoder.onnx"),
+            input_names=["hidden"], output_names=["mel"],
+            dynamic_axes={"hidden": {0: "batch", 2: "frames"},
+                          "mel": {0: "batch", 2: "frames"}},
+            **kwargs,
+        )
+        torch.onnx.export(
+            vocos, (torch.randn(1, n_mels, 32),),
+            os.path.join(out_dir, "vocos.onnx"),
+            input_names=["mel"], output_names=["magnitude", "phase"],
+            dynamic_axes={"mel": {0: "batch", 2: "frames"},
+                          "magnitude": {0: "batch", 2: "frames"},
+                          "phase": {0: "batch", 2: "frames"}},
+            **kwargs,
+        )
+    manifest = {
+        "digest": _weights_digest(chat),
+        "opset": _OPSET,
+        "torch": torch.__version__,
+        "istft": _istft_config(chat),
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"[TTS] Exported ChatTTS decoder/vocoder to ONNX in "
+          f"{time.perf_counter() - started:.1f}s ({out_dir})", flush=True)
+    return manifest
+
+
+def _gpt_dims(config) -> tuple[int, int, int]:
+    """(layers, KV heads, head size) of the GPT's Llama config."""
+    heads = getattr(config, "num_key_value_heads", None) or config.num_attention_heads
+    head_dim = (getattr(config, "head_dim", None)
+                or config.hidden_size // config.num_attention_heads)
+    return config.num_hidden_layers, heads, head_dim
+
+
+def _cache_from_flat(past):
+    """A transformers cache holding the flat [key0, value0, key1, ...] tensors."""
+    from transformers import DynamicCache
+
+    cache = DynamicCache()
+    for layer in range(len(past) // 2):
+        cache.update(past[2 * layer], past[2 * layer + 1], layer)
+    return cache
+
+
+def _cache_to_flat(cache) -> list:
+    if hasattr(cache, "layers"):  # transformers >= 4.56
+        pairs = [(layer.keys, layer.values) for layer in cache.layers]
+    elif hasattr(cache, "key_cache"):
+        pairs = zip(cache.key_cache, cache.value_cache)
+    else:
+        pairs = cache  # legacy ((key, value), ...) tuples
+    return [t for pair in pairs for t in pair]
+
+
+def _gpt_graph(chat):
+    """Export-friendly wrapper around one forward step of chat.gpt.gpt."""
+    import torch
+
+    class GPTStep(torch.nn.Module):
+        # LlamaModel.forward with the KV cache as flat inputs and outputs
+        def __init__(self, llama):
+            super().__init__()
+            self.llama = llama
+
+        def forward(self, inputs_embeds, attention_mask, position_ids, *past):
+            out = self.llama(inputs_embeds=inputs_embeds, attention_mask=attention_mask,
+                             position_ids=position_ids, past_key_values=_cache_from_flat(past),
+                             use_cache=True)
+            return (out.last_hidden_state, *_cache_to_flat(out.past_key_values))
+
+    return GPTStep(chat.gpt.gpt).eval()
+
+
+def _gpt_digest(llama) -> str:
+    """Fingerprint of the GPT weights.
+
+    Shapes plus the ends of every tensor: hashing all of the GPT's weights
+    would add seconds to each model load.
+    """
+    digest = hashlib.sha1()
+    for key, tensor in sorted(llama.state_dict().items()):
+        flat = tensor.detach().cpu().reshape(-1)
+        digest.update(f"{key}{tuple(tensor.shape)}{tensor.dtype}".encode())
+        digest.update(flat[:1024].contiguous().numpy().tobytes())
+        digest.update(flat[-1024:].contiguous().numpy().tobytes())
+    return digest.hexdigest()
+
+
+def export_gpt(chat, out_dir: str = ONNX_DIR) -> dict:
+    """Export the GPT forward step of a loaded Chat (on CPU) to *out_dir*."""
+    import torch
+
+    llama = chat.gpt.gpt
+    if "cpu" not in str(chat.gpt.device_gpt) or llama.dtype != torch.float32:
+        raise RuntimeError(f"GPT export needs a float32 CPU model, got "
+                           f"{llama.dtype} on {chat.gpt.device_gpt}")
+    os.makedirs(out_dir, exist_ok=True)
+    layers, heads, head_dim = _gpt_dims(llama.config)
+    batch, steps, past_len = 2, 3, 5
+    example = (
+        torch.randn(batch, steps, llama.config.hidden_size),
+        torch.ones(batch, past_len + steps, dtype=torch.int64),
+        torch.arange(past_len, past_len + steps).repeat(batch, 1),
+        *[torch.randn(batch, heads, past_len, head_dim) for _ in range(2 * layers)],
+    )
+    past = [f"past.{i}" for i in range(2 * layers)]
+    present = [f"present.{i}" for i in range(2 * layers)]
+
+    kwargs = {"opset_version": _OPSET, "do_constant_folding": True}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False
+    # The eager attention traces to plain ops; SDPA mask helpers don't
+    saved_attn = llama.config._attn_implementation
+    llama.config._attn_implementation = "eager"
+    started = time.perf_counter()
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                _gpt_graph(chat), example, os.path.join(out_dir, "gpt.onnx"),
+                input_names=["inputs_embeds", "attention_mask", "position_ids", *past],
+                output_names=["hidden", *present],
+                dynamic_axes={
+                    "inputs_embeds": {0: "batch", 1: "steps"},
+                    "attention_mask": {0: "batch", 1: "total"},
+                    "position_ids": {0: "batch", 1: "steps"},
+                    "hidden": {0: "batch", 1: "steps"},
+                    **{name: {0: "batch", 2: "past"} for name in past},
+                    **{name: {0: "batch", 2: "total"} for name in present},
+                },
+                **kwargs,
+            )
+    finally:
+        llama.config._attn_implementation = saved_attn
+    manifest = {
+        "digest": _gpt_digest(llama),
+        "opset": _OPSET,
+        "torch": torch.__version__,
+        "layers": layers,
+        "heads": heads,
+        "head_dim": head_dim,
+    }
+    with open(os.path.join(out_dir, "gpt.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"[TTS] Exported ChatTTS GPT step to ONNX in "
+          f"{time.perf_counter() - started:.1f}s ({out_dir})", flush=True)
+    return manifest
+
+
+def ensure_gpt_exported(chat, out_dir: str = ONNX_DIR) -> dict:
+    try:
+        with open(os.path.join(out_dir, "gpt.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if (manifest and os.path.exists(os.path.join(out_dir, "gpt.onnx"))
+            and manifest.get("digest") == _gpt_digest(chat.gpt.gpt)):
+        return manifest
+    return export_gpt(chat, out_dir)
+
+
+def _load_manifest(chat, out_dir: str) -> dict | None:
+    """The manifest of an export matching *chat*'s weights, if there is one."""
+    try:
+        with open(os.path.join(out_dir, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not all(os.path.exists(os.path.join(out_dir, name))
+               for name in ("decoder.onnx", "vocos.onnx")):
+        return None
+    return manifest if manifest.get("digest") == _weights_digest(chat) else None
+
+
+def ensure_exported(chat, out_dir: str = ONNX_DIR) -> dict:
+    return _load_manifest(chat, out_dir) or export(chat, out_dir)
+
+
+# ---------------------------------------------------------------------------
+# Runtime
+# ---------------------------------------------------------------------------
+
+def _istft(spec: np.ndarray, n_fft: int, hop_length: int, win_length: int,
+           padding: str) -> np.ndarray:
+    """Inverse STFT matching vocos.spectral_ops.ISTFT (hann window).
+
+    *spec* is (batch, n_fft // 2 + 1, frames) complex; returns (batch, samples).
+    """
+    window = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(win_length) / win_length)
+    left = (n_fft - win_length) // 2
+    window = np.pad(window, (left, n_fft - win_length - left)).astype(np.float32)
+
+    frames = np.fft.irfft(spec, n=n_fft, axis=1).astype(np.float32)
+    frames *= window[None, :, None]
+    batch, _, count = frames.shape
+
+    # Overlap-add in hop-sized blocks: block k of frame i lands at block i + k
+    per_frame = n_fft // hop_length
+    blocks = np.zeros((batch, count + per_frame - 1, hop_length), dtype=np.float32)
+    envelope = np.zeros((count + per_frame - 1, hop_length), dtype=np.float32)
+    window_sq = (window ** 2).reshape(per_frame, hop_length)
+    for k in range(per_frame):
+        blocks[:, k:k + count] += frames[:, k * hop_length:(k + 1) * hop_length].transpose(0, 2, 1)
+        envelope[k:k + count] += window_sq[k]
+    y = blocks.reshape(batch, -1)
+    envelope = envelope.reshape(-1)
+
+    trim = n_fft // 2 if padding == "center" else (win_length - hop_length) // 2
+    end = y.shape[1] - trim
+    y, envelope = y[:, trim:end], envelope[trim:end]
+    return np.where(envelope > 1e-11, y / np.maximum(envelope, 1e-11), 0.0).astype(np.float32)
+
+
+def _session(path: str):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = _THREADS
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+class OrtDecoder:
+    """Drop-in for chat.decoder: hidden states -> mel spectrogram."""
+
+    def __init__(self, path: str):
+        self.session = _session(path)
+
+    def __call__(self, inp, mode: str = "decode"):
+        import torch
+
+        mel = self.session.run(None, {"hidden": inp.detach().cpu().float().numpy()})[0]
+        return torch.from_numpy(mel).to(inp.device)
+
+
+class OrtVocos:
+    """Drop-in for chat.vocos: decode(mel) -> waveform."""
+
+    def __init__(self, path: str, istft: dict):
+        self.session = _session(path)
+        self.istft = istft
+
+    def decode(self, mel):
+        import torch
+
+        magnitude, phase = self.session.run(None, {"mel": mel.detach().cpu().float().numpy()})
+        return torch.from_numpy(_istft(magnitude * np.exp(1j * phase), **self.istft))
+
+
+class OrtLlama:
+    """Drop-in for chat.gpt.gpt (the LlamaModel): one generation step.
+
+    Called by ChatTTS's GPT.generate() loop like the torch module.  The KV
+    cache goes back to it as ((key, value), ...) NumPy arrays, which it only
+    measures and hands back on the next step.
+    """
+
+    def __init__(self, path: str, manifest: dict):
+        import torch
+
+        self.session = _session(path)
+        self.past_shape = (manifest["heads"], 0, manifest["head_dim"])
+        self.layers_count = manifest["layers"]
+        self.dtype = torch.float32
+        # GPT._prepare_generation_inputs looks for a static cache on layer 0
+        self.layers = [types.SimpleNamespace()]
+
+    def __call__(self, inputs_embeds=None, attention_mask=None, position_ids=None,
+                 past_key_values=None, **kwargs):
+        import torch
+
+        batch = inputs_embeds.shape[0]
+        if past_key_values:
+            past = [t for pair in past_key_values for t in pair]
+        else:
+            empty = np.zeros((batch, *self.past_shape), dtype=np.float32)
+            past = [empty] * (2 * self.layers_count)
+        feeds = {
+            "inputs_embeds": inputs_embeds.detach().cpu().float().numpy(),
+            "attention_mask": attention_mask.detach().cpu().long().numpy(),
+            "position_ids": position_ids.detach().cpu().long().numpy(),
+            **{f"past.{i}": t for i, t in enumerate(past)},
+        }
+        hidden, *present = self.session.run(None, feeds)
+        return types.SimpleNamespace(
+            last_hidden_state=torch.from_numpy(hidden),
+            past_key_values=tuple(zip(present[0::2], present[1::2])),
+            attentions=None,
+        )
+
+
+def attach(chat, out_dir: str = ONNX_DIR, gpt: bool = _GPT) -> list[str]:
+    """Run *chat*'s networks on ONNX Runtime from now on; returns the stages moved.
+
+    Exports first if needed.  The PyTorch modules are released, so their
+    weights no longer take memory.  If the GPT can't be exported or loaded,
+    it stays on PyTorch and only the decoder and vocoder move.
+    """
+    manifest = ensure_exported(chat, out_dir)
+    decoder = OrtDecoder(os.path.join(out_dir, "decoder.onnx"))
+    vocos = OrtVocos(os.path.join(out_dir, "vocos.onnx"), manifest["istft"])
+    chat.decoder, chat.vocos = decoder, vocos
+    stages = ["decoder", "vocos"]
+    if gpt:
+        try:
+            gpt_manifest = ensure_gpt_exported(chat, out_dir)
+            chat.gpt.gpt = OrtLlama(os.path.join(out_dir, "gpt.onnx"), gpt_manifest)
+            stages.insert(0, "gpt")
+        except Exception as e:
+            print(f"[TTS] ONNX GPT unavailable, keeping it on PyTorch: {e}", flush=True)
+    return stages
+
+
+# ---------------------------------------------------------------------------
+# Verification and benchmark (command line)
+# ---------------------------------------------------------------------------
+
+def _snr_db(reference: np.ndarray, test: np.ndarray) -> float:
+    n = min(len(reference), len(test))
+    noise = np.sum((reference[:n] - test[:n]) ** 2)
+    return float("inf") if noise == 0 else 10 * np.log10(np.sum(reference[:n] ** 2) / noise)
+
+
+def _infer(server, text: str, seed: int = 0) -> np.ndarray:
+    import torch
+
+    params, _ = server._chattts_infer_params()
+    torch.manual_seed(seed)
+    wavs = server.chattts_infer([text], skip_refine_text=True, params_infer_code=params)
+    return np.asarray(wavs[0]).reshape(-1)
+
+
+def verify(server) -> bool:
+    """Compare ONNX and PyTorch output on fixed input and on full synthesis."""
+    import torch
+
+    server._CHATTTS_BACKEND = "torch"
+    chat = server.get_chat()
+    ensure_exported(chat)
+    decoder = OrtDecoder(os.path.join(ONNX_DIR, "decoder.onnx"))
+    vocos = OrtVocos(os.path.join(ONNX_DIR, "vocos.onnx"), _istft_config(chat))
+
+    torch.manual_seed(0)
+    hidden = torch.randn(2, chat.decoder.decoder.conv_in[0].in_channels * 2, 200)
+    with torch.no_grad():
+        reference = chat.vocos.decode(chat.decoder(hidden)).cpu().numpy()
+    onnx_wav = vocos.decode(decoder(hidden)).numpy()
+    stage_snr = min(_snr_db(r, o) for r, o in zip(reference, onnx_wav))
+    print(f"decoder+vocoder on fixed input: max |diff| "
+          f"{np.max(np.abs(reference - onnx_wav)):.2e}, SNR {stage_snr:.1f} dB")
+
+    gpt_diff = 0.0
+    if _GPT:
+        # A prompt step then a single-token step, fed the cache the first returned
+        llama = chat.gpt.gpt
+        ort_llama = OrtLlama(os.path.join(ONNX_DIR, "gpt.onnx"), ensure_gpt_exported(chat))
+        embeds = torch.randn(2, 7, llama.config.hidden_size) * 0.1
+        mask = torch.ones(2, 8, dtype=torch.int64)
+        positions = torch.arange(8).repeat(2, 1)
+        with torch.no_grad():
+            first = llama(inputs_embeds=embeds[:, :6], attention_mask=mask[:, :6],
+                          position_ids=positions[:, :6], use_cache=True)
+            second = llama(inputs_embeds=embeds[:, 6:], attention_mask=mask[:, :7],
+                           position_ids=positions[:, 6:7], use_cache=True,
+                           past_key_values=first.past_key_values)
+        ort_first = ort_llama(embeds[:, :6], mask[:, :6], positions[:, :6])
+        ort_second = ort_llama(embeds[:, 6:], mask[:, :7], positions[:, 6:7],
+                               past_key_values=ort_first.past_key_values)
+        gpt_diff = max(
+            float(torch.max(torch.abs(first.last_hidden_state - ort_first.last_hidden_state))),
+            float(torch.max(torch.abs(second.last_hidden_state - ort_second.last_hidden_state))))
+        print(f"GPT forward steps: max |diff| {gpt_diff:.2e}")
+
+    # Decoder and vocoder only: with the GPT on ONNX Runtime, rounding
+    # differences can change sampled tokens, so the waveforms would differ
+    text = server._CALIBRATION_CORPUS[0]
+    torch_wav = _infer(server, text)
+    attach(chat, gpt=False)
+    onnx_wav = _infer(server, text)
+    e2e_snr = _snr_db(torch_wav, onnx_wav)
+    print(f"end-to-end synthesis: {len(torch_wav)} vs {len(onnx_wav)} samples, "
+          f"SNR {e2e_snr:.1f} dB")
+
+    ok = (stage_snr > 40 and e2e_snr > 30 and len(torch_wav) == len(onnx_wav)
+          and gpt_diff < 1e-3)
+    print("equivalent" if ok else "NOT equivalent")
+    return ok
+
+
+def bench(server, rounds: int = 1) -> None:
+    """Load time and real-time factor of both backends on the calibration corpus."""
+    rows = []
+    for backend in ("torch", "onnx"):
+        server._unload_chat()
+        server._CHATTTS_BACKEND = backend
+        started = time.perf_counter()
+        chat = server.get_chat()
+        load = time.perf_counter() - started
+
+        # Time the decoder + vocoder stage separately from the GPT
+        decode_time = [0.0]
+        inner = chat._decode_to_wavs
+
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return inner(*args, **kwargs)
+            finally:
+                decode_time[0] += time.perf_counter() - t0
+
+        chat._decode_to_wavs = timed
+        _infer(server, server._CALIBRATION_CORPUS[0])  # warm-up
+        decode_time[0] = 0.0
+
+        wall = audio = 0.0
+        for _ in range(rounds):
+            for i, text in enumerate(server._CALIBRATION_CORPUS):
+                t0 = time.perf_counter()
+                wav = _infer(server, text, seed=i)
+                wall += time.perf_counter() - t0
+                audio += len(wav) / _SAMPLE_RATE
+        rows.append((backend, load, wall / audio if audio else float("nan"),
+                     decode_time[0] / audio if audio else float("nan")))
+    server._unload_chat()
+
+    print(f"{'backend':<8} {'load s':>8} {'RTF':>8} {'decode RTF':>11}")
+    for backend, load, rtf, decode_rtf in rows:
+        print(f"{backend:<8} {load:>8.2f} {rtf:>8.3f} {decode_rtf:>11.3f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["export", "verify", "bench"])
+    parser.add_argument("--rounds", type=int, default=1, help="bench passes over the corpus")
+    args = parser.parse_args()
+
+    # tts_server applies the ChatTTS compatibility shims and owns model loading
+    import tts_server
+
+    if args.command == "export":
+        tts_server._CHATTTS_BACKEND = "torch"
+        export(tts_server.get_chat())
+        if _GPT:
+            export_gpt(tts_server.get_chat())
+    elif args.command == "verify":
+        sys.exit(0 if verify(tts_server) else 1)
+    else:
+        bench(tts_server, args.rounds)
@@ -0,0 +1,86 @@
+"""
+Local stand-in for a slow or failing Edge TTS endpoint.
+
+Runs an HTTP CONNECT proxy that the TTS server's Edge client is pointed at
+with TTS_EDGE_PROXY, and misbehaves on purpose so timeouts, hedging and
+engine fallback can be exercised without touching the real service.
+
+Modes:
+  pass   - tunnel to the real endpoint untouched
+  slow   - wait --delay seconds, then tunnel (a slow network / service)
+  hang   - accept the connection and never answer
+  fail   - answer 502 Bad Gateway
+  reset  - close the connection immediately
+
+Usage:
+  python edge_standin.py --mode hang
+  TTS_EDGE_PROXY=http://127.0.0.1:9980 python tts_server.py
+"""
+
+import argparse
+import asyncio
+
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while data := await reader.read(65536):
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                  mode: str, delay: float) -> None:
+    request = await reader.readuntil(b"\r\n\r\n")
+    target = request.split(b" ", 2)[1].decode()
+    print(f"[standin] {mode}: CONNECT {target}", flush=True)
+
+    if mode == "reset":
+        writer.close()
+        return
+    if mode == "fail":
+        writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n\r\n")
+        await writer.drain()
+        writer.close()
+        return
+    if mode == "hang":
+        await reader.read()  # until the client gives up
+        writer.close()
+        return
+    if mode == "slow":
+        await asyncio.sleep(delay)
+
+    host, _, port = target.rpartition(":")
+    try:
+        up_reader, up_writer = await asyncio.open_connection(host, int(port))
+    except OSError as e:
+        print(f"[standin] upstream unreachable: {e}", flush=True)
+        writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n\r\n")
+        writer.close()
+        return
+    writer.write(b"HTTP/1.1 200 Connection Established\r\n\r\n")
+    await writer.drain()
+    await asyncio.gather(_pipe(reader, up_writer), _pipe(up_reader, writer))
+
+
+async def main(host: str, port: int, mode: str, delay: float) -> None:
+    server = await asyncio.start_server(lambda r, w: _handle(r, w, mode, delay), host, port)
+    print(f"[standin] Edge stand-in ({mode}) on http://{host}:{port}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Slow/failing Edge TTS stand-in proxy")
+    parser.add_argument("--mode", choices=["pass", "slow", "hang", "fail", "reset"], default="slow")
+    parser.add_argument("--delay", type=float, default=10.0, help="seconds to stall in slow mode")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9980)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.host, args.port, args.mode, args.delay))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,46 @@
+"""Admission costs: what a request is charged against the memory budget."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_server  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def untuned(monkeypatch):
+    monkeypatch.setattr(tts_server, "_load_tuning", lambda: {})
+    monkeypatch.setattr(tts_server, "_hardware_fingerprint", lambda: "test")
+    monkeypatch.setenv("TTS_CHUNK_MAX", "100")
+
+
+def test_spooled_cost_is_one_chunk():
+    short, _ = tts_server._estimate_cost("chattts", 100, spool=True)
+    long, seconds = tts_server._estimate_cost("chattts", 10_000, spool=True)
+    assert long == short  # the rest of the audio is on disk
+    assert long < tts_server._MEMORY_BUDGET_BYTES // 20
+    assert seconds == pytest.approx(10_000 * tts_server._AUDIO_SECONDS_PER_CHAR)
+
+
+def test_inline_result_is_charged():
+    spooled, _ = tts_server._estimate_cost("chattts", 1000, spool=True)
+    inline, _ = tts_server._estimate_cost("chattts", 1000, spool=False)
+    wav_bytes = 1000 * tts_server._AUDIO_SECONDS_PER_CHAR * 48000
+    assert inline - spooled == int(wav_bytes) * 7 // 3  # file + base64
+    # Left to the server, a result over the spool threshold isn't inlined
+    assert tts_server._estimate_cost("chattts", 10_000)[0] == \
+        tts_server._estimate_cost("chattts", 10_000, spool=True)[0]
+
+
+def test_batch_of_many_items_is_admitted(monkeypatch, tmp_path):
+    monkeypatch.setattr(tts_server, "_CHATTTS_AVAILABLE", False)
+    monkeypatch.setattr(tts_server, "_EDGE_TTS_AVAILABLE", False)
+    client = tts_server.app.test_client()
+    resp = client.post("/tts/batch", json={"items": ["x" * 60] * 200, "spool": True,
+                                           "fallback": [], "queue": False})
+    # Admitted: every item then fails on its own for want of an engine
+    assert resp.status_code == 200
+    assert {r["status"] for r in resp.get_json()["results"]} == {400}
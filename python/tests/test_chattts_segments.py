@@ -0,0 +1,163 @@
+"""ChatTTS segment scheduling against a model that behaves like ChatTTS 0.2.5."""
+
+import base64
+import io
+import os
+import sys
+import wave
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_server  # noqa: E402
+
+SAMPLES_PER_CHAR = 80
+# Samples per row decoded at each step of a streaming infer
+STREAM_STEP = 100
+
+
+def _wav(text):
+    """A waveform that differs per text and per sample, so order shows."""
+    n = len(text) * SAMPLES_PER_CHAR
+    return (0.1 + 0.01 * (ord(text[0]) % 20) + np.arange(n) / n * 0.2).astype(np.float32)
+
+
+class _FakeChat:
+    """``infer`` with ChatTTS 0.2.5's output shape.
+
+    One waveform per text, SAMPLES_PER_CHAR samples per character, except
+    that with ``split_text`` on (the default) a batch comes back as a single
+    concatenated waveform.  With ``stream`` on, a generator yields the new
+    samples of every row, STREAM_STEP at a time; ``events`` records each
+    step so tests can tell when audio was handed on.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.split_text = []
+        self.events = []
+
+    def infer(self, texts, split_text=True, stream=False, **kwargs):
+        self.calls.append(list(texts))
+        self.split_text.append(split_text)
+        wavs = [_wav(t) for t in texts]
+        if stream:
+            return self._stream(wavs)
+        if split_text and len(wavs) > 1:
+            return [np.concatenate(wavs)]
+        return wavs
+
+    def _stream(self, wavs):
+        for start in range(0, max(map(len, wavs)), STREAM_STEP):
+            self.events.append("step")
+            yield [w[start:start + STREAM_STEP] for w in wavs]
+        self.events.append("done")
+
+
+@pytest.fixture
+def chat(monkeypatch, tmp_path):
+    fake = _FakeChat()
+    monkeypatch.setattr(tts_server, "get_chat", lambda: fake)
+    monkeypatch.setattr(tts_server, "_chattts_infer_params", lambda: (None, ("test",)))
+    monkeypatch.setattr(tts_server, "_SEGMENTS", tts_server._SegmentCache(1 << 20))
+    monkeypatch.setattr(tts_server, "_RESULTS", tts_server._ResultStore(str(tmp_path), 60))
+    monkeypatch.setattr(tts_server, "_CHATTTS_AVAILABLE", True)
+    monkeypatch.setenv("TTS_CHUNK_MAX", "200")
+    return fake
+
+
+SEGMENTS = ["第一句话。", "这是第二句，稍微长一点。", "第三句！"]
+
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_segment_frame_counts(chat, monkeypatch, pipeline):
+    monkeypatch.setattr(tts_server, "_PIPELINE", pipeline)
+    job = tts_server._SilentJob("t", "chattts", 0)
+    pcm, reused = tts_server._chattts_segments_pcm(SEGMENTS, job)
+
+    assert len(chat.calls) == 1 and len(chat.calls[0]) == 3  # one batched infer
+    assert [len(p) for p in pcm] == [len(s) * SAMPLES_PER_CHAR for s in SEGMENTS]
+    assert reused == 0
+    assert job.fields["retries"] == 0 and job.fields["skipped_segments"] == 0
+
+
+def test_wav_frame_count(chat):
+    job = tts_server._SilentJob("t", "chattts", 0)
+    body, status = tts_server._synthesize_chattts("".join(SEGMENTS), job)
+
+    assert status == 200
+    with wave.open(tts_server._RESULTS.get(body["result_id"])["path"]) as wf:
+        frames = wf.getnframes()
+    assert frames == sum(len(s) for s in SEGMENTS) * SAMPLES_PER_CHAR
+
+
+def test_batch_shares_segments(chat):
+    job = tts_server._SilentJob("t", "chattts", 0)
+    texts = [SEGMENTS[0] + SEGMENTS[1], SEGMENTS[1], SEGMENTS[2] + SEGMENTS[0]]
+    results = tts_server._synthesize_chattts_batch(texts, job)
+
+    assert sum(map(len, chat.calls)) == 3  # each distinct sentence inferred once
+    for text, (body, status) in zip(texts, results):
+        assert status == 200
+        with wave.open(tts_server._RESULTS.get(body["result_id"])["path"]) as wf:
+            assert wf.getnframes() == len(text) * SAMPLES_PER_CHAR
+
+
+def test_calibration_uses_segment_path(chat, monkeypatch):
+    saved = {}
+    monkeypatch.setattr(tts_server, "_save_tuning", lambda engine, entry: saved.update(entry))
+    monkeypatch.setattr(tts_server, "_hardware_fingerprint", lambda: "test")
+    monkeypatch.setattr(tts_server, "_CALIBRATION_CORPUS", ("".join(SEGMENTS),))
+    chat.calls.clear()
+
+    report = tts_server._calibrate("chattts", sizes=[10, 200])
+
+    assert not any(chat.split_text)
+    by_size = {r["chunk_max"]: r for r in report["results"]}
+    assert by_size[200]["chunks"] == 1 and by_size[10]["chunks"] > 1
+    assert all(r["empty_rate"] == 0 and r["throughput"] > 0 for r in report["results"])
+    # The warm-up and the last size infer the same segments again: no cache
+    assert chat.calls[0] == chat.calls[-1] == SEGMENTS
+    assert saved["chunk_max"] in (10, 200)
+
+
+def test_stream_hands_on_first_segment_while_decoding(chat, monkeypatch):
+    monkeypatch.setattr(tts_server, "_PIPELINE", False)
+    job = tts_server._SilentJob("t", "chattts", 0)
+    out = {}
+
+    def on_audio(i, pcm):
+        chat.events.append(("audio", i))
+        out.setdefault(i, []).append(pcm)
+
+    pcm, _ = tts_server._chattts_segments_pcm(SEGMENTS, job, on_audio=on_audio)
+
+    # Segment 0 is handed on piece by piece before the chunk finishes decoding
+    first_audio = chat.events.index(("audio", 0))
+    assert first_audio < chat.events.index("done") and len(out[0]) > 1
+    order = [e[1] for e in chat.events if isinstance(e, tuple)]
+    assert order == sorted(order) and set(order) == {0, 1, 2}
+    for i, seg in enumerate(pcm):
+        assert np.array_equal(np.concatenate(out[i]), seg)
+
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_streamed_tts_matches_wav(chat, monkeypatch, pipeline):
+    monkeypatch.setattr(tts_server, "_PIPELINE", pipeline)
+    client = tts_server.app.test_client()
+    text = "".join(SEGMENTS)
+
+    streamed = client.post("/tts", json={"text": text, "stream": True})
+    assert streamed.status_code == 200
+    monkeypatch.setattr(tts_server, "_SEGMENTS", tts_server._SegmentCache(1 << 20))
+    whole = client.post("/tts", json={"text": text})
+    assert whole.status_code == 200
+
+    audio = base64.b64decode(whole.get_json()["audio"])
+    with wave.open(io.BytesIO(audio)) as wf:
+        frames = wf.readframes(wf.getnframes())
+    assert len(frames) == sum(len(s) for s in SEGMENTS) * SAMPLES_PER_CHAR * 2
+    assert streamed.data[44:] == frames
+    assert len(chat.calls) == 2  # the second request ran the model again
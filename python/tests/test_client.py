@@ -0,0 +1,81 @@
+"""tts_client against a live server running a stand-in Edge TTS engine."""
+
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_server  # noqa: E402
+from tts_client import AsyncTTSClient, TTSClient, TTSError, _error_body  # noqa: E402
+
+
+@pytest.fixture
+def server_url(monkeypatch, tmp_path):
+    monkeypatch.setattr(tts_server, "_RESULTS", tts_server._ResultStore(str(tmp_path), 60))
+    monkeypatch.setattr(tts_server, "_EDGE_TTS_AVAILABLE", True)
+
+    def synthesize_edge(text, voice, job, rate=1.0):
+        result_id, path = tts_server._RESULTS.create("mp3")
+        with open(path, "wb") as f:
+            f.write(f"{voice}:{text}".encode())
+        return {"result_id": result_id, "format": "mp3"}, 200
+
+    monkeypatch.setattr(tts_server, "_synthesize_edge", synthesize_edge)
+    server = make_server("127.0.0.1", 0, tts_server.app, threaded=True,
+                         request_handler=tts_server._KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_synthesize_inline_and_spooled(server_url):
+    with TTSClient(server_url) as client:
+        inline = client.synthesize("你好", engine="edge-tts", voice="v1", fallback=[])
+        spooled = client.synthesize("你好", engine="edge-tts", voice="v1", fallback=[],
+                                    spool=True)
+        assert inline.audio == b"v1:\xe4\xbd\xa0\xe5\xa5\xbd" and inline.engine == "edge-tts"
+        assert spooled.audio is None and spooled.url
+        assert client.audio(spooled) == inline.audio
+        assert inline.request_id
+
+
+def test_batch_keeps_item_order_and_errors(server_url):
+    with TTSClient(server_url) as client:
+        results = client.batch(["一", {"text": "二", "voice": "v2"}, "", "三"],
+                               engine="edge-tts", voice="v1", fallback=[])
+        assert [isinstance(r, TTSError) for r in results] == [False, False, True, False]
+        assert [client.audio(r) for i, r in enumerate(results) if i != 2] == [
+            "v1:一".encode(), "v2:二".encode(), "v1:三".encode()]
+        assert results[2].status == 400
+
+
+def test_errors_raise_tts_error(server_url):
+    with TTSClient(server_url) as client:
+        with pytest.raises(TTSError) as e:
+            client.synthesize("", engine="edge-tts")
+        assert e.value.status == 400 and e.value.body["error"] == "No text provided"
+
+
+def test_async_client(server_url):
+    async def run():
+        async with AsyncTTSClient(server_url) as client:
+            return await client.synthesize_many(["甲", "乙", ""], engine="edge-tts",
+                                                fallback=[])
+
+    results = asyncio.run(run())
+    assert [r.audio for r in results[:2]] == [
+        f"{tts_server._EDGE_TTS_VOICE}:甲".encode(), f"{tts_server._EDGE_TTS_VOICE}:乙".encode()]
+    assert isinstance(results[2], TTSError) and results[2].status == 400
+
+
+def test_error_body_without_json():
+    assert _error_body("<html>502 Bad Gateway</html>") == {
+        "error": "<html>502 Bad Gateway</html>"}
+    assert _error_body("") == {"error": "empty response"}
+    assert _error_body('{"error": "busy"}') == {"error": "busy"}
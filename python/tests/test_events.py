@@ -0,0 +1,44 @@
+"""The /events stream: who may read it, and what it says about exports."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_server  # noqa: E402
+
+
+@pytest.mark.parametrize("origin, allowed", [
+    ("tauri://localhost", True),
+    ("http://tauri.localhost", True),
+    ("https://example.com", False),
+    (None, False),
+])
+def test_cors_only_for_reader_origins(origin, allowed):
+    client = tts_server.app.test_client()
+    headers = {"Origin": origin} if origin else {}
+    resp = client.get("/events", headers=headers, buffered=False)
+    try:
+        assert resp.status_code == 200
+        assert resp.headers.get("Access-Control-Allow-Origin") == (origin if allowed else None)
+    finally:
+        resp.close()
+
+
+def test_export_events_omit_paths(tmp_path):
+    source = tmp_path / "book.txt"
+    source.write_text("第一章。", encoding="utf-8")
+    job = tts_server._ExportJob("e1", str(source), str(tmp_path / "book.wav"), "chattts", 2)
+
+    q = tts_server._EVENTS.subscribe()
+    try:
+        job._publish()
+        event, data = q.get(timeout=1)
+    finally:
+        tts_server._EVENTS.unsubscribe(q)
+
+    assert event == "export"
+    assert data["source"] == "book.txt" and data["output"] == "book.wav"
+    assert job.status()["source"] == str(source)  # GET /export/<id> keeps the full path
@@ -0,0 +1,90 @@
+"""Audiobook export: checkpointing and resuming an interrupted export."""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_server  # noqa: E402
+
+LINES = [f"第{n}章，天色渐渐暗了下来，他推开门走了出去。\n" for n in range(1, 9)]
+
+
+class _Worker:
+    """Index-TTS stand-in: PCM derived from the text, optionally failing."""
+
+    def __init__(self, fail_on=None):
+        self.texts = []
+        self.fail_on = fail_on
+
+    def synthesize(self, text, voice_path, job):
+        if len(self.texts) == self.fail_on:
+            raise RuntimeError("worker died")
+        self.texts.append(text)
+        return 22050, np.array([ord(c) % 32768 for c in text], dtype=np.int16).repeat(4)
+
+
+@pytest.fixture
+def source(monkeypatch, tmp_path):
+    monkeypatch.setattr(tts_server, "_EXPORT_BLOCK_CHARS", 40)
+    monkeypatch.setenv("TTS_CHUNK_MAX", "200")
+    path = tmp_path / "book.txt"
+    path.write_text("".join(LINES), encoding="utf-8")
+    return str(path)
+
+
+def _export(monkeypatch, source, output, worker):
+    monkeypatch.setattr(tts_server, "_INDEXTTS_WORKER", worker)
+    job = tts_server._ExportJob("e", source, output, "index-tts", "voice.wav")
+    job.load_checkpoint()
+    job.run()
+    return job
+
+
+def test_resume_skips_finished_blocks(monkeypatch, source, tmp_path):
+    reference = str(tmp_path / "reference.wav")
+    full = _Worker()
+    assert _export(monkeypatch, source, reference, full).state == "done"
+
+    output = str(tmp_path / "book.wav")
+    crashed = _export(monkeypatch, source, output, _Worker(fail_on=3))
+    assert crashed.state == "error" and crashed.blocks_done == 3
+    assert os.path.exists(output + ".export.json")
+    with open(output, "ab") as f:
+        f.write(b"\0" * 123)  # audio written after the last checkpoint
+
+    resumed_worker = _Worker()
+    resumed = _export(monkeypatch, source, output, resumed_worker)
+    assert resumed.state == "done"
+    assert resumed.resumed_from == crashed.offset > 0
+    assert resumed_worker.texts == full.texts[3:]  # finished blocks not redone
+    assert not os.path.exists(output + ".export.json")
+    with open(output, "rb") as a, open(reference, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_cancelled_export_resumes(monkeypatch, source, tmp_path):
+    output = str(tmp_path / "book.wav")
+    worker = _Worker()
+
+    class Cancelling(_Worker):
+        def synthesize(self, text, voice_path, job):
+            result = worker.synthesize(text, voice_path, job)
+            if len(worker.texts) == 2:
+                cancelled.cancel.set()
+            return result
+
+    monkeypatch.setattr(tts_server, "_INDEXTTS_WORKER", Cancelling())
+    cancelled = tts_server._ExportJob("e", source, output, "index-tts", "voice.wav")
+    cancelled.run()
+    assert cancelled.state == "cancelled" and cancelled.blocks_done == 2
+
+    resumed = _export(monkeypatch, source, output, worker)
+    assert resumed.state == "done"
+    assert len(worker.texts) == resumed.blocks_done
+    with open(output, "rb") as f:
+        data = f.read()
+    assert len(data) - tts_server._WAV_HEADER_BYTES == 2 * 4 * sum(map(len, worker.texts))
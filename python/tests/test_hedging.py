@@ -0,0 +1,109 @@
+"""Hedged requests: the losing attempt's result must not outlive the request."""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_server  # noqa: E402
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    results = tts_server._ResultStore(str(tmp_path), 60)
+    monkeypatch.setattr(tts_server, "_RESULTS", results)
+    return results
+
+
+def _engine(store, delay, release=None):
+    def synthesize(job):
+        time.sleep(delay)
+        if release is not None:
+            release.wait(5)
+        result_id, path = store.create("wav")
+        with open(path, "wb") as f:
+            f.write(b"RIFF")
+        job.audio_started()
+        return {"result_id": result_id, "format": "wav"}, 200
+    return synthesize
+
+
+def test_loser_result_discarded(store):
+    release = threading.Event()
+    job = tts_server._Job("hedge", "edge-tts", 10)
+    candidates = [("edge-tts", _engine(store, 0.3, release)), ("chattts", _engine(store, 0.0))]
+
+    body, status = tts_server._run_hedged(job, candidates, hedge_after=0.05)
+    assert status == 200 and body["engine"] == "chattts"
+
+    release.set()  # the loser finishes with a result after losing
+    deadline = time.monotonic() + 5
+    while store.stats()["entries"] > 1 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert store.stats()["entries"] == 1
+    assert store.get(body["result_id"]) is not None
+
+
+def test_hedge_is_admitted(store, monkeypatch):
+    admitted = []
+    admit = tts_server._ADMISSION.admit
+
+    def recording_admit(job, cost, wait=0.0):
+        admitted.append((job.engine, wait))
+        return admit(job, cost, wait)
+
+    monkeypatch.setattr(tts_server._ADMISSION, "admit", recording_admit)
+    job = tts_server._Job("hedge", "edge-tts", 10)
+    candidates = [("edge-tts", _engine(store, 0.3)), ("chattts", _engine(store, 0.0))]
+    tts_server._run_hedged(job, candidates, hedge_after=0.05, wait=7.0)
+
+    assert admitted == [("chattts", 0.0)]  # the hedge, charged without queueing
+
+
+def test_profile_covers_attempt_thread(store, monkeypatch):
+    profiler = tts_server._Profiler()
+    profiler.arm(1, None, use_torch=False)
+    monkeypatch.setattr(tts_server, "_PROFILER", profiler)
+    monkeypatch.setattr(tts_server, "_DEBUG", True)
+
+    def engine_under_profile(job):
+        return _engine(store, 0.0)(job)
+
+    job = tts_server._Job("hedge", "chattts", 10)
+    candidates = [("chattts", engine_under_profile), ("edge-tts", _engine(store, 0.0))]
+    tts_server._run_hedged(job, candidates, hedge_after=5.0, profile=True)
+
+    assert job.fields["profiled"]
+    assert any(name == "engine_under_profile" for _, _, name in profiler.stats.stats)
+
+
+def test_fallback_without_hedge_runs_inline(store):
+    threads = []
+
+    def failing(job):
+        threads.append(threading.current_thread())
+        return {"error": "out of memory"}, 500
+
+    def working(job):
+        threads.append(threading.current_thread())
+        return _engine(store, 0.0)(job)
+
+    job = tts_server._Job("seq", "chattts", 10)
+    body, status = tts_server._run_hedged(job, [("chattts", failing), ("edge-tts", working)],
+                                          hedge_after=None)
+
+    assert status == 200 and body["engine"] == "edge-tts"
+    assert threads == [threading.current_thread()] * 2
+    assert job.fields["fallback_errors"] == ["chattts: out of memory"]
+
+
+@pytest.mark.parametrize("value", ["soon", -1, float("nan"), [1]])
+def test_hedge_after_validated(value):
+    job = tts_server._Job("plan", "edge-tts", 5)
+    _, candidates, _, error = tts_server._plan_engines(
+        "edge-tts", {"hedge_after": value, "fallback": []}, "hello", job)
+    assert error and "hedge_after" in error and not candidates
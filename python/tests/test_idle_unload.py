@@ -0,0 +1,45 @@
+"""Idle unloading of the ChatTTS model."""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_server  # noqa: E402
+
+
+class _FakeChat:
+    unloaded = False
+
+    def unload(self):
+        self.unloaded = True
+
+
+@pytest.fixture
+def loaded(monkeypatch):
+    fake = _FakeChat()
+    monkeypatch.setattr(tts_server, "chat", fake)
+    monkeypatch.setattr(tts_server, "_spk_emb", "spk")
+    monkeypatch.setattr(tts_server, "_last_used", time.monotonic() - 1000)
+    return fake
+
+
+def test_idle_model_unloaded(loaded):
+    tts_server._unload_chat(600)
+    assert loaded.unloaded and tts_server.chat is None
+
+
+def test_request_in_progress_keeps_model(loaded):
+    # A request's chunk is inferring while the watcher decides to unload
+    with tts_server._INFER_LOCK:
+        watcher = threading.Thread(target=tts_server._unload_chat, args=(600,))
+        watcher.start()
+        time.sleep(0.05)
+        tts_server._last_used = time.monotonic()  # the chunk finishes
+    watcher.join(5)
+
+    assert not loaded.unloaded and tts_server.chat is loaded
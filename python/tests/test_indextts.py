@@ -0,0 +1,47 @@
+"""Index-TTS synthesis against a stand-in for the worker process."""
+
+import os
+import sys
+import wave
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_server  # noqa: E402
+
+
+class _FakeWorker:
+    def __init__(self, samples_per_char):
+        self.samples_per_char = samples_per_char
+
+    def synthesize(self, text, voice_path, job):
+        return 22050, np.zeros(len(text) * self.samples_per_char, dtype=np.int16)
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    results = tts_server._ResultStore(str(tmp_path), 60)
+    monkeypatch.setattr(tts_server, "_RESULTS", results)
+    return results
+
+
+def test_chunks_written_to_one_wav(store, monkeypatch):
+    monkeypatch.setattr(tts_server, "_INDEXTTS_WORKER", _FakeWorker(10))
+    job = tts_server._SilentJob("t", "index-tts", 0)
+    body, status = tts_server._synthesize_indextts("你好。" * 80, "voice.wav", job)
+
+    assert status == 200 and body["segments"] > 1
+    with wave.open(store.get(body["result_id"])["path"]) as wf:
+        assert wf.getframerate() == 22050
+        assert wf.getnframes() == len("你好。" * 80) * 10
+
+
+def test_no_audio_is_a_clean_error(store, monkeypatch):
+    monkeypatch.setattr(tts_server, "_INDEXTTS_WORKER", _FakeWorker(0))
+    job = tts_server._SilentJob("t", "index-tts", 0)
+    body, status = tts_server._synthesize_indextts("你好。", "voice.wav", job)
+
+    assert status == 500 and body == {"error": "Index-TTS failed to generate audio"}
+    assert store.stats()["entries"] == 0
@@ -0,0 +1,55 @@
+"""Persistent connections on the sidecar's TCP and Unix socket listeners."""
+
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_server  # noqa: E402
+from bench_transport import UnixHTTPConnection  # noqa: E402
+
+
+@pytest.fixture(params=["tcp", "uds"])
+def connection(request, tmp_path):
+    if request.param == "uds":
+        if not hasattr(socket, "AF_UNIX"):
+            pytest.skip("no Unix domain sockets")
+        path = str(tmp_path / "tts.sock")
+        server = make_server(f"unix://{path}", 0, tts_server.app, threaded=True,
+                             request_handler=tts_server._KeepAliveHandler)
+        conn = UnixHTTPConnection(path, timeout=5)
+    else:
+        server = make_server("127.0.0.1", 0, tts_server.app, threaded=True,
+                             request_handler=tts_server._KeepAliveHandler)
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield conn
+    conn.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_two_requests_on_one_connection(connection):
+    # A POST whose route never reads the body, then a GET on the same socket
+    body = json.dumps({"ignored": "x" * 5000})
+    connection.request("POST", "/export/unknown/cancel", body=body,
+                       headers={"Content-Type": "application/json"})
+    first = connection.getresponse()
+    assert first.status == 404
+    assert first.getheader("Connection", "").lower() != "close"
+    first.read()
+    sock = connection.sock
+
+    connection.request("GET", "/health")
+    second = connection.getresponse()
+    assert second.status == 200
+    assert json.loads(second.read())["status"] == "ok"
+    assert connection.sock is sock  # not reconnected
@@ -0,0 +1,70 @@
+"""Capturing a request trace and replaying it with tts_replay."""
+
+import json
+import os
+import sys
+import threading
+
+import pytest
+import requests
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_replay  # noqa: E402
+import tts_server  # noqa: E402
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    """A live server with a stand-in Edge TTS engine; yields (url, texts, trace)."""
+    trace = str(tmp_path / "trace.jsonl")
+    texts = []
+    monkeypatch.setattr(tts_server, "_RESULTS", tts_server._ResultStore(str(tmp_path), 60))
+    monkeypatch.setattr(tts_server, "_EDGE_TTS_AVAILABLE", True)
+    monkeypatch.setattr(tts_server, "_CAPTURE", tts_server._Capture(trace, keep_text=False))
+
+    def synthesize_edge(text, voice, job, rate=1.0):
+        texts.append(text)
+        result_id, path = tts_server._RESULTS.create("mp3")
+        with open(path, "wb") as f:
+            f.write(text.encode())
+        return {"result_id": result_id, "format": "mp3"}, 200
+
+    monkeypatch.setattr(tts_server, "_synthesize_edge", synthesize_edge)
+    server = make_server("127.0.0.1", 0, tts_server.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", texts, trace
+    server.shutdown()
+    server.server_close()
+
+
+def test_capture_and_replay(server):
+    url, texts, trace = server
+    common = {"engine": "edge-tts", "fallback": [], "voice": "v1"}
+    for text in ("第一段文字。", "第二段。", "第一段文字。"):
+        assert requests.post(url + "/tts", json={"text": text, **common}).status_code == 200
+    resp = requests.post(url + "/tts/batch", json={"items": ["甲乙。", {"text": "丙。"}], **common})
+    assert resp.status_code == 200
+
+    entries = tts_replay._load(trace, None)
+    assert [e["endpoint"] for e in entries] == ["tts", "tts", "tts", "batch"]
+    assert all("text" not in e and e["params"] == common and e["status"] == 200
+               for e in entries[:3])
+    assert [e["chars"] for e in entries[:3]] == [6, 4, 6]
+    # The same text hashes the same, so replay can reproduce cache hits
+    assert entries[0]["text_hash"] == entries[2]["text_hash"] != entries[1]["text_hash"]
+    assert [item["chars"] for item in entries[3]["items"]] == [3, 2]
+    assert "第一段" not in open(trace, encoding="utf-8").read()
+
+    texts.clear()
+    bad = {"ts": entries[-1]["ts"], "endpoint": "unknown"}
+    # One at a time: identical requests in flight together share a synthesis
+    results = tts_replay.replay(entries + [bad], url, speed=0, concurrency=1, timeout=10)
+
+    assert [r["status"] for r in results] == [200, 200, 200, 200, -1]
+    assert results[-1]["error"].startswith("KeyError")
+    # Filler text keeps each length, and repeats of a hash get the same filler
+    replayed = sorted(texts, key=len)
+    assert sorted(map(len, texts)) == [2, 3, 4, 6, 6]
+    assert replayed[-1] == replayed[-2]
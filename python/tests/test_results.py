@@ -0,0 +1,78 @@
+"""Spooled results: the store, and serving them with Range requests."""
+
+import base64
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_server  # noqa: E402
+
+AUDIO = bytes(range(256)) * 64
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    results = tts_server._ResultStore(str(tmp_path), 60)
+    monkeypatch.setattr(tts_server, "_RESULTS", results)
+    monkeypatch.setattr(tts_server, "_EDGE_TTS_AVAILABLE", True)
+
+    def synthesize_edge(text, voice, job, rate=1.0):
+        result_id, path = results.create("mp3")
+        with open(path, "wb") as f:
+            f.write(AUDIO)
+        return {"result_id": result_id, "format": "mp3"}, 200
+
+    monkeypatch.setattr(tts_server, "_synthesize_edge", synthesize_edge)
+    return results
+
+
+def _tts(spool):
+    client = tts_server.app.test_client()
+    resp = client.post("/tts", json={"text": "你好", "engine": "edge-tts", "fallback": [],
+                                     "spool": spool})
+    assert resp.status_code == 200
+    return client, resp.get_json()
+
+
+def test_spooled_result_served_with_ranges(store):
+    client, body = _tts(True)
+    assert "audio" not in body and body["bytes"] == len(AUDIO)
+
+    whole = client.get(body["url"])
+    assert whole.status_code == 200 and whole.data == AUDIO
+    assert whole.headers["Accept-Ranges"] == "bytes"
+
+    part = client.get(body["url"], headers={"Range": "bytes=1000-1999"})
+    assert part.status_code == 206 and part.data == AUDIO[1000:2000]
+    assert part.headers["Content-Range"] == f"bytes 1000-1999/{len(AUDIO)}"
+    assert part.headers["Content-Type"] == "audio/mpeg"
+
+
+def test_inline_result_leaves_nothing_behind(store):
+    _, body = _tts(False)
+    assert base64.b64decode(body["audio"]) == AUDIO
+    assert store.stats()["entries"] == 0
+
+
+def test_unknown_result_is_404(store):
+    client = tts_server.app.test_client()
+    assert client.get("/results/0123abcd.wav").status_code == 404
+
+
+def test_store_expiry_and_eviction(tmp_path):
+    results = tts_server._ResultStore(str(tmp_path), ttl=0.05, max_entries=2)
+    ids = []
+    for _ in range(3):
+        result_id, path = results.create("wav")
+        open(path, "wb").close()
+        ids.append(result_id)
+    assert results.get(ids[0]) is None  # evicted as the oldest
+    assert not os.path.exists(os.path.join(str(tmp_path), f"{ids[0]}.wav"))
+    assert results.get(ids[2]) is not None
+
+    time.sleep(0.1)
+    assert results.get(ids[2]) is None  # past its TTL
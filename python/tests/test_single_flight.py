@@ -0,0 +1,71 @@
+"""Identical /tts requests in flight at the same time share one synthesis."""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_server  # noqa: E402
+
+
+@pytest.fixture
+def edge(monkeypatch, tmp_path):
+    monkeypatch.setattr(tts_server, "_RESULTS", tts_server._ResultStore(str(tmp_path), 60))
+    monkeypatch.setattr(tts_server, "_EDGE_TTS_AVAILABLE", True)
+    calls = []
+    release = threading.Event()
+
+    def synthesize_edge(text, voice, job, rate=1.0):
+        calls.append(text)
+        release.wait(5)
+        result_id, path = tts_server._RESULTS.create("mp3")
+        with open(path, "wb") as f:
+            f.write(text.encode())
+        return {"result_id": result_id, "format": "mp3"}, 200
+
+    monkeypatch.setattr(tts_server, "_synthesize_edge", synthesize_edge)
+    return calls, release
+
+
+def _post(text):
+    client = tts_server.app.test_client()
+    return client.post("/tts", json={"text": text, "engine": "edge-tts", "fallback": []})
+
+
+def _wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_identical_requests_coalesced(edge):
+    calls, release = edge
+    before = tts_server._STATS.get("coalesced", 0)
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(_post, "同一句话。") for _ in range(3)]
+        futures.append(pool.submit(_post, "另一句话。"))
+        _wait_for(lambda: sorted(f.waiters for f in list(tts_server._INFLIGHT.values()))
+                  == [0, 2])
+        release.set()
+        responses = [f.result() for f in futures]
+
+    assert sorted(calls) == sorted(["同一句话。", "另一句话。"])
+    assert all(r.status_code == 200 for r in responses)
+    audio = [r.get_json()["audio"] for r in responses]
+    assert audio[0] == audio[1] == audio[2] != audio[3]
+    assert len({r.headers["X-Request-ID"] for r in responses}) == 4
+    assert tts_server._STATS["coalesced"] == before + 2
+    assert not tts_server._INFLIGHT
+
+
+def test_later_request_not_coalesced(edge):
+    calls, release = edge
+    release.set()
+    assert _post("同一句话。").status_code == 200
+    assert _post("同一句话。").status_code == 200
+    assert len(calls) == 2  # only requests in flight together are shared
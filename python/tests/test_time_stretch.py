@@ -0,0 +1,36 @@
+"""WSOLA time-stretch: streamed pieces must re-time like the whole signal."""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_server  # noqa: E402
+
+
+def _speechlike(samples: int) -> np.ndarray:
+    rng = np.random.default_rng(samples)
+    t = np.arange(samples) / 24000
+    return (6000 * np.sin(2 * np.pi * 180 * t) + rng.normal(0, 400, samples)).astype(np.int16)
+
+
+@pytest.mark.parametrize("rate", [0.5, 0.8, 1.25, 2.0])
+def test_length_follows_rate(rate):
+    pcm = _speechlike(24000)
+    assert len(tts_server._time_stretch(pcm, rate)) == round(len(pcm) / rate)
+
+
+@pytest.mark.parametrize("rate", [0.7, 1.25, 1.9])
+def test_pieces_match_whole(rate):
+    pcm = _speechlike(24000 * 2 + 123)
+    whole = tts_server._time_stretch(pcm, rate)
+
+    stretcher = tts_server._Stretcher(rate)
+    cuts = [1, 700, 701, 9000, 9001, 30000]  # pieces shorter and longer than a frame
+    out = [stretcher.feed(piece) for piece in np.split(pcm, cuts)]
+    streamed = np.concatenate(out + [stretcher.flush()])
+
+    assert np.array_equal(streamed, whole)
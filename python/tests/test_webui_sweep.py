@@ -0,0 +1,58 @@
+"""Seed sweeps in the voice tuning UI."""
+
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tts_server  # noqa: E402
+import tts_webui  # noqa: E402
+
+
+@pytest.fixture
+def infer_calls(monkeypatch, tmp_path):
+    chat_tts = types.ModuleType("ChatTTS")
+    chat_tts.Chat = types.SimpleNamespace(InferCodeParams=lambda **kw: kw)
+    monkeypatch.setitem(sys.modules, "ChatTTS", chat_tts)
+    monkeypatch.setattr(tts_server, "speaker_for_seed", lambda seed: f"spk{seed}")
+    monkeypatch.setattr(tts_webui, "_CLIPS", tts_server._ResultStore(str(tmp_path), 60))
+
+    calls = []
+
+    def chattts_infer(texts, refine_text_only=False, params_infer_code=None, **kwargs):
+        calls.append((list(texts), params_infer_code))
+        if refine_text_only:
+            return list(texts)
+        return [np.zeros(len(t) * 10, dtype=np.float32) for t in texts]
+
+    monkeypatch.setattr(tts_server, "chattts_infer", chattts_infer)
+    return calls
+
+
+def _sweep(json):
+    app = tts_webui.create_app()
+    return app.test_client().post("/sweep", json=json)
+
+
+def test_full_sweep_is_admitted(infer_calls):
+    seeds = list(range(tts_webui._MAX_CLIPS))
+    resp = _sweep({"text": "x" * 60, "seeds": seeds})
+
+    assert resp.status_code == 200
+    assert [c["seed"] for c in resp.get_json()["clips"]] == seeds
+    refine, *synth = infer_calls
+    assert refine[0] == ["x" * 60]
+    assert [p["spk_emb"] for _, p in synth] == [f"spk{s}" for s in seeds]
+
+
+def test_speeds_of_one_seed_share_a_call(infer_calls):
+    params = [{"speed": s} for s in (2, 5, 8)]
+    resp = _sweep({"text": "hello", "seeds": [1, 2], "params": params, "refine": False})
+
+    assert resp.status_code == 200 and len(resp.get_json()["clips"]) == 6
+    assert [texts for texts, _ in infer_calls] == [
+        ["[speed_2]hello", "[speed_5]hello", "[speed_8]hello"]] * 2
@@ -0,0 +1,248 @@
+"""
+Python client for the Comic Viewer TTS server.
+
+Keeps a pool of keep-alive connections to the server and caps the number of
+requests in flight, so scripts that pre-generate audio for many passages
+don't open a connection per text or overload a local engine.
+
+Usage:
+  from tts_client import TTSClient
+
+  with TTSClient() as client:
+      result = client.synthesize("你好", engine="edge-tts")
+      client.save(result, "hello.mp3")
+      for r in client.batch(["第一段。", "第二段。"], engine="chattts"):
+          ...
+
+  # asyncio (needs aiohttp, installed with edge-tts)
+  async with AsyncTTSClient() as client:
+      results = await client.synthesize_many(texts, engine="edge-tts")
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_URL = "http://127.0.0.1:9966"
+
+
+class TTSError(Exception):
+    """A synthesis request the server rejected or failed."""
+
+    def __init__(self, status: int, body: dict):
+        super().__init__(f"HTTP {status}: {body.get('error', body)}")
+        self.status = status
+        self.body = body
+
+
+@dataclass
+class TTSResult:
+    """One synthesized text: inline audio, or a URL to fetch it from."""
+
+    format: str
+    engine: str | None = None
+    audio: bytes | None = None
+    url: str | None = None
+    request_id: str | None = None
+    body: dict = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_body(cls, body: dict, request_id: str | None = None) -> TTSResult:
+        audio = body.get("audio")
+        return cls(
+            format=body.get("format", "wav"),
+            engine=body.get("engine"),
+            audio=base64.b64decode(audio) if audio else None,
+            url=body.get("url"),
+            request_id=request_id,
+            body={k: v for k, v in body.items() if k != "audio"},
+        )
+
+
+def _error_body(text: str) -> dict:
+    """Body of an error response; proxies and crashed servers don't always send JSON."""
+    try:
+        body = json.loads(text)
+    except ValueError:
+        body = None
+    return body if isinstance(body, dict) else {"error": text.strip()[:500] or "empty response"}
+
+
+def _stretch_path(result: TTSResult) -> str:
+    if result.url is None:
+        raise ValueError("stretch() needs a spooled result: synthesize with spool=True, "
+                         "or pass rate= to synthesize() instead")
+    return f"{result.url}/stretch"
+
+
+def _batch_results(body: dict) -> list[TTSResult | TTSError]:
+    """Per-item results of a /tts/batch response, errors included in place."""
+    results = []
+    for item in body["results"]:
+        item = dict(item)
+        status = item.pop("status")
+        if status == 200:
+            results.append(TTSResult.from_body(item, f"{body['request_id']}.{item['index']}"))
+        else:
+            results.append(TTSError(status, item))
+    return results
+
+
+class TTSClient:
+    """Thread-safe synchronous client.
+
+    *max_connections* keep-alive connections are pooled; at most
+    *max_concurrency* requests are in flight at once across all threads.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_URL, max_connections: int = 8,
+                 max_concurrency: int = 4, timeout: float = 600.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, pool_block=True)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        with self._slots:
+            return self._session.request(method, self.base_url + path,
+                                         timeout=self.timeout, **kwargs)
+
+    def _post(self, path: str, payload: dict) -> tuple[dict, requests.Response]:
+        resp = self._request("POST", path, json=payload)
+        if resp.status_code != 200:
+            raise TTSError(resp.status_code, _error_body(resp.text))
+        return resp.json(), resp
+
+    def health(self) -> dict:
+        return self._request("GET", "/health").json()
+
+    def synthesize(self, text: str, engine: str = "chattts", **params) -> TTSResult:
+        """POST /tts; extra keyword arguments are passed as request params."""
+        body, resp = self._post("/tts", {"text": text, "engine": engine, **params})
+        return TTSResult.from_body(body, resp.headers.get("X-Request-ID"))
+
+    def synthesize_many(self, texts: list[str], engine: str = "chattts",
+                        **params) -> list[TTSResult | TTSError]:
+        """One /tts request per text, run concurrently up to the client's limit."""
+        def one(text: str) -> TTSResult | TTSError:
+            try:
+                return self.synthesize(text, engine, **params)
+            except TTSError as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            return list(pool.map(one, texts))
+
+    def batch(self, items: list[str | dict], **shared) -> list[TTSResult | TTSError]:
+        """POST /tts/batch.  Items are texts or dicts of per-item params."""
+        body, _ = self._post("/tts/batch", {"items": items, **shared})
+        return _batch_results(body)
+
+    def stretch(self, result: TTSResult, rate: float) -> TTSResult:
+        """Re-time a spooled WAV result on the server instead of resynthesizing.
+
+        Raises ValueError for a result that was returned inline.
+        """
+        body, _ = self._post(_stretch_path(result), {"rate": rate})
+        return TTSResult.from_body(body, result.request_id)
+
+    def audio(self, result: TTSResult) -> bytes:
+        """The audio bytes of *result*, downloading them if it was spooled."""
+        if result.audio is None:
+            resp = self._request("GET", result.url)
+            resp.raise_for_status()
+            result.audio = resp.content
+        return result.audio
+
+    def save(self, result: TTSResult, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(self.audio(result))
+
+    def close(self) -> None:
+        self._session.close()
+
+    def __enter__(self) -> TTSClient:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class AsyncTTSClient:
+    """asyncio client with the same API as TTSClient (methods are coroutines)."""
+
+    def __init__(self, base_url: str = DEFAULT_URL, max_connections: int = 8,
+                 max_concurrency: int = 4, timeout: float = 600.0):
+        import aiohttp
+
+        self.base_url = base_url.rstrip("/")
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=max_connections),
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        )
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def _post(self, path: str, payload: dict) -> tuple[dict, dict]:
+        async with self._slots, self._session.post(self.base_url + path, json=payload) as resp:
+            if resp.status != 200:
+                raise TTSError(resp.status, _error_body(await resp.text()))
+            return await resp.json(), dict(resp.headers)
+
+    async def health(self) -> dict:
+        async with self._slots, self._session.get(self.base_url + "/health") as resp:
+            return await resp.json()
+
+    async def synthesize(self, text: str, engine: str = "chattts", **params) -> TTSResult:
+        body, headers = await self._post("/tts", {"text": text, "engine": engine, **params})
+        return TTSResult.from_body(body, headers.get("X-Request-ID"))
+
+    async def synthesize_many(self, texts: list[str], engine: str = "chattts",
+                              **params) -> list[TTSResult | TTSError]:
+        async def one(text: str) -> TTSResult | TTSError:
+            try:
+                return await self.synthesize(text, engine, **params)
+            except TTSError as e:
+                return e
+
+        return list(await asyncio.gather(*(one(t) for t in texts)))
+
+    async def batch(self, items: list[str | dict], **shared) -> list[TTSResult | TTSError]:
+        body, _ = await self._post("/tts/batch", {"items": items, **shared})
+        return _batch_results(body)
+
+    async def stretch(self, result: TTSResult, rate: float) -> TTSResult:
+        body, _ = await self._post(_stretch_path(result), {"rate": rate})
+        return TTSResult.from_body(body, result.request_id)
+
+    async def audio(self, result: TTSResult) -> bytes:
+        if result.audio is None:
+            async with self._slots, self._session.get(self.base_url + result.url) as resp:
+                resp.raise_for_status()
+                result.audio = await resp.read()
+        return result.audio
+
+    async def save(self, result: TTSResult, path: str) -> None:
+        data = await self.audio(result)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    async def close(self) -> None:
+        await self._session.close()
+
+    async def __aenter__(self) -> AsyncTTSClient:
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
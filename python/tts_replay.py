@@ -0,0 +1,199 @@
+"""
+Replay a captured request trace against a TTS server.
+
+Reads a JSONL trace written by tts_server.py with TTS_CAPTURE_PATH set and
+sends the same requests (engine, length, params) with the recorded spacing,
+optionally sped up, then reports latency percentiles next to the ones
+recorded in the trace.  Traces captured without text are replayed with
+filler text of the same length; repeats of a text hash get the same filler,
+so rereads still hit the server's caches.
+
+Usage:
+  TTS_CAPTURE_PATH=trace.jsonl python tts_server.py      # capture
+  python tts_replay.py trace.jsonl                         # replay at 1x
+  python tts_replay.py trace.jsonl --speed 10 --out replay.jsonl
+  python tts_replay.py trace.jsonl --speed 0               # back to back
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_URL = "http://127.0.0.1:9966"
+_PATHS = {"tts": "/tts", "batch": "/tts/batch"}
+
+# Common characters for filler text; punctuation every few words so the
+# server splits it into sentences like real prose
+_FILLER_CHARS = (
+    "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动"
+    "同工也能下过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自"
+    "二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日"
+)
+_FILLER_PUNCT = "，，，。。！？"
+
+
+def _filler(chars: int, key: str) -> str:
+    """Deterministic filler text of *chars* characters for text hash *key*."""
+    rng = random.Random(hashlib.sha256(key.encode()).digest())
+    out = []
+    while len(out) < chars:
+        out.extend(rng.choices(_FILLER_CHARS, k=rng.randint(4, 12)))
+        out.append(rng.choice(_FILLER_PUNCT))
+    text = out[:chars]
+    if chars > 1:
+        text[-1] = "。"
+    return "".join(text)
+
+
+def _text(item: dict) -> str:
+    if "text" in item:
+        return item["text"]
+    return _filler(item["chars"], item.get("text_hash") or f"{item['chars']}")
+
+
+def _payload(entry: dict) -> dict:
+    """The request body to send for a trace entry."""
+    payload = dict(entry.get("params") or {})
+    if entry["endpoint"] == "batch":
+        payload["items"] = [{"text": _text(item), **(item.get("params") or {})}
+                            for item in entry["items"]]
+    else:
+        payload["text"] = _text(entry)
+    payload.setdefault("engine", entry.get("engine", "chattts"))
+    return payload
+
+
+def _percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))]
+
+
+def _load(path: str, limit: int | None) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries.sort(key=lambda e: e["ts"])
+    return entries[:limit] if limit else entries
+
+
+def replay(entries: list[dict], url: str, speed: float, concurrency: int,
+           timeout: float) -> list[dict]:
+    """Send *entries* on their recorded schedule; returns one result per entry."""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_maxsize=concurrency))
+    results: list[dict | None] = [None] * len(entries)
+
+    def send(i: int, entry: dict, due: float) -> None:
+        lag = time.monotonic() - due
+        start = time.perf_counter()
+        first = None
+        try:
+            with session.post(url + _PATHS[entry["endpoint"]], json=_payload(entry),
+                              timeout=timeout, stream=True) as resp:
+                for chunk in resp.iter_content(65536):
+                    if first is None and chunk:
+                        first = time.perf_counter() - start
+                status = resp.status_code
+                error = None
+        except requests.RequestException as e:
+            status, error = 0, str(e)
+        except Exception as e:  # e.g. a malformed trace entry
+            status, error = -1, f"{type(e).__name__}: {e}"
+        results[i] = {
+            "index": i,
+            "endpoint": entry.get("endpoint"),
+            "engine": entry.get("engine"),
+            "chars": entry.get("chars"),
+            "status": status,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "first_byte_ms": round(first * 1000, 1) if first is not None else None,
+            "send_lag_ms": round(lag * 1000, 1),
+            "captured_ms": entry.get("latency_ms"),
+            **({"error": error} if error else {}),
+        }
+
+    t0 = entries[0]["ts"] if entries else 0.0
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="replay") as pool:
+        for i, entry in enumerate(entries):
+            due = started + ((entry["ts"] - t0) / speed if speed > 0 else 0.0)
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, i, entry, due)
+            if (i + 1) % 50 == 0:
+                print(f"[replay] sent {i + 1}/{len(entries)}", flush=True)
+    return results
+
+
+def report(results: list[dict]) -> None:
+    groups: dict[str, list[dict]] = {"all": results}
+    for r in results:
+        groups.setdefault(f"{r['endpoint']}:{r['engine']}", []).append(r)
+
+    print(f"\n  {'requests':<22}{'n':>6}{'ok':>6}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}"
+          f"{'max':>9}  {'captured p50/p95':>17}")
+    for name, rows in groups.items():
+        ok = [r for r in rows if r["status"] == 200]
+        lat = [r["latency_ms"] for r in ok]
+        cap = [r["captured_ms"] for r in ok if r["captured_ms"] is not None]
+        pcts = [_percentile(lat, p) for p in (50, 90, 95, 99, 100)]
+        cells = "".join(f"{p:>9.0f}" if p is not None else f"{'-':>9}" for p in pcts)
+        captured = (f"{_percentile(cap, 50):.0f}/{_percentile(cap, 95):.0f}" if cap else "-")
+        print(f"  {name:<22}{len(rows):>6}{len(ok):>6}{cells}  {captured:>17}")
+
+    statuses: dict[int, int] = {}
+    for r in results:
+        statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+    lag = _percentile([r["send_lag_ms"] for r in results], 95)
+    print(f"\n  statuses: {dict(sorted(statuses.items()))}  "
+          f"(0 = connection error, -1 = bad trace entry)")
+    if lag is not None:
+        print(f"  send lag p95: {lag:.0f} ms (raise --concurrency if this grows)")
+    print("  latencies in ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a captured TTS request trace")
+    parser.add_argument("trace", help="JSONL trace from TTS_CAPTURE_PATH")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="time compression (2 = twice as fast; 0 = no gaps)")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="maximum requests in flight")
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--out", help="write per-request results as JSONL")
+    args = parser.parse_args()
+
+    entries = _load(args.trace, args.limit)
+    if not entries:
+        sys.exit("[replay] trace is empty")
+    span = entries[-1]["ts"] - entries[0]["ts"]
+    print(f"[replay] {len(entries)} requests over {span:.0f}s captured; "
+          f"replaying at {'max' if args.speed <= 0 else f'{args.speed:g}x'} speed "
+          f"against {args.url}", flush=True)
+
+    try:
+        requests.get(args.url + "/health", timeout=5).raise_for_status()
+    except requests.RequestException as e:
+        sys.exit(f"[replay] server not reachable: {e}")
+
+    results = replay(entries, args.url.rstrip("/"), args.speed, args.concurrency, args.timeout)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
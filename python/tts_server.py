@@ -2,16 +2,31 @@
 TTS HTTP server for Comic Viewer (Edge TTS + optional ChatTTS).
 
 Endpoints:
-  GET  /health      - Health check
-  POST /tts         - Convert text to speech (engine: "edge-tts" or "chattts")
-  POST /test_voice  - Test ChatTTS voice seeds (requires ChatTTS)
+  GET  /health        - Health check
+  GET  /stats         - Request counters, cache and memory-budget usage
+  GET  /events        - Server-sent events: model state and per-request progress
+  POST /tts           - Convert text to speech (engine: "edge-tts", "chattts" or "index-tts")
+  POST /tts/batch     - Convert many texts in one request (per-item results)
+  GET  /results/<id>  - Spooled synthesis result (supports Range requests)
+  POST /results/<id>/stretch - Re-time a stored WAV result to another speaking rate
+  POST /test_voice    - Test ChatTTS voice seeds (requires ChatTTS)
+  POST /calibrate     - Start measuring the best chunk size for this machine
+  GET  /calibrate/<id> - Calibration progress and result
+  POST /export        - Start/resume exporting a whole .txt/.md file to audio
+  GET  /export/<id>   - Export status and progress (GET /exports lists all)
+  GET  /webui/        - Voice tuning web UI, sharing this server's model (requires ChatTTS)
+  POST /debug/profile - Profile the next N /tts requests or a time window (TTS_DEBUG=1)
+  GET  /debug/payload - N bytes of filler, for transport benchmarks (TTS_DEBUG=1)
 
 Usage:
   pip install -r requirements.txt   # Full install (ChatTTS + Edge TTS)
   pip install flask edge-tts         # Edge TTS only (lightweight)
   python tts_server.py
+  python tts_server.py --uds /tmp/tts.sock   # also listen on a Unix socket
+  TTS_CAPTURE_PATH=trace.jsonl python tts_server.py   # record traffic for tts_replay.py
 """
 
+import importlib.util
 import os
 import sys
 import types
@@ -301,6 +316,9 @@ try:
 except ImportError:
     pass
 
+# Edge TTS is imported lazily; only check that it is installed
+_EDGE_TTS_AVAILABLE = importlib.util.find_spec("edge_tts") is not None
+
 # ---------------------------------------------------------------------------
 # Detect Index-TTS availability (runs in separate venv via subprocess)
 # ---------------------------------------------------------------------------
@@ -408,16 +426,315 @@ _INDEXTTS_AVAILABLE = _INDEXTTS_VERIFIED_PYTHON is not None
 
 import asyncio
 import base64
+import hashlib
 import io
-
+import json
+import logging
+import queue
 import re
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file
 
 app = Flask(__name__)
 chat = None
 _spk_emb = None  # Female speaker embedding, generated once at model load
 
+# ---------------------------------------------------------------------------
+# Server-sent events
+#
+# GET /events pushes model state transitions (loading, ready, unloading,
+# unloaded) and per-request progress (chunk i of n done, ETA) as soon as they
+# happen, so clients don't have to poll /health or wait blindly on /tts.
+# ---------------------------------------------------------------------------
+
+_SSE_KEEPALIVE_SECONDS = 15
+
+# One JSON object per line on stdout (the Tauri host captures the sidecar's
+# stdout); see _Job.log
+_log = logging.getLogger("tts_server")
+if not _log.handlers:
+    _log_handler = logging.StreamHandler(sys.stdout)
+    _log_handler.setFormatter(logging.Formatter("%(message)s"))
+    _log.addHandler(_log_handler)
+    _log.setLevel(logging.INFO)
+    _log.propagate = False
+
+
+class _EventBus:
+    """Fan-out of server events to every connected /events subscriber."""
+
+    def __init__(self):
+        self._subscribers: list[queue.Queue] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        q: queue.Queue = queue.Queue(maxsize=256)
+        with self._lock:
+            self._subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue) -> None:
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    def publish(self, event: str, data: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                pass  # slow consumer; drop rather than block synthesis
+
+
+_EVENTS = _EventBus()
+_model_state = "unloaded"
+
+
+def _set_model_state(state: str) -> None:
+    """Record a model state transition and push it to /events subscribers."""
+    global _model_state
+    _model_state = state
+    _EVENTS.publish("state", _server_state())
+
+
+def _server_state() -> dict:
+    return {"server": "ready", "model": _model_state}
+
+
+class _Job:
+    """Progress reporting, stage timing and log fields for one /tts request.
+
+    Stage spans are returned in the Server-Timing response header and, with
+    the other fields, written as one structured JSON log line per request.
+    """
+
+    def __init__(self, request_id: str, engine: str, chars: int):
+        self.request_id = request_id
+        self.engine = engine
+        self.chars = chars
+        self.started = time.monotonic()
+        self.spans: list[tuple[str, float]] = []
+        self.fields: dict = {}
+        # Set once the engine has produced audio; hedging watches this
+        self.first_audio = threading.Event()
+        # Set to ask the engine to stop (the request was won by another engine)
+        self.cancel = threading.Event()
+        # Receives (sample_rate, int16 PCM) chunks as they are synthesized
+        # when the client asked for a streamed response
+        self.pcm_sink: queue.Queue | None = None
+        # (endpoint, request body) of a client request, for traffic capture
+        self.request: tuple[str, dict] | None = None
+
+    def check_cancelled(self) -> None:
+        if self.cancel.is_set():
+            raise _Cancelled(f"{self.engine} synthesis cancelled")
+
+    @contextmanager
+    def span(self, name: str):
+        """Time the enclosed block as stage *name* (a Server-Timing token)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((name, (time.perf_counter() - t0) * 1000))
+
+    def server_timing(self) -> str:
+        total = (time.monotonic() - self.started) * 1000
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.spans]
+        parts.append(f"total;dur={total:.1f}")
+        return ", ".join(parts)
+
+    def log(self, status: int, **extra) -> None:
+        """Write the request's structured log line."""
+        spans: dict[str, float] = {}
+        for name, ms in self.spans:
+            spans[name] = spans.get(name, 0.0) + ms
+        _log.info(json.dumps({
+            "event": "tts",
+            "request_id": self.request_id,
+            "engine": self.engine,
+            "chars": self.chars,
+            "status": status,
+            "total_ms": round((time.monotonic() - self.started) * 1000, 1),
+            "spans": {name: round(ms, 1) for name, ms in spans.items()},
+            **self.fields,
+            **extra,
+        }, ensure_ascii=False))
+        if self.request is not None:
+            _CAPTURE.record(self, status, extra)
+
+    def publish(self, state: str, **extra) -> None:
+        _EVENTS.publish("job", {
+            "request_id": self.request_id,
+            "engine": self.engine,
+            "state": state,
+            "elapsed": round(time.monotonic() - self.started, 3),
+            **extra,
+        })
+
+    def emit_pcm(self, rate: int, pcm) -> None:
+        """Hand a finished chunk of audio to a streaming client, if any."""
+        if self.pcm_sink is not None:
+            self.pcm_sink.put((rate, pcm))
+
+    def audio_started(self) -> None:
+        """Record that the engine has produced its first audio."""
+        if not self.first_audio.is_set():
+            self.fields["first_audio_ms"] = round((time.monotonic() - self.started) * 1000, 1)
+            self.first_audio.set()
+
+    def progress(self, done: int, total: int) -> None:
+        """Report that *done* of *total* chunks are finished."""
+        elapsed = time.monotonic() - self.started
+        if done:
+            self.audio_started()
+        eta = elapsed / done * (total - done) if done else None
+        _EVENTS.publish("progress", {
+            "request_id": self.request_id,
+            "engine": self.engine,
+            "done": done,
+            "total": total,
+            "elapsed": round(elapsed, 3),
+            "eta": round(eta, 3) if eta is not None else None,
+        })
+
+
+class _Cancelled(Exception):
+    """Synthesis stopped because _Job.cancel was set."""
+
+
+# ---------------------------------------------------------------------------
+# Traffic capture
+#
+# With TTS_CAPTURE_PATH set, every /tts and /tts/batch request is appended to
+# that file as one JSON line: start time, engine, text length, params,
+# status and latency.  Texts are replaced by a keyed hash, so rereads of the
+# same passage can be told apart from new text without storing it; set
+# TTS_CAPTURE_TEXT=1 to record the text itself.  tts_replay.py drives a
+# server with such a trace.
+# ---------------------------------------------------------------------------
+
+_CAPTURE_PATH = os.environ.get("TTS_CAPTURE_PATH") or None
+_CAPTURE_TEXT = os.environ.get("TTS_CAPTURE_TEXT") == "1"
+# Hash key; random per run unless set, so hashes only match within one run
+_CAPTURE_SALT = os.environ.get("TTS_CAPTURE_SALT", "").encode() or os.urandom(16)
+# Request keys not recorded: the text (handled above), per-call IDs and
+# local file paths
+_CAPTURE_SKIP_KEYS = ("text", "items", "texts", "request_id", "voice_path")
+
+
+class _Capture:
+    """Appends anonymized request records to a JSONL trace."""
+
+    def __init__(self, path: str | None, keep_text: bool):
+        self.path = path
+        self.keep_text = keep_text
+        self._lock = threading.Lock()
+        self._file = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+            print(f"[TTS] Capturing requests to {path}"
+                  f"{' (with text)' if keep_text else ''}", flush=True)
+
+    def _text(self, text: str) -> dict:
+        if self.keep_text:
+            return {"text": text}
+        digest = hashlib.blake2b(_normalize_text(text).encode("utf-8"),
+                                 key=_CAPTURE_SALT[:64], digest_size=12)
+        return {"text_hash": digest.hexdigest()}
+
+    @staticmethod
+    def _params(data: dict) -> dict:
+        return {k: v for k, v in data.items() if k not in _CAPTURE_SKIP_KEYS}
+
+    def record(self, job: _Job, status: int, extra: dict) -> None:
+        if self._file is None:
+            return
+        endpoint, data = job.request
+        elapsed = time.monotonic() - job.started
+        entry = {
+            "ts": round(time.time() - elapsed, 3),
+            "endpoint": endpoint,
+            "engine": data.get("engine", "chattts"),
+            "served_by": job.engine,
+            "chars": job.chars,
+            "params": self._params(data),
+            "status": status,
+            "latency_ms": round(elapsed * 1000, 1),
+            "first_audio_ms": job.fields.get("first_audio_ms"),
+            "coalesced": "coalesced_with" in job.fields,
+        }
+        if endpoint == "batch":
+            items = data.get("items", data.get("texts")) or []
+            entry["items"] = [
+                {"chars": len(item), **self._text(item)} if isinstance(item, str)
+                else {"chars": len(str(item.get("text", ""))),
+                      **self._text(str(item.get("text", ""))), "params": self._params(item)}
+                for item in items
+            ]
+            entry["failed"] = extra.get("failed")
+        else:
+            entry.update(self._text(data.get("text", "").strip()))
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+
+_CAPTURE = _Capture(_CAPTURE_PATH, _CAPTURE_TEXT)
+
+
+# Origins of the reader's webview (Tauri on macOS/Linux, on Windows, and the
+# Vite dev server) allowed to subscribe to /events from the browser
+_EVENTS_ORIGINS = frozenset(
+    os.environ.get("TTS_EVENTS_ORIGINS",
+                   "tauri://localhost,http://tauri.localhost,https://tauri.localhost,"
+                   "http://localhost:5173").split(","))
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route("/events", methods=["GET"])
+def events():
+    q = _EVENTS.subscribe()
+
+    def stream():
+        try:
+            # Current state first, so a new subscriber never has to poll
+            yield _sse("state", _server_state())
+            while True:
+                try:
+                    event, data = q.get(timeout=_SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(event, data)
+        finally:
+            _EVENTS.unsubscribe(q)
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+        "Vary": "Origin",
+    }
+    # The reader webview runs on a different origin than the sidecar; other
+    # pages may not read the stream
+    origin = request.headers.get("Origin")
+    if origin in _EVENTS_ORIGINS:
+        headers["Access-Control-Allow-Origin"] = origin
+    return Response(stream(), mimetype="text/event-stream", headers=headers)
+
 # ---------------------------------------------------------------------------
 # Edge TTS support
 # ---------------------------------------------------------------------------
@@ -426,58 +743,558 @@ _spk_emb = None  # Female speaker embedding, generated once at model load
 _EDGE_TTS_VOICE = "zh-TW-HsiaoChenNeural"
 
 
-def _edge_tts_synthesize(text: str, voice: str = _EDGE_TTS_VOICE) -> bytes:
-    """Synthesize text to MP3 bytes using edge-tts (Microsoft Edge free TTS)."""
+# Edge TTS is a remote service: bound how long a request may wait on it.
+_EDGE_CONNECT_TIMEOUT = int(os.environ.get("TTS_EDGE_CONNECT_TIMEOUT", "10"))
+_EDGE_TIMEOUT = float(os.environ.get("TTS_EDGE_TIMEOUT", "60"))
+# Optional HTTP proxy for the Edge websocket, e.g. edge_standin.py for testing
+_EDGE_PROXY = os.environ.get("TTS_EDGE_PROXY") or None
+
+
+def _edge_tts_synthesize(text: str, voice: str, out, cancel: threading.Event | None = None,
+                         on_audio=None, rate: float = 1.0) -> int:
+    """Synthesize text to MP3 using edge-tts (Microsoft Edge free TTS).
+
+    Audio is written to the binary file object *out* as it streams in;
+    returns the number of bytes written.  *on_audio* is called once when the
+    first audio arrives; *rate* is the speaking-rate factor.  Raises
+    TimeoutError after _EDGE_TIMEOUT seconds and _Cancelled as soon as
+    *cancel* is set.
+    """
     import edge_tts
 
     async def _run():
-        communicate = edge_tts.Communicate(text, voice)
-        chunks = []
+        communicate = edge_tts.Communicate(
+            text, voice, rate=_edge_rate(rate), proxy=_EDGE_PROXY,
+            connect_timeout=_EDGE_CONNECT_TIMEOUT, receive_timeout=int(_EDGE_TIMEOUT))
+        written = 0
         async for chunk in communicate.stream():
             if chunk["type"] == "audio":
-                chunks.append(chunk["data"])
-        return b"".join(chunks)
+                if not written and on_audio is not None:
+                    on_audio()
+                out.write(chunk["data"])
+                written += len(chunk["data"])
+        return written
+
+    async def _guarded():
+        # Poll so a cancel or the overall deadline interrupts even a stalled socket
+        task = asyncio.ensure_future(_run())
+        deadline = time.monotonic() + _EDGE_TIMEOUT
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=0.1)
+            if done:
+                return task.result()
+            cancelled = cancel is not None and cancel.is_set()
+            if cancelled or time.monotonic() > deadline:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                if cancelled:
+                    raise _Cancelled("edge-tts synthesis cancelled")
+                raise TimeoutError(f"Edge TTS did not finish within {_EDGE_TIMEOUT:.0f}s")
 
     loop = asyncio.new_event_loop()
     try:
-        return loop.run_until_complete(_run())
+        return loop.run_until_complete(_guarded())
     finally:
         loop.close()
 
 # Maximum characters per TTS chunk. ChatTTS works best with short segments;
 # longer inputs are split at sentence boundaries and inferred separately.
+# This is the fallback; POST /calibrate (or --calibrate) measures the best
+# size for this machine and _chunk_max() uses it at runtime.
 _TTS_CHUNK_MAX = 100
 
+# Convert and encode each ChatTTS chunk on a helper thread while the next
+# one is inferred (TTS_PIPELINE=0 runs everything serially)
+_PIPELINE = os.environ.get("TTS_PIPELINE", "1") != "0"
+
 # Female voice seed (known good female voice)
 _VOICE_SEED = 5098
 
 
+# Unload the ChatTTS model after this many idle seconds (0 disables).
+# The reader app mostly shows comics; holding the weights starves load_page.
+_IDLE_UNLOAD_SECONDS = float(os.environ.get("TTS_IDLE_UNLOAD_SECONDS", "600"))
+
+_MODEL_LOCK = threading.RLock()
+_last_used = 0.0
+# "torch" (default) or "onnx": run ChatTTS's GPT forward step, decoder and
+# vocoder on ONNX Runtime's CPU provider (see chattts_onnx.py)
+_CHATTTS_BACKEND = os.environ.get("TTS_CHATTTS_BACKEND", "torch").lower()
+
+_MODEL_STATE = {
+    "source": None,
+    "backend": None,
+    "loads": 0,
+    "unloads": 0,
+    "last_load_seconds": None,
+    "rss_before_unload": None,
+    "rss_after_unload": None,
+}
+
+
+# Pinned local checkpoint (see --pin-checkpoint).  When present, ChatTTS is
+# loaded from here with no hub lookups or per-load checksum pass.
+_CHECKPOINT_DIR = os.environ.get("TTS_CHATTTS_CHECKPOINT_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "asset", "chattts")
+_CHECKPOINT_MANIFEST = "pinned.json"
+
+
+def _pinned_checkpoint_dir() -> str | None:
+    """Return _CHECKPOINT_DIR if it holds a complete pinned checkpoint."""
+    try:
+        with open(os.path.join(_CHECKPOINT_DIR, _CHECKPOINT_MANIFEST), encoding="utf-8") as f:
+            files = json.load(f)["files"]
+    except (OSError, ValueError, KeyError):
+        return None
+    for rel, size in files.items():
+        path = os.path.join(_CHECKPOINT_DIR, rel)
+        if not os.path.isfile(path) or os.path.getsize(path) != size:
+            print(f"[TTS] Pinned checkpoint incomplete ({rel}); ignoring {_CHECKPOINT_DIR}",
+                  flush=True)
+            return None
+    return _CHECKPOINT_DIR
+
+
+def _pin_checkpoint(dest: str = _CHECKPOINT_DIR) -> str:
+    """Copy the ChatTTS snapshot into *dest*, verify it and write the manifest.
+
+    Uses the local Hugging Face cache if it has the snapshot, otherwise
+    downloads it once.  Files are copied (not symlinked into the hub cache)
+    so clearing the cache does not break the pinned checkpoint.
+    """
+    import shutil
+    from pathlib import Path
+
+    import ChatTTS
+    from ChatTTS.utils.dl import check_all_assets
+    from huggingface_hub import snapshot_download
+
+    source = _warm_checkpoint_dir() or snapshot_download(
+        repo_id="2Noise/ChatTTS", allow_patterns=["*.yaml", "*.json", "*.safetensors"])
+    staging = dest.rstrip("/\\") + ".partial"
+    shutil.rmtree(staging, ignore_errors=True)
+    shutil.copytree(source, staging)
+    if not check_all_assets(Path(staging), ChatTTS.Chat().sha256_map, update=False):
+        shutil.rmtree(staging, ignore_errors=True)
+        raise RuntimeError(f"Checksum verification failed for snapshot {source}")
+
+    files = {}
+    for root, _, names in os.walk(staging):
+        for name in names:
+            path = os.path.join(root, name)
+            files[os.path.relpath(path, staging).replace(os.sep, "/")] = os.path.getsize(path)
+    with open(os.path.join(staging, _CHECKPOINT_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({
+            "repo_id": "2Noise/ChatTTS",
+            "revision": os.path.basename(source.rstrip("/\\")),
+            "pinned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "files": files,
+        }, f, indent=2)
+    shutil.rmtree(dest, ignore_errors=True)
+    os.replace(staging, dest)
+    print(f"[TTS] Pinned ChatTTS checkpoint {source} -> {dest}", flush=True)
+    return dest
+
+
+# ChatTTS releases whose loader internals _mmap_weights() patches
+_MMAP_CHATTTS_VERSIONS = ("0.2.",)
+
+
+def _mmap_unsupported() -> str | None:
+    """Why _mmap_weights() can't patch the installed ChatTTS, or None if it can."""
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        installed = version("ChatTTS")
+    except PackageNotFoundError:
+        return "ChatTTS version unknown"
+    if not installed.startswith(_MMAP_CHATTTS_VERSIONS):
+        return f"ChatTTS {installed} is not a tested version for memory-mapped loading"
+    import ChatTTS.core
+    import ChatTTS.model.dvae
+    import ChatTTS.model.embed
+
+    for module in (ChatTTS.core, ChatTTS.model.dvae, ChatTTS.model.embed):
+        if not callable(getattr(module, "load_safetensors", None)):
+            return f"{module.__name__}.load_safetensors not found"
+    for name in ("DVAE", "Embed", "Vocos"):
+        if not isinstance(getattr(ChatTTS.core, name, None), type):
+            return f"ChatTTS.core.{name} not found"
+    if not callable(getattr(ChatTTS.core.Chat, "_load", None)):
+        return "ChatTTS.Chat._load not found"
+    return None
+
+
+@contextmanager
+def _mmap_weights():
+    """Make ChatTTS's own weight loading keep tensors memory-mapped.
+
+    ChatTTS reads each .safetensors file and copies it into freshly allocated
+    parameters.  Inside this context the tensors are instead views of the
+    mapped file (plain tensors, not inference-mode ones, so they can back
+    parameters) and load_state_dict(assign=True) adopts them without a copy.
+
+    This replaces ChatTTS internals for the duration of the block, so it
+    raises RuntimeError up front on a release it hasn't been checked against.
+    """
+    reason = _mmap_unsupported()
+    if reason:
+        raise RuntimeError(reason)
+
+    import torch
+    import ChatTTS.core
+    import ChatTTS.model.dvae
+    import ChatTTS.model.embed
+    from safetensors import safe_open
+
+    def load_safetensors(filename: str) -> dict:
+        with torch.inference_mode(False), safe_open(filename, framework="pt") as f:
+            return {k: f.get_tensor(k) for k in f.keys()}
+
+    def load_state_dict(self, state_dict, strict=True, assign=False):
+        return torch.nn.Module.load_state_dict(self, state_dict, strict=strict, assign=True)
+
+    modules = [ChatTTS.core, ChatTTS.model.dvae, ChatTTS.model.embed]
+    classes = [cls for cls in (ChatTTS.core.DVAE, ChatTTS.core.Embed, ChatTTS.core.Vocos)
+               if "load_state_dict" not in vars(cls)]
+    saved = [module.load_safetensors for module in modules]
+    for module in modules:
+        module.load_safetensors = load_safetensors
+    for cls in classes:
+        cls.load_state_dict = load_state_dict
+    try:
+        yield load_safetensors
+    finally:
+        for module, original in zip(modules, saved):
+            module.load_safetensors = original
+        for cls in classes:
+            del cls.load_state_dict
+
+
+def _load_chat_mmap(new_chat, ckpt_dir: str) -> bool:
+    """Load *new_chat* from a local checkpoint with memory-mapped weights.
+
+    Skips ChatTTS's download/checksum step, and the weights live in the
+    shared OS page cache instead of private copies, so a reload after an
+    idle unload only maps them again.
+    """
+    from dataclasses import asdict
+
+    with _mmap_weights() as load_safetensors:
+        paths = {k: os.path.join(ckpt_dir, v) for k, v in asdict(new_chat.config.path).items()}
+        if not new_chat._load(compile=False, **paths):
+            return False
+
+        # The GPT is loaded by transformers; re-point any copied CPU weights
+        # at the mapped file as well (newer transformers already map them)
+        gpt = getattr(new_chat.gpt, "gpt", None)
+        weights = os.path.join(paths["gpt_ckpt_path"], "model.safetensors")
+        if gpt is not None and os.path.isfile(weights) and "cpu" in str(new_chat.device_gpt):
+            own = gpt.state_dict()
+            mapped = {k: t for k, t in load_safetensors(weights).items()
+                      if k in own and t.dtype == own[k].dtype and t.shape == own[k].shape}
+            gpt.load_state_dict(mapped, strict=False, assign=True)
+    return True
+
+
+def _try_load_chat_mmap(new_chat, ckpt_dir: str) -> bool:
+    """_load_chat_mmap(), logging a warning instead of failing."""
+    try:
+        if _load_chat_mmap(new_chat, ckpt_dir):
+            return True
+        error = "ChatTTS could not load the checkpoint"
+    except Exception as e:
+        error = str(e)
+    _log.warning(json.dumps({"event": "model_load_fallback", "path": ckpt_dir,
+                             "error": error}, ensure_ascii=False))
+    return False
+
+
+def _warm_checkpoint_dir() -> str | None:
+    """Return the locally cached ChatTTS snapshot, without any hub lookup."""
+    try:
+        from huggingface_hub import snapshot_download
+
+        return snapshot_download(repo_id="2Noise/ChatTTS", local_files_only=True)
+    except Exception:
+        return None
+
+
 def get_chat():
     """Lazy-load ChatTTS model on first use with GPU auto-detect."""
-    global chat, _spk_emb
-    if chat is None:
+    global chat, _spk_emb, _last_used
+    with _MODEL_LOCK:
+        _last_used = time.monotonic()
+        if chat is not None:
+            return chat
+
         import ChatTTS
         import torch
 
+        _set_model_state("loading")
+        started = time.perf_counter()
         use_gpu = torch.cuda.is_available()
-        chat = ChatTTS.Chat()
+        new_chat = ChatTTS.Chat()
         # compile=False: torch.compile requires Triton which is not available on Windows
-        # source='huggingface': rvcmd (default downloader) crashes on Windows
-        chat.load(compile=False, source="huggingface")
+        # A pinned checkpoint, or else a warm local snapshot, loads without hub
+        # resolution and with memory-mapped weights (fast reloads after an
+        # idle unload); otherwise fall back to source='huggingface' because
+        # rvcmd (default downloader) crashes on Windows
+        pinned_dir = _pinned_checkpoint_dir()
+        local_dir = pinned_dir or _warm_checkpoint_dir()
+        mapped = True
+        try:
+            if pinned_dir:
+                if not _try_load_chat_mmap(new_chat, pinned_dir):
+                    # ChatTTS's own loader, still from the pinned files
+                    mapped = False
+                    new_chat = ChatTTS.Chat()  # discard the partial load
+                    if not new_chat.load(compile=False, source="custom",
+                                         custom_path=pinned_dir):
+                        raise RuntimeError(
+                            f"Failed to load pinned ChatTTS checkpoint {pinned_dir}")
+                source = "pinned checkpoint"
+            elif local_dir and _try_load_chat_mmap(new_chat, local_dir):
+                source = "local snapshot"
+            else:
+                mapped = False
+                if local_dir:
+                    new_chat = ChatTTS.Chat()  # discard the partial load
+                new_chat.load(compile=False, source="huggingface")
+                source = "huggingface"
+        except Exception:
+            _set_model_state("unloaded")
+            raise
 
-        if use_gpu:
-            print(f"[TTS] Using GPU: {torch.cuda.get_device_name(0)}", flush=True)
-        else:
-            print("[TTS] Using CPU", flush=True)
+        backend, backend_error, onnx_stages = "torch", None, None
+        if _CHATTTS_BACKEND == "onnx":
+            try:
+                import chattts_onnx
+
+                onnx_stages = chattts_onnx.attach(new_chat)
+                backend = "onnx"  # GPT step, decoder and vocoder on ONNX Runtime (CPU)
+            except Exception as e:
+                backend_error = f"ONNX backend unavailable, using PyTorch: {e}"
+        chat = new_chat
+
+        elapsed = time.perf_counter() - started
+        _MODEL_STATE["loads"] += 1
+        _MODEL_STATE["last_load_seconds"] = round(elapsed, 3)
+        _MODEL_STATE["backend"] = backend
+        _MODEL_STATE["source"] = source
+        _log.info(json.dumps({
+            "event": "model_load",
+            "source": source,
+            "path": local_dir if source != "huggingface" else None,
+            "mmap": mapped,
+            "backend": backend,
+            **({"onnx_stages": onnx_stages} if onnx_stages else {}),
+            **({"backend_error": backend_error} if backend_error else {}),
+            "device": torch.cuda.get_device_name(0) if use_gpu else "cpu",
+            "seconds": round(elapsed, 3),
+            "load_count": _MODEL_STATE["loads"],
+            "rss_bytes": _rss_bytes(),
+        }, ensure_ascii=False))
 
         # Generate female speaker embedding (deterministic via seed)
-        torch.manual_seed(_VOICE_SEED)
-        _spk_emb = chat.sample_random_speaker()
-        print(f"[TTS] Female voice loaded (seed {_VOICE_SEED})", flush=True)
+        _spk_emb = speaker_for_seed(_VOICE_SEED)
+
+        _start_idle_watcher()
+        _set_model_state("ready")
 
     return chat
 
 
+# ---------------------------------------------------------------------------
+# Idle model unloading and memory accounting
+# ---------------------------------------------------------------------------
+
+def _rss_bytes() -> int | None:
+    """Resident set size of this process, or None if it can't be measured."""
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class _PMC(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        pmc = _PMC()
+        pmc.cb = ctypes.sizeof(pmc)
+        kernel32 = ctypes.windll.kernel32
+        if kernel32.K32GetProcessMemoryInfo(kernel32.GetCurrentProcess(),
+                                            ctypes.byref(pmc), pmc.cb):
+            return pmc.WorkingSetSize
+    return None
+
+
+def _unload_chat(idle_seconds: float | None = None) -> None:
+    """Drop the ChatTTS model, free its tensors and return memory to the OS.
+
+    With *idle_seconds* set, the model is only dropped if it has been unused
+    that long once no inference is running, so a request that started
+    meanwhile keeps it between its chunks.
+    """
+    global chat, _spk_emb
+    import gc
+
+    # Taking the inference lock first guarantees no infer() is running
+    with _INFER_LOCK, _MODEL_LOCK:
+        if chat is None:
+            return
+        if idle_seconds is not None and time.monotonic() - _last_used <= idle_seconds:
+            return
+        _set_model_state("unloading")
+        rss_before = _rss_bytes()
+        if hasattr(chat, "unload"):
+            chat.unload()
+        chat = None
+        # The per-seed embeddings in _SPEAKERS are plain strings that stay
+        # valid across a reload, so they are kept; get_chat() sets _spk_emb
+        # again from them without resampling
+        _spk_emb = None
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        if sys.platform.startswith("linux"):
+            try:
+                import ctypes
+
+                ctypes.CDLL("libc.so.6").malloc_trim(0)
+            except (OSError, AttributeError):
+                pass
+        rss_after = _rss_bytes()
+        _MODEL_STATE["unloads"] += 1
+        _MODEL_STATE["rss_before_unload"] = rss_before
+        _MODEL_STATE["rss_after_unload"] = rss_after
+        _log.info(json.dumps({"event": "model_unload",
+                              "reason": "idle" if idle_seconds is not None else "requested",
+                              "rss_before": rss_before, "rss_after": rss_after}))
+        _set_model_state("unloaded")
+
+
+_idle_watcher = None
+
+
+def _start_idle_watcher() -> None:
+    """Start the background thread that unloads the model when idle."""
+    global _idle_watcher
+    if _IDLE_UNLOAD_SECONDS <= 0 or _idle_watcher is not None:
+        return
+
+    def _watch():
+        interval = max(1.0, min(30.0, _IDLE_UNLOAD_SECONDS / 4))
+        while True:
+            time.sleep(interval)
+            if chat is not None and time.monotonic() - _last_used > _IDLE_UNLOAD_SECONDS:
+                _unload_chat(_IDLE_UNLOAD_SECONDS)
+
+    _idle_watcher = threading.Thread(target=_watch, name="tts-idle-unload", daemon=True)
+    _idle_watcher.start()
+
+
+def _model_status() -> dict:
+    """Model residency and memory figures reported on /health."""
+    loaded = chat is not None
+    return {
+        "loaded": loaded,
+        "idle_seconds": round(time.monotonic() - _last_used, 1) if loaded else None,
+        "idle_unload_seconds": _IDLE_UNLOAD_SECONDS,
+        **_MODEL_STATE,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Shared ChatTTS scheduling
+#
+# The /tts handler and the voice-tuning web UI (mounted at /webui) share one
+# model.  Inference calls are serialized so concurrent requests don't fight
+# over the CPU threads, and speaker embeddings are sampled once per seed.
+# ---------------------------------------------------------------------------
+
+_INFER_LOCK = threading.Lock()
+_SPEAKER_LOCK = threading.Lock()
+_SPEAKERS: dict[int, str] = {}
+
+
+def speaker_for_seed(seed: int):
+    """Return the (cached) ChatTTS speaker embedding sampled with *seed*."""
+    chat_instance = get_chat()
+    with _SPEAKER_LOCK:
+        if seed not in _SPEAKERS:
+            import torch
+
+            # torch.manual_seed is process-global, hence the lock
+            torch.manual_seed(seed)
+            _SPEAKERS[seed] = chat_instance.sample_random_speaker()
+        return _SPEAKERS[seed]
+
+
+def chattts_infer(texts: list[str], **kwargs):
+    """Run ``chat.infer`` on the shared model, one inference at a time.
+
+    The model is (re)loaded inside the lock, so an idle unload can never
+    happen between fetching the instance and running inference.
+    """
+    global _last_used
+    with _INFER_LOCK:
+        try:
+            return get_chat().infer(texts, **kwargs)
+        finally:
+            _last_used = time.monotonic()
+
+
+def chattts_infer_stream(texts: list[str], on_piece, **kwargs) -> list:
+    """Run ``chat.infer(stream=True)``; returns the stitched waveform per text.
+
+    ChatTTS decodes every few dozen audio tokens and yields the new samples
+    of each row; *on_piece(row, wav)* is called with each non-empty piece as
+    it arrives.  Near-silent samples are dropped from the pieces the same way
+    the non-streaming ``infer`` drops them from whole waveforms.
+    """
+    import numpy as np
+
+    global _last_used
+    with _INFER_LOCK:
+        try:
+            pieces: list[list] = [[] for _ in texts]
+            for wavs in get_chat().infer(texts, stream=True, **kwargs):
+                for row, wav in enumerate(wavs):
+                    wav = np.asarray(wav).reshape(-1)
+                    wav = wav[np.abs(wav) > np.float32(1e-5)]
+                    if len(wav):
+                        pieces[row].append(wav)
+                        on_piece(row, wav)
+            return [np.concatenate(p) if p else np.zeros(0, dtype=np.float32) for p in pieces]
+        finally:
+            _last_used = time.monotonic()
+
+
 # ---------------------------------------------------------------------------
 # Index-TTS subprocess helper (runs in its own venv to avoid dep conflicts)
 # ---------------------------------------------------------------------------
@@ -485,101 +1302,300 @@ def get_chat():
 _DEFAULT_VOICE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "voices", "default.wav")
 
 
-def _indextts_infer(text: str, voice_path: str, output_path: str) -> None:
-    """Run Index-TTS inference via subprocess in its own venv.
+_INDEXTTS_TIMEOUT = float(os.environ.get("TTS_INDEXTTS_TIMEOUT", "600"))
+
+# Runs inside the Index-TTS venv.  The model is loaded once; each request is
+# a JSON line on stdin and each reply a JSON line on stdout, followed by the
+# raw int16 PCM it announces.  Library output is redirected to stderr so that
+# stdout only carries replies.
+_INDEXTTS_WORKER_SCRIPT = f"""\
+import json, os, sys
+os.chdir(r'{_INDEXTTS_DIR}')
+out = os.fdopen(os.dup(1), 'wb')
+os.dup2(2, 1)
+from indextts.infer import IndexTTS
+tts = IndexTTS(model_dir='checkpoints', cfg_path='checkpoints/config.yaml')
+
+def reply(header, data=b''):
+    out.write((json.dumps(header) + '\\n').encode())
+    out.write(data)
+    out.flush()
+
+reply({{'ready': True}})
+for line in sys.stdin:
+    req = json.loads(line)
+    try:
+        rate, wav = tts.infer(audio_prompt=req['voice'], text=req['text'], output_path=None)
+        data = wav.astype('<i2').tobytes()
+        reply({{'ok': True, 'sample_rate': rate, 'bytes': len(data)}}, data)
+    except Exception as e:
+        reply({{'ok': False, 'error': f'{{type(e).__name__}}: {{e}}'}})
+"""
+
+
+class _IndexTTSWorker:
+    """Long-lived Index-TTS process in its own venv, started on first use.
 
-    Uses the probe-verified Python interpreter found at startup.
+    Loading the model dominates a one-shot run, so the process is kept and
+    fed one chunk at a time.  It is stopped after _IDLE_UNLOAD_SECONDS idle.
     """
-    # Ensure the helper Python script exists
-    helper_py = os.path.join(_INDEXTTS_DIR, "_run_infer.py")
-    if not os.path.isfile(helper_py):
-        with open(helper_py, "w", encoding="utf-8") as f:
-            f.write(
-                "import sys, os\n"
-                f"os.chdir(r'{_INDEXTTS_DIR}')\n"
-                "from indextts.infer import IndexTTS\n"
-                "tts = IndexTTS(model_dir='checkpoints', cfg_path='checkpoints/config.yaml')\n"
-                "tts.infer(audio_prompt=sys.argv[1], text=sys.argv[2], output_path=sys.argv[3])\n"
+
+    def __init__(self):
+        self._proc: _sp.Popen | None = None
+        self._lock = threading.Lock()
+        self._stderr: list[str] = []
+        self._last_used = 0.0
+
+    def _start(self, job: _Job) -> _sp.Popen:
+        # Keep the helper script in sync with this version of the server
+        helper_py = os.path.join(_INDEXTTS_DIR, "_tts_worker.py")
+        try:
+            with open(helper_py, encoding="utf-8") as f:
+                current = f.read()
+        except OSError:
+            current = None
+        if current != _INDEXTTS_WORKER_SCRIPT:
+            with job.span("helper_write"), open(helper_py, "w", encoding="utf-8") as f:
+                f.write(_INDEXTTS_WORKER_SCRIPT)
+
+        site_pkgs = os.path.join(_INDEXTTS_VENV_DIR, "Lib", "site-packages")
+        env = os.environ.copy()
+        # Remove Python env vars that could conflict with the venv's Python 3.10
+        for key in ("PYTHONHOME", "PYTHONPATH", "PYTHONEXECUTABLE",
+                    "_MEIPASS", "_MEIPASS2", "_PYI_SPLASH_IPC"):
+            env.pop(key, None)
+        env["PYTHONPATH"] = site_pkgs
+        env["PYTHONIOENCODING"] = "utf-8"
+
+        python_exe = _INDEXTTS_VERIFIED_PYTHON
+        job.fields["python"] = python_exe
+        with job.span("model_load"):
+            proc = _sp.Popen(
+                [python_exe, helper_py],
+                cwd=_INDEXTTS_DIR,
+                stdin=_sp.PIPE,
+                stdout=_sp.PIPE,
+                stderr=_sp.PIPE,
+                env=env,
             )
+            self._stderr = []
+            threading.Thread(target=self._drain_stderr, args=(proc,),
+                             name="tts-indextts-stderr", daemon=True).start()
+            self._proc = proc
+            self._read_reply()  # {"ready": true} once the model is loaded
+        _log.info(json.dumps({"event": "indextts_worker", "state": "started", "pid": proc.pid}))
+        if _IDLE_UNLOAD_SECONDS > 0:
+            threading.Thread(target=self._watch_idle, args=(proc,),
+                             name="tts-indextts-idle", daemon=True).start()
+        return proc
 
-    site_pkgs = os.path.join(_INDEXTTS_VENV_DIR, "Lib", "site-packages")
-    env = os.environ.copy()
-    # Remove Python env vars that could conflict with the venv's Python 3.10
-    for key in ("PYTHONHOME", "PYTHONPATH", "PYTHONEXECUTABLE",
-                "_MEIPASS", "_MEIPASS2", "_PYI_SPLASH_IPC"):
-        env.pop(key, None)
-    env["PYTHONPATH"] = site_pkgs
-    env["PYTHONIOENCODING"] = "utf-8"
-
-    python_exe = _INDEXTTS_VERIFIED_PYTHON
-    print(f"[TTS] Index-TTS subprocess: python={python_exe}", flush=True)
-    result = _sp.run(
-        [python_exe, helper_py, voice_path, text, output_path],
-        cwd=_INDEXTTS_DIR,
-        capture_output=True,
-        text=True,
-        timeout=600,
-        env=env,
-        encoding="utf-8",
-        errors="replace",
-    )
-    if result.returncode != 0:
-        raise RuntimeError(
-            f"Index-TTS failed: {result.stderr[-500:] if result.stderr else 'unknown error'}"
-        )
+    def _drain_stderr(self, proc: _sp.Popen) -> None:
+        for line in proc.stderr:
+            self._stderr.append(line.decode("utf-8", "replace"))
+            del self._stderr[:-50]
 
+    def _watch_idle(self, proc: _sp.Popen) -> None:
+        interval = max(1.0, min(30.0, _IDLE_UNLOAD_SECONDS / 4))
+        while proc.poll() is None:
+            time.sleep(interval)
+            with self._lock:
+                if (proc is self._proc
+                        and time.monotonic() - self._last_used > _IDLE_UNLOAD_SECONDS):
+                    _log.info(json.dumps({"event": "indextts_worker", "state": "idle_stop",
+                                          "pid": proc.pid}))
+                    self._stop()
 
-def _split_text(text: str, max_len: int = _TTS_CHUNK_MAX) -> list[str]:
-    """Split *text* into chunks of roughly *max_len* chars at sentence boundaries.
+    def _read_reply(self) -> dict:
+        """Read one reply header; the process is killed if it takes too long."""
+        proc = self._proc
+        timer = threading.Timer(_INDEXTTS_TIMEOUT, proc.kill)
+        timer.start()
+        try:
+            line = proc.stdout.readline()
+        finally:
+            timer.cancel()
+        if not line:
+            self._stop()
+            raise RuntimeError(
+                f"Index-TTS failed: {''.join(self._stderr)[-500:] or 'worker exited'}")
+        return json.loads(line)
+
+    def synthesize(self, text: str, voice_path: str, job: _Job):
+        """Synthesize *text*; returns (sample_rate, int16 PCM array)."""
+        import numpy as np
+
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._start(job)
+            self._proc.stdin.write((json.dumps({"voice": voice_path, "text": text},
+                                               ensure_ascii=False) + "\n").encode("utf-8"))
+            self._proc.stdin.flush()
+            reply = self._read_reply()
+            self._last_used = time.monotonic()
+            if not reply["ok"]:
+                raise RuntimeError(f"Index-TTS failed: {reply['error']}")
+            data = self._proc.stdout.read(reply["bytes"])
+            if len(data) != reply["bytes"]:
+                self._stop()
+                raise RuntimeError("Index-TTS worker exited mid-reply")
+        return reply["sample_rate"], np.frombuffer(data, dtype=np.int16)
+
+    def _stop(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.poll() is None:
+            proc.stdin.close()
+            try:
+                proc.wait(timeout=5)
+            except _sp.TimeoutExpired:
+                proc.kill()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stop()
 
-    Tries to break at Chinese/English sentence-ending punctuation first,
-    then at commas / clause breaks, and finally hard-cuts if a segment is
-    still too long.
-    """
-    if len(text) <= max_len:
-        return [text]
 
+_INDEXTTS_WORKER = _IndexTTSWorker()
+
+
+def _split_segments(text: str, max_len: int = _TTS_CHUNK_MAX) -> list[str]:
+    """Split *text* into sentence-level segments of at most *max_len* chars.
+
+    Breaks at Chinese/English sentence-ending punctuation; a sentence that is
+    still too long is broken at commas / clause breaks, and finally hard-cut.
+    Segments are the unit of the per-sentence audio cache, so the same
+    sentence yields the same segment regardless of what surrounds it.
+    """
     # Split on sentence-ending punctuation (keep the delimiter with the chunk)
     parts = re.split(r"(?<=[。！？.!?\n])", text)
-    chunks: list[str] = []
-    current = ""
+    segments: list[str] = []
 
     for part in parts:
-        if not part:
+        if not part.strip():
             continue
-        if len(current) + len(part) <= max_len:
-            current += part
-        else:
-            if current:
-                chunks.append(current)
-            # If this single part exceeds max_len, split further at commas
-            if len(part) > max_len:
-                sub_parts = re.split(r"(?<=[，,、；;：:\s])", part)
-                for sp in sub_parts:
-                    if not sp:
-                        continue
-                    if len(current) + len(sp) <= max_len:
-                        current += sp
-                    else:
-                        if current:
-                            chunks.append(current)
-                        # Hard-cut if still too long
-                        while len(sp) > max_len:
-                            chunks.append(sp[:max_len])
-                            sp = sp[max_len:]
-                        current = sp
+        if len(part) <= max_len:
+            segments.append(part)
+            continue
+        # This single sentence exceeds max_len, split further at commas
+        current = ""
+        for sp in re.split(r"(?<=[，,、；;：:\s])", part):
+            if not sp:
+                continue
+            if len(current) + len(sp) <= max_len:
+                current += sp
             else:
-                current = part
+                if current:
+                    segments.append(current)
+                # Hard-cut if still too long
+                while len(sp) > max_len:
+                    segments.append(sp[:max_len])
+                    sp = sp[max_len:]
+                current = sp
+        if current:
+            segments.append(current)
 
+    return [seg for seg in segments if seg.strip()]
+
+
+def _pack_segments(segments: list[str], max_len: int = _TTS_CHUNK_MAX) -> list[list[int]]:
+    """Group consecutive segment indices into chunks of roughly *max_len* chars."""
+    groups: list[list[int]] = []
+    current: list[int] = []
+    size = 0
+    for i, seg in enumerate(segments):
+        if current and size + len(seg) > max_len:
+            groups.append(current)
+            current, size = [], 0
+        current.append(i)
+        size += len(seg)
     if current:
-        chunks.append(current)
+        groups.append(current)
+    return groups
+
+
+def _split_text(text: str, max_len: int | None = None) -> list[str]:
+    """Split *text* into chunks of roughly *max_len* chars at sentence boundaries.
+
+    Tries to break at Chinese/English sentence-ending punctuation first,
+    then at commas / clause breaks, and finally hard-cuts if a segment is
+    still too long.  *max_len* defaults to the calibrated ChatTTS chunk size.
+    """
+    if max_len is None:
+        max_len = _chunk_max("chattts")
+    if len(text) <= max_len:
+        return [text]
+
+    segments = _split_segments(text, max_len)
+    return ["".join(segments[i] for i in group)
+            for group in _pack_segments(segments, max_len)]
+
+
+# ---------------------------------------------------------------------------
+# Sentence-level audio cache
+#
+# Users often extend or shift a selection by a sentence.  ChatTTS audio is
+# kept per (voice, params, normalized sentence) so an overlapping selection
+# only synthesizes the sentences that were not heard before.
+# ---------------------------------------------------------------------------
+
+_SEGMENT_CACHE_MAX_BYTES = int(os.environ.get("TTS_SEGMENT_CACHE_MB", "128")) * 1024 * 1024
+
+
+class _SegmentCache:
+    """Byte-bounded LRU of synthesized int16 PCM segments."""
+
+    def __init__(self, max_bytes: int):
+        from collections import OrderedDict
+
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[tuple, object]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            pcm = self._items.get(key)
+            if pcm is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return pcm
+
+    def put(self, key: tuple, pcm) -> None:
+        if pcm.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._items[key] = pcm
+            self._bytes += pcm.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= evicted.nbytes
 
-    return [c for c in chunks if c.strip()]
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_SEGMENTS = _SegmentCache(_SEGMENT_CACHE_MAX_BYTES)
 
 
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok"})
+    body = {"status": "ok", "rss_bytes": _rss_bytes()}
+    if _CHATTTS_AVAILABLE:
+        body["model"] = _model_status()
+    return jsonify(body)
 
 
 @app.route("/test_voice", methods=["POST"])
@@ -592,20 +1608,17 @@ def test_voice():
 
     import ChatTTS as ChatTTSModule
     import numpy as np
-    import torch
 
     data = request.get_json(silent=True) or {}
-    seed = data.get("seed", 3333)
+    seed = int(data.get("seed", 3333))
     text = data.get("text", "你好，我是語音助手，很高興認識你。")
 
     try:
-        chat_instance = get_chat()
-        torch.manual_seed(seed)
-        test_spk = chat_instance.sample_random_speaker()
+        test_spk = speaker_for_seed(seed)
         params = ChatTTSModule.Chat.InferCodeParams(
             spk_emb=test_spk, temperature=0.3, top_P=0.7, top_K=20,
         )
-        wavs = chat_instance.infer([text], params_infer_code=params)
+        wavs = chattts_infer([text], params_infer_code=params)
         audio_data = np.clip(wavs[0], -1.0, 1.0)
         pcm16 = (audio_data * 32767).astype(np.int16)
         buf = io.BytesIO()
@@ -615,164 +1628,2497 @@ def test_voice():
             wf.setframerate(24000)
             wf.writeframes(pcm16.tobytes())
         audio_b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
-        print(f"[TTS] Test voice seed={seed} OK", flush=True)
         return jsonify({"audio": audio_b64, "format": "wav", "seed": seed})
     except Exception as e:
         import traceback
         return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
 
 
-@app.route("/tts", methods=["POST"])
-def tts():
-    data = request.get_json(silent=True) or {}
-    text = data.get("text", "").strip()
-    engine = data.get("engine", "chattts")  # "chattts", "edge-tts", or "index-tts"
-    if not text:
-        return jsonify({"error": "No text provided"}), 400
+def _normalize_text(text: str) -> str:
+    """Clean *text* for ChatTTS: remove characters it can't handle.
 
-    try:
-        # ---- Edge TTS (cloud-based, fast, no model needed) ----
-        if engine == "edge-tts":
-            voice = data.get("voice", _EDGE_TTS_VOICE)
-            print(f"[TTS] Edge TTS: {len(text)} chars, voice={voice}", flush=True)
-            mp3_bytes = _edge_tts_synthesize(text, voice)
-            audio_b64 = base64.b64encode(mp3_bytes).decode("utf-8")
-            return jsonify({"audio": audio_b64, "format": "mp3"})
-
-        # ---- Index-TTS (local voice cloning, runs in separate venv) ----
-        if engine == "index-tts":
-            if not _INDEXTTS_AVAILABLE:
-                return jsonify({
-                    "error": "Index-TTS is not available. "
-                             "Set up with: cd python && git clone https://github.com/index-tts/index-tts.git "
-                             "&& cd index-tts && uv sync --all-extras"
-                }), 400
-
-            import tempfile
-
-            voice_path = data.get("voice_path", _DEFAULT_VOICE_PATH)
-            if not os.path.isfile(voice_path):
-                return jsonify({
-                    "error": f"Voice reference file not found: {voice_path}. "
-                             f"Place a WAV file at {_DEFAULT_VOICE_PATH} or pick one in the UI."
-                }), 400
-
-            print(f"[TTS] Index-TTS: {len(text)} chars, voice={os.path.basename(voice_path)}",
-                  flush=True)
+    The result is also used as the text part of the single-flight key, so
+    selections that differ only in whitespace or quote style coalesce.
+    """
+    text = re.sub(r"\r\n?", "\n", text)          # normalize line endings
+    text = text.replace("\u3000", " ")             # full-width space → normal space
+    text = re.sub(r"[^\S ]+", " ", text)           # collapse whitespace to space
+    text = re.sub(r"[""''「」『』【】]", "", text)  # remove fancy quotes/brackets
+    text = re.sub(r"[a-zA-Z0-9]+", lambda m: " " + m.group() + " ", text)  # pad alphanumeric
+    text = re.sub(r"([。！？!?]){2,}", r"\1", text)  # deduplicate ending punctuation
+    text = re.sub(r"\s+", " ", text).strip()       # collapse multiple spaces
+    return text
 
-            tmp_fd, tmp_path = tempfile.mkstemp(suffix=".wav")
-            os.close(tmp_fd)
-            try:
-                _indextts_infer(text, voice_path, tmp_path)
-                with open(tmp_path, "rb") as f:
-                    wav_bytes = f.read()
-                audio_b64 = base64.b64encode(wav_bytes).decode("utf-8")
-                return jsonify({"audio": audio_b64, "format": "wav"})
-            finally:
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
 
-        # ---- ChatTTS (local model, offline) ----
+# ---------------------------------------------------------------------------
+# Server statistics and single-flight request coalescing
+#
+# Double clicks on the floating TTS button (or the same selection sent from
+# two windows) would otherwise run identical inference concurrently.  The
+# first request for a key becomes the leader and synthesizes; followers with
+# the same key block until the leader finishes and reuse its result.
+# ---------------------------------------------------------------------------
+
+_STATS_LOCK = threading.Lock()
+_STATS = {
+    "requests": 0,   # /tts requests that passed validation
+    "coalesced": 0,  # requests that waited on an identical in-flight request
+    "batch_items": 0,  # texts received through /tts/batch
+}
+
+
+def _stat_incr(name: str, n: int = 1) -> None:
+    with _STATS_LOCK:
+        _STATS[name] = _STATS.get(name, 0) + n
+
+
+class _Flight:
+    """A synthesis in progress that identical requests can wait on."""
+
+    def __init__(self, leader_id: str):
+        self.leader_id = leader_id
+        self.done = threading.Event()
+        self.result: tuple[dict, int] | None = None
+        self.waiters = 0
+
+
+_INFLIGHT: dict[tuple, _Flight] = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+
+def _request_key(engine: str, voice, data: dict, text: str) -> tuple:
+    """Build the coalescing key (engine, voice, params, normalized text)."""
+    params = tuple(sorted(
+        (k, json.dumps(v, sort_keys=True, ensure_ascii=False))
+        for k, v in data.items()
+        if k not in ("text", "engine", "voice", "voice_path", "request_id")
+    ))
+    return (engine, voice, params, _normalize_text(text))
+
+
+def _single_flight(key: tuple, fn, job: _Job) -> tuple[dict, int]:
+    """Run ``fn()`` once per *key*; concurrent callers share its result."""
+    with _INFLIGHT_LOCK:
+        flight = _INFLIGHT.get(key)
+        leader = flight is None
+        if leader:
+            flight = _INFLIGHT[key] = _Flight(job.request_id)
+        else:
+            flight.waiters += 1
+
+    if not leader:
+        _stat_incr("coalesced")
+        # Progress events for this request are published under the leader's ID
+        job.publish("coalesced", leader=flight.leader_id)
+        job.fields["coalesced_with"] = flight.leader_id
+        with job.span("coalesced_wait"):
+            flight.done.wait()
+        return flight.result
+
+    try:
+        flight.result = fn()
+        return flight.result
+    finally:
+        with _INFLIGHT_LOCK:
+            _INFLIGHT.pop(key, None)
+        if flight.result is None:
+            flight.result = ({"error": "Coalesced request failed"}, 500)
+        flight.done.set()
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    with _STATS_LOCK:
+        snapshot = dict(_STATS)
+    with _INFLIGHT_LOCK:
+        snapshot["inflight"] = len(_INFLIGHT)
+    snapshot["segment_cache"] = _SEGMENTS.stats()
+    snapshot["results"] = _RESULTS.stats()
+    snapshot["chunk_max"] = {engine: _chunk_max(engine) for engine in _CALIBRATORS}
+    snapshot["admission"] = _ADMISSION.status()
+    return jsonify(snapshot)
+
+
+# ---------------------------------------------------------------------------
+# On-disk result store
+#
+# Synthesized audio is written straight to a file here instead of being
+# assembled in memory.  Small results are returned inline as base64 (and the
+# file dropped); large ones, or any request with "spool": true, get a result
+# ID and a URL that supports HTTP Range requests so players can stream/seek.
+# ---------------------------------------------------------------------------
+
+_RESULT_DIR = os.environ.get("TTS_RESULT_DIR") or os.path.join(
+    tempfile.gettempdir(), "comic-viewer-tts")
+_RESULT_TTL_SECONDS = float(os.environ.get("TTS_RESULT_TTL_SECONDS", "1800"))
+# Results above this size are spooled even if the client didn't ask
+_SPOOL_THRESHOLD_BYTES = int(float(os.environ.get("TTS_SPOOL_THRESHOLD_MB", "4")) * 1024 * 1024)
+
+_AUDIO_MIMETYPES = {"mp3": "audio/mpeg", "wav": "audio/wav"}
+
+
+class _ResultStore:
+    """Audio files on disk, addressed by result ID and expired after a TTL.
+
+    With *max_entries* set, the oldest results are dropped once the store
+    holds more than that many.
+    """
+
+    def __init__(self, directory: str, ttl: float, max_entries: int | None = None):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        os.makedirs(directory, exist_ok=True)
+        # Expired files left behind by a previous run are never referenced again
+        cutoff = time.time() - ttl
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+            except OSError:
+                pass
+
+    def create(self, fmt: str) -> tuple[str, str]:
+        """Reserve a new result; returns (result_id, path to write to)."""
+        self.sweep()
+        result_id = uuid.uuid4().hex
+        path = os.path.join(self.directory, f"{result_id}.{fmt}")
+        with self._lock:
+            self._entries[result_id] = {
+                "path": path,
+                "format": fmt,
+                "expires": time.monotonic() + self.ttl,
+            }
+            excess = len(self._entries) - self.max_entries if self.max_entries else 0
+            evicted = list(self._entries)[:max(excess, 0)]
+        for old_id in evicted:
+            self.discard(old_id)
+        return result_id, path
+
+    def get(self, result_id: str) -> dict | None:
+        """Look up a live result, extending its lifetime."""
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is None or entry["expires"] < time.monotonic():
+                return None
+            entry["expires"] = time.monotonic() + self.ttl
+            return dict(entry)
+
+    def discard(self, result_id: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(result_id, None)
+        if entry is not None:
+            try:
+                os.unlink(entry["path"])
+            except OSError:
+                pass
+
+    def sweep(self) -> None:
+        """Delete expired results (at most once a minute)."""
+        now = time.monotonic()
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        with self._lock:
+            expired = [rid for rid, e in self._entries.items() if e["expires"] < now]
+        for result_id in expired:
+            self.discard(result_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            paths = [e["path"] for e in self._entries.values()]
+        return {
+            "entries": len(paths),
+            "bytes": sum(os.path.getsize(p) for p in paths if os.path.exists(p)),
+            "directory": self.directory,
+        }
+
+
+_RESULTS = _ResultStore(_RESULT_DIR, _RESULT_TTL_SECONDS)
+
+
+def _deliver(body: dict, spool: bool | None, job: _Job) -> dict:
+    """Turn a stored result into the response body.
+
+    *spool* True returns a URL, False inlines base64, None decides by size.
+    """
+    result_id = body.pop("result_id")
+    entry = _RESULTS.get(result_id)
+    size = os.path.getsize(entry["path"])
+    if spool is None:
+        spool = size > _SPOOL_THRESHOLD_BYTES
+    if spool:
+        body.update({
+            "result_id": result_id,
+            "url": f"/results/{result_id}.{entry['format']}",
+            "bytes": size,
+        })
+        return body
+
+    with job.span("base64"):
+        with open(entry["path"], "rb") as f:
+            body["audio"] = base64.b64encode(f.read()).decode("utf-8")
+        _RESULTS.discard(result_id)
+    return body
+
+
+@app.route("/results/<name>", methods=["GET"])
+def results(name: str):
+    result_id = name.partition(".")[0]
+    entry = _RESULTS.get(result_id)
+    if entry is None:
+        return jsonify({"error": "Result not found or expired"}), 404
+    # conditional=True makes Werkzeug answer Range / If-Range requests
+    return send_file(entry["path"], mimetype=_AUDIO_MIMETYPES[entry["format"]],
+                     conditional=True, max_age=0)
+
+
+# ---------------------------------------------------------------------------
+# Time-stretching
+#
+# "rate" changes the speaking rate without resynthesizing: WAV results are
+# re-timed with WSOLA (waveform-similarity overlap-add), which keeps pitch
+# and costs a millisecond or two of NumPy per second of audio.  Edge TTS
+# returns MP3, so it is asked for the rate natively instead.  Combined with
+# the sentence cache, re-requesting a passage at another rate skips the
+# model entirely, and POST /results/<id>/stretch re-times a stored result.
+# ---------------------------------------------------------------------------
+
+_STRETCH_RATES = (0.5, 2.0)
+_STRETCH_FRAME_MS = 20
+
+
+def _parse_rate(value) -> float:
+    """Validate a requested speaking rate (1.0 = as synthesized)."""
+    try:
+        rate = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"rate must be a number, got {value!r}") from None
+    lo, hi = _STRETCH_RATES
+    if not lo <= rate <= hi:
+        raise ValueError(f"rate must be between {lo} and {hi}")
+    return rate
+
+
+def _edge_rate(rate: float) -> str:
+    """Edge TTS's rate string ("+25%") for a speaking-rate factor."""
+    return f"{round((rate - 1) * 100):+d}%"
+
+
+class _Stretcher:
+    """WSOLA time-stretch of int16 audio that arrives in pieces.
+
+    feed() takes consecutive pieces of one signal and returns the re-timed
+    audio that is final so far; flush() returns the rest.  Frames that
+    straddle a piece boundary are searched and overlap-added as if the
+    pieces were one array, so a streamed response has no seams and matches
+    stretching the whole signal at once.
+
+    Output frames are laid down every half frame; each is taken from near
+    its nominal input position, shifted (within a quarter frame) to the
+    offset that best continues the previous frame's waveform, so the
+    overlap-add stays in phase.
+    """
+
+    def __init__(self, rate: float, sample_rate: int = 24000):
+        import numpy as np
+
+        self.rate = rate
+        self.n = n = sample_rate * _STRETCH_FRAME_MS // 1000 // 2 * 2
+        self.hop, self.tol = n // 2, n // 4
+        # Periodic Hann windows at 50% overlap sum to one
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n) / n)).astype(np.float32)
+        # Input padded so the first frame is centred on sample 0; self.x
+        # holds the padded input from position self.base on
+        self.x = np.zeros(self.tol + self.hop, dtype=np.float32)
+        self.base = 0
+        self.received = 0
+        self.k = 0  # next output frame
+        self.prev = 0  # padded input position of the previous frame
+        self.tail = np.zeros(self.hop, dtype=np.float32)  # last frame's second half
+        self.emitted = 0
+
+    def _nominal(self, k: int) -> int:
+        return self.tol + int(round(k * self.hop * self.rate))
+
+    def _input(self, start: int, length: int):
+        """Padded input [start, start + length), zeros past what has arrived."""
+        import numpy as np
+
+        end = start + length - self.base
+        if end > len(self.x):
+            self.x = np.concatenate([self.x, np.zeros(end - len(self.x), dtype=np.float32)])
+        return self.x[start - self.base:end]
+
+    def _frames(self, limit: int | None):
+        """Lay down frames up to *limit* (None: as far as the input allows)."""
+        import numpy as np
+
+        n, hop, tol = self.n, self.hop, self.tol
+        available = tol + hop + self.received
+        starts = []
+        while limit is None or self.k < limit:
+            if self.k == 0:
+                start = tol
+                if limit is None and start + n > available:
+                    break
+            else:
+                lo = self._nominal(self.k) - tol
+                if limit is None and max(lo + 2 * tol, self.prev + hop) + n > available:
+                    break
+                scores = np.correlate(self._input(lo, 2 * tol + n),
+                                      self._input(self.prev + hop, n))
+                start = lo + int(np.argmax(scores))
+            starts.append(start)
+            self.prev = start
+            self.k += 1
+        if not starts:
+            return np.zeros(0, dtype=np.float32)
+
+        m = len(starts)
+        segments = np.stack([self._input(start, n) for start in starts]) * self.window
+        y = np.zeros((m + 1) * hop, dtype=np.float32)
+        y[:m * hop].reshape(m, hop)[:] += segments[:, :hop]
+        y[hop:].reshape(m, hop)[:] += segments[:, hop:]
+        y[:hop] += self.tail
+        self.tail = y[m * hop:].copy()
+        out = y[:m * hop]
+        if self.k == m:
+            out = out[hop:]  # the first half frame precedes sample 0
+
+        # Input before the next frame's search window and template is done
+        keep = min(self._nominal(self.k) - tol, self.prev + hop)
+        if keep > self.base:
+            self.x = self.x[keep - self.base:]
+            self.base = keep
+        return out
+
+    def _pcm(self, y):
+        import numpy as np
+
+        self.emitted += len(y)
+        return np.clip(y, -32768, 32767).astype(np.int16)
+
+    def feed(self, pcm):
+        """Add the next piece of input; returns the output that is final."""
+        import numpy as np
+
+        self.x = np.concatenate([self.x, np.asarray(pcm, dtype=np.float32)])
+        self.received += len(pcm)
+        return self._pcm(self._frames(None))
+
+    def flush(self):
+        """End of input: returns the rest of the output."""
+        out_len = int(round(self.received / self.rate))
+        y = self._frames(out_len // self.hop + 2)
+        return self._pcm(y[:max(0, out_len - self.emitted)])
+
+
+def _time_stretch(pcm, rate: float, sample_rate: int = 24000):
+    """Return int16 *pcm* played *rate* times as fast, at the same pitch."""
+    import numpy as np
+
+    if abs(rate - 1.0) < 1e-3 or len(pcm) == 0:
+        return pcm
+    stretcher = _Stretcher(rate, sample_rate)
+    return np.concatenate([stretcher.feed(pcm), stretcher.flush()])
+
+
+def _stretch_wav(path: str, rate: float, job: _Job) -> str:
+    """Write a re-timed copy of the WAV at *path*; returns its result ID."""
+    import numpy as np
+    import wave
+
+    with job.span("stretch"):
+        with wave.open(path, "rb") as wf:
+            sample_rate = wf.getframerate()
+            pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        stretched = _time_stretch(pcm, rate, sample_rate)
+    return _write_wav_result([stretched], job, sample_rate)
+
+
+def _stretch_result(body: dict, rate: float, job: _Job) -> dict:
+    """Replace the WAV result in *body* with a copy re-timed by *rate*."""
+    if rate == 1.0 or body.get("format") != "wav":
+        return body
+    result_id = body["result_id"]
+    body["result_id"] = _stretch_wav(_RESULTS.get(result_id)["path"], rate, job)
+    body["rate"] = rate
+    _RESULTS.discard(result_id)
+    return body
+
+
+@app.route("/results/<name>/stretch", methods=["POST"])
+def results_stretch(name: str):
+    """Re-time a stored result: {"rate": 1.25, "spool": true}.
+
+    The original is kept; the response describes a new result like /tts.
+    """
+    data = request.get_json(silent=True) or {}
+    result_id = name.partition(".")[0]
+    entry = _RESULTS.get(result_id)
+    if entry is None:
+        return jsonify({"error": "Result not found or expired"}), 404
+    if entry["format"] != "wav":
+        return jsonify({"error": "Only WAV results can be stretched; "
+                                 "request Edge TTS again with \"rate\""}), 400
+    try:
+        rate = _parse_rate(data.get("rate", 1.0))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    job = _Job(uuid.uuid4().hex[:12], "stretch", 0)
+    body = {"result_id": _stretch_wav(entry["path"], rate, job), "format": "wav", "rate": rate}
+    body = _deliver(body, data.get("spool", True), job)
+    job.log(200, rate=rate, source=result_id)
+    resp = jsonify(body)
+    resp.headers["Server-Timing"] = job.server_timing()
+    return resp
+
+
+# ---------------------------------------------------------------------------
+# Per-engine synthesis (each returns a (json_body, http_status) pair)
+# ---------------------------------------------------------------------------
+
+def _synthesize_edge(text: str, voice: str, job: _Job, rate: float = 1.0) -> tuple[dict, int]:
+    """Edge TTS (cloud-based, fast, no model needed)."""
+    job.fields["voice"] = voice
+    result_id, path = _RESULTS.create("mp3")
+    try:
+        with job.span("edge_synth"), open(path, "wb") as f:
+            _edge_tts_synthesize(text, voice, f, cancel=job.cancel, on_audio=job.audio_started,
+                                 rate=rate)
+    except BaseException:
+        _RESULTS.discard(result_id)
+        raise
+    job.progress(1, 1)
+    body = {"result_id": result_id, "format": "mp3"}
+    if rate != 1.0:
+        body["rate"] = rate
+    return body, 200
+
+
+class _WavResult:
+    """A mono 16-bit WAV in the result store, written chunk by chunk.
+
+    Audio goes to disk as soon as it is synthesized instead of being
+    collected in memory until the end of the request.
+    """
+
+    def __init__(self, job: _Job):
+        self.job = job
+        self.result_id: str | None = None
+        self.frames = 0
+        self._wf = None
+
+    def write(self, pcm16, rate: int = 24000) -> None:
+        import wave
+
+        if self._wf is None:
+            self.result_id, path = _RESULTS.create("wav")
+            self._wf = wave.open(path, "wb")
+            self._wf.setnchannels(1)
+            self._wf.setsampwidth(2)  # 16-bit
+            self._wf.setframerate(rate)
+        with self.job.span("wav_encode"):
+            self._wf.writeframes(pcm16.tobytes())
+        self.frames += len(pcm16)
+
+    def close(self) -> str | None:
+        """Finish the file; returns its result ID (None if nothing was written)."""
+        if self._wf is not None:
+            self._wf.close()
+            self._wf = None
+        if not self.frames and self.result_id is not None:
+            _RESULTS.discard(self.result_id)
+            self.result_id = None
+        return self.result_id
+
+    def discard(self) -> None:
+        if self._wf is not None:
+            self._wf.close()
+            self._wf = None
+        if self.result_id is not None:
+            _RESULTS.discard(self.result_id)
+            self.result_id = None
+
+
+def _synthesize_indextts(text: str, voice_path: str, job: _Job) -> tuple[dict, int]:
+    """Index-TTS (local voice cloning, runs in separate venv).
+
+    The text is split into chunks of ~_chunk_max("index-tts") chars that are
+    fed to the worker one after another; each chunk's audio is emitted to a
+    streaming client as soon as it arrives.
+    """
+    job.fields["voice"] = os.path.basename(voice_path)
+    job.check_cancelled()
+
+    with job.span("split"):
+        chunks = _split_text(text, _chunk_max("index-tts"))
+    job.fields["chunks"] = [len(chunk) for chunk in chunks]
+
+    out = _WavResult(job)
+    try:
+        for n, chunk in enumerate(chunks):
+            job.check_cancelled()
+            with job.span(f"infer_{n}"):
+                rate, pcm = _INDEXTTS_WORKER.synthesize(chunk, voice_path, job)
+            job.emit_pcm(rate, pcm)
+            out.write(pcm, rate)
+            job.progress(n + 1, len(chunks))
+    except BaseException:
+        out.discard()
+        raise
+
+    result_id = out.close()
+    if result_id is None:
+        return {"error": "Index-TTS failed to generate audio"}, 500
+
+    return {
+        "result_id": result_id,
+        "format": "wav",
+        "segments": len(chunks),
+    }, 200
+
+
+def _chattts_infer_params():
+    """InferCodeParams for the reader voice, plus its segment-cache key."""
+    import ChatTTS as ChatTTSModule
+
+    # Build inference params with female voice
+    infer_kwargs = dict(temperature=0.42, top_P=0.40, top_K=28, prompt="[speed_5]")
+    params = ChatTTSModule.Chat.InferCodeParams(
+        spk_emb=speaker_for_seed(_VOICE_SEED), **infer_kwargs)
+    return params, (_VOICE_SEED, tuple(sorted(infer_kwargs.items())))
+
+
+def _chattts_segments_pcm(segments: list[str], job: _Job, cache: bool = True,
+                          on_segment=None, on_audio=None, keep: bool = True,
+                          chunk_max: int | None = None) -> tuple[list, int]:
+    """Return int16 PCM (or None if synthesis failed) for each segment.
+
+    Segments found in the sentence cache are reused; the rest are packed into
+    chunks of ~*chunk_max* chars (default _chunk_max("chattts")) and inferred
+    one chunk at a time with per-segment retry.  Returns (pcm list, number of
+    reused segments).
+
+    *on_segment(i, pcm)* is called in segment order as soon as each segment
+    is final (pcm None if it was skipped).  With TTS_PIPELINE on, clipping,
+    int16 conversion and *on_segment* run on a helper thread while the next
+    chunk is inferred.  With *keep* False each segment's PCM is dropped once
+    it has been handed on, and the returned list holds only Nones.
+
+    With *on_audio(i, pcm)* set, chunks are inferred in ChatTTS's streaming
+    mode and the audio is handed on in order as early as possible: the first
+    segment of each chunk piece by piece while it is being decoded, the rest
+    of the chunk once it is finished.  The pieces are stitched back into
+    whole segments for *on_segment* and the cache.
+    """
+    import dataclasses
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+
+    params, voice_key = _chattts_infer_params()
+    if on_audio is not None and hasattr(params, "stream_speed"):
+        # Hand on everything decoded so far at each step instead of pacing
+        # the pieces at playback speed
+        params = dataclasses.replace(params, stream_speed=1 << 30)
+
+    seg_pcm: list[np.ndarray | None] = []
+    final: list[bool] = []
+    missing: list[int] = []
+    with job.span("cache_lookup"):
+        for i, seg in enumerate(segments):
+            pcm = _SEGMENTS.get((voice_key, seg.strip())) if cache else None
+            seg_pcm.append(pcm)
+            final.append(pcm is not None)
+            if pcm is None:
+                missing.append(i)
+    reused = len(segments) - len(missing)
+
+    next_out = 0
+    # Samples of a segment already handed to on_audio as pieces, and segments
+    # whose pieces had to be held back because earlier audio wasn't out yet
+    streamed: dict[int, int] = {}
+    held: set[int] = set()
+
+    def post_piece(i: int, wav) -> None:
+        """Hand on a piece of segment *i* that is still being decoded."""
+        if i in held or next_out != i:
+            held.add(i)  # sent whole once the segment is final
+            return
+        pcm16 = (np.clip(wav, -1.0, 1.0) * 32767).astype(np.int16)
+        streamed[i] = streamed.get(i, 0) + len(pcm16)
+        on_audio(i, pcm16)
+
+    def post(ci: int, done: list[tuple[int, object]], skipped: list[int]) -> None:
+        """Convert a chunk's waveforms, then hand on every segment now in order."""
+        nonlocal next_out
+        with job.span(f"pcm_{ci}"):
+            for i, wav in done:
+                audio_data = np.clip(np.asarray(wav).reshape(-1), -1.0, 1.0)
+                pcm16 = (audio_data * 32767).astype(np.int16)
+                seg_pcm[i] = pcm16
+                if cache:
+                    _SEGMENTS.put((voice_key, segments[i].strip()), pcm16)
+        for i in [i for i, _ in done] + skipped:
+            final[i] = True
+        while next_out < len(segments) and final[next_out]:
+            pcm = seg_pcm[next_out]
+            sent = streamed.get(next_out, 0)
+            if on_audio is not None and pcm is not None and len(pcm) > sent:
+                on_audio(next_out, pcm[sent:])
+            if on_segment is not None:
+                on_segment(next_out, pcm)
+            if not keep:
+                seg_pcm[next_out] = None
+            next_out += 1
+
+    pool = (ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"tts-post-{job.request_id}")
+            if _PIPELINE else None)
+    futures = []
+
+    def submit(fn, *args) -> None:
+        if pool is None:
+            fn(*args)
+        else:
+            futures.append(pool.submit(fn, *args))
+
+    def infer(pending: list[int]):
+        texts = [segments[i] for i in pending]
+        if on_audio is None:
+            return chattts_infer(texts, skip_refine_text=True, split_text=False,
+                                 params_infer_code=params)
+
+        def on_piece(row: int, wav) -> None:
+            job.check_cancelled()  # e.g. the streaming client went away
+            job.audio_started()
+            if row == 0:
+                submit(post_piece, pending[0], wav)
+
+        return chattts_infer_stream(texts, on_piece, skip_refine_text=True,
+                                    split_text=False, params_infer_code=params)
+
+    try:
+        submit(post, -1, [], [])  # cached segments at the start are ready now
+
+        # Infer one chunk at a time with per-segment retry to avoid batch failures
+        missing_segments = [segments[i] for i in missing]
+        if chunk_max is None:
+            chunk_max = _chunk_max("chattts")
+        groups = [[missing[j] for j in group] for group in _pack_segments(missing_segments, chunk_max)]
+        job.fields["chunks"] = [sum(len(segments[i]) for i in g) for g in groups]
+        retries = skipped = 0
+        max_retries = 3
+        for ci, group in enumerate(groups):
+            job.check_cancelled()
+            pending = list(group)
+            for attempt in range(max_retries):
+                stage = f"infer_{ci}" if attempt == 0 else f"infer_{ci}_retry{attempt}"
+                with job.span(stage):
+                    result = infer(pending)
+                done, failed = [], []
+                for i, wav in zip(pending, result if result is not None else []):
+                    if wav is None or len(wav) == 0:
+                        failed.append(i)
+                    else:
+                        done.append((i, wav))
+                failed.extend(pending[len(result) if result is not None else 0:])
+                pending = failed
+                last = not pending or attempt == max_retries - 1
+                submit(post, ci, done, pending if last else [])
+                if not pending:
+                    break
+                retries += 1
+            skipped += len(pending)
+            job.progress(ci + 1, len(groups))
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+    for future in futures:
+        future.result()  # re-raise errors from the helper thread
+
+    job.fields.update(segments=len(segments), segments_reused=reused,
+                      retries=retries, skipped_segments=skipped)
+    return seg_pcm, reused
+
+
+def _write_wav_result(pcm_chunks: list, job: _Job, rate: int = 24000) -> str:
+    """Write int16 PCM chunks as one mono WAV in the result store."""
+    import wave
+
+    # Write the chunks one after another as WAV using stdlib wave module
+    result_id, path = _RESULTS.create("wav")
+    with job.span("wav_encode"), wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)  # 16-bit
+        wf.setframerate(rate)
+        for pcm16 in pcm_chunks:
+            wf.writeframes(pcm16.tobytes())
+    return result_id
+
+
+def _synthesize_chattts(text: str, job: _Job) -> tuple[dict, int]:
+    """ChatTTS (local model, offline).
+
+    A streaming client gets the audio as it is decoded, ahead of the WAV.
+    """
+    with job.span("model_load"):
+        get_chat()
+    job.check_cancelled()
+
+    with job.span("clean"):
+        text = _normalize_text(text)
+
+    # Split into sentence segments; only segments missing from the cache are
+    # synthesized, packed into chunks of ~_chunk_max() chars per infer call
+    with job.span("split"):
+        segments = _split_segments(text, _chunk_max("chattts"))
+
+    # The WAV is written segment by segment as chunks finish, so it is
+    # complete as soon as the last chunk is converted
+    out = _WavResult(job)
+
+    def write(i: int, pcm16) -> None:
+        if pcm16 is not None:
+            out.write(pcm16)
+
+    try:
+        _, reused = _chattts_segments_pcm(
+            segments, job, on_segment=write, keep=False,
+            on_audio=((lambda i, pcm16: job.emit_pcm(24000, pcm16))
+                      if job.pcm_sink is not None else None))
+    except BaseException:
+        out.discard()
+        raise
+
+    result_id = out.close()
+    if result_id is None:
+        return {"error": "ChatTTS failed to generate audio for all chunks"}, 500
+
+    return {
+        "result_id": result_id,
+        "format": "wav",
+        "segments": len(segments),
+        "segments_reused": reused,
+    }, 200
+
+
+# ---------------------------------------------------------------------------
+# Hedged requests and engine fallback
+#
+# /tts runs the requested engine first.  If it is unavailable or fails, the
+# next engine in its fallback list takes over.  If it has produced no audio
+# by the hedge deadline, the fallback is started alongside it and whichever
+# finishes first is returned; the other is cancelled.
+# ---------------------------------------------------------------------------
+
+# Engines tried after the requested one ("fallback" in the request overrides)
+_FALLBACK_ENGINES = {
+    "edge-tts": ["chattts"],
+    "chattts": ["edge-tts"],
+    "index-tts": ["chattts", "edge-tts"],
+}
+# Seconds without audio before the fallback is started as well.  Edge TTS is
+# remote and hedged by default; local engines only fall back on failure
+# unless TTS_HEDGE_LOCAL_SECONDS (or "hedge_after" in the request) is set.
+_HEDGE_SECONDS = float(os.environ.get("TTS_HEDGE_SECONDS", "4"))
+_HEDGE_LOCAL_SECONDS = (float(os.environ["TTS_HEDGE_LOCAL_SECONDS"])
+                        if os.environ.get("TTS_HEDGE_LOCAL_SECONDS") else None)
+
+
+def _engine_candidate(engine: str, data: dict, text: str, rate: float = 1.0):
+    """Return (voice, synthesize(job), error) for *engine*.
+
+    *error* is a message (and the rest None) when the engine can't serve
+    this request.  *rate* is the validated speaking rate; only Edge TTS
+    takes it here, as MP3 can't be re-timed afterwards.
+    """
+    if engine == "edge-tts":
+        if not _EDGE_TTS_AVAILABLE:
+            return None, None, "Edge TTS is not installed (pip install edge-tts)."
+        voice = data.get("voice", _EDGE_TTS_VOICE)
+        return voice, lambda job: _synthesize_edge(text, voice, job, rate), None
+    if engine == "index-tts":
+        if not _INDEXTTS_AVAILABLE:
+            return None, None, (
+                "Index-TTS is not available. "
+                "Set up with: cd python && git clone https://github.com/index-tts/index-tts.git "
+                "&& cd index-tts && uv sync --all-extras"
+            )
+        voice = data.get("voice_path", _DEFAULT_VOICE_PATH)
+        if not os.path.isfile(voice):
+            return None, None, (
+                f"Voice reference file not found: {voice}. "
+                f"Place a WAV file at {_DEFAULT_VOICE_PATH} or pick one in the UI."
+            )
+        return voice, lambda job: _synthesize_indextts(text, voice, job), None
+    if not _CHATTTS_AVAILABLE:
+        return None, None, ("ChatTTS is not available. Use Edge TTS, "
+                            "or install Python + requirements.txt for ChatTTS.")
+    return _VOICE_SEED, lambda job: _synthesize_chattts(text, job), None
+
+
+def _discard_losers(outcomes: queue.Queue, n: int) -> None:
+    """Wait for the *n* attempts still running after a hedged request was won.
+
+    Losers that finished with a result anyway, e.g. just before they were
+    cancelled, have it deleted instead of left to the result TTL.
+    """
+    for _ in range(n):
+        _, _, outcome = outcomes.get()
+        if not isinstance(outcome, Exception) and outcome[1] == 200:
+            _RESULTS.discard(outcome[0]["result_id"])
+
+
+def _run_hedged(job: _Job, candidates: list, hedge_after: float | None,
+                wait: float = 0.0, profile: bool = False) -> tuple[dict, int]:
+    """Synthesize with the first of *candidates* [(engine, synthesize)] that succeeds.
+
+    The winner's stage timings and fields are merged into *job*, and
+    body["engine"] names the engine that served the request.
+
+    The caller has admitted the first candidate.  Every engine launched
+    after it is charged its own cost: a hedge only runs if it fits right
+    away, a fallback after a failure waits up to *wait* seconds for budget.
+
+    Without *hedge_after* the candidates are tried in turn on the calling
+    thread; otherwise each attempt runs on its own thread so a hedge can
+    start while the first is still going.  With *profile*, the first
+    attempt runs under the request profiler on whichever thread runs it.
+    """
+    errors: list[str] = []
+
+    def new_job(engine: str) -> _Job:
+        attempt_job = _Job(job.request_id, engine, job.chars)
+        attempt_job.started = job.started  # timings relative to the request
+        return attempt_job
+
+    def attempt(engine, synthesize, attempt_job: _Job, admit_wait: float | None,
+                profiled: bool):
+        profiler = _PROFILER.maybe_profile(job) if profiled else nullcontext()
+        try:
+            if admit_wait is None:
+                with profiler:
+                    return synthesize(attempt_job)
+            # The caller's admission already covers returning the result
+            cost = _estimate_cost(engine, job.chars, spool=True)
+            with _ADMISSION.admit(attempt_job, cost, admit_wait), profiler:
+                return synthesize(attempt_job)
+        except Exception as e:
+            return e
+
+    def succeeded(outcome) -> bool:
+        return not isinstance(outcome, Exception) and outcome[1] == 200
+
+    def won(engine: str, attempt_job: _Job, body: dict) -> tuple[dict, int]:
+        job.engine = engine
+        job.spans.extend(attempt_job.spans)
+        job.fields.update(attempt_job.fields)
+        if errors:
+            job.fields["fallback_errors"] = errors
+        body["engine"] = engine
+        return body, 200
+
+    def failed(engine: str, outcome) -> None:
+        error = outcome if isinstance(outcome, Exception) else outcome[0].get("error")
+        errors.append(f"{engine}: {error}")
+
+    def lost(outcome) -> tuple[dict, int]:
+        job.fields["fallback_errors"] = errors
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    if hedge_after is None:
+        outcome = None
+        for n, (engine, synthesize) in enumerate(candidates):
+            attempt_job = new_job(engine)
+            outcome = attempt(engine, synthesize, attempt_job, wait if n else None,
+                              profile and not n)
+            if succeeded(outcome):
+                return won(engine, attempt_job, outcome[0])
+            failed(engine, outcome)
+        return lost(outcome)
+
+    outcomes: queue.Queue = queue.Queue()
+    running: dict[str, _Job] = {}
+    waiting = list(candidates)
+
+    def launch(admit_wait: float | None = None) -> float:
+        profiled = profile and len(waiting) == len(candidates)
+        engine, synthesize = waiting.pop(0)
+        attempt_job = running[engine] = new_job(engine)
+        threading.Thread(
+            target=lambda: outcomes.put((engine, attempt_job, attempt(
+                engine, synthesize, attempt_job, admit_wait, profiled))),
+            name=f"tts-{engine}-{job.request_id}", daemon=True,
+        ).start()
+        return time.monotonic()
+
+    launched = launch()
+    outcome = None
+    while running:
+        if (waiting and time.monotonic() - launched >= hedge_after
+                and not any(j.first_audio.is_set() for j in running.values())):
+            job.fields["hedged"] = True
+            launched = launch(0.0)
+            continue
+        try:
+            engine, attempt_job, outcome = outcomes.get(timeout=0.05)
+        except queue.Empty:
+            continue
+        del running[engine]
+        if succeeded(outcome):
+            for other in running.values():
+                other.cancel.set()
+            if running:
+                threading.Thread(target=_discard_losers, args=(outcomes, len(running)),
+                                 name=f"tts-losers-{job.request_id}", daemon=True).start()
+            return won(engine, attempt_job, outcome[0])
+        failed(engine, outcome)
+        if not running and waiting:
+            launched = launch(wait)
+    return lost(outcome)
+
+
+def _plan_engines(engine: str, data: dict, text: str, job: _Job, rate: float = 1.0):
+    """Return (voice, candidates, hedge_after, error) for a synthesis request.
+
+    Candidates are the requested engine followed by its available fallbacks
+    ("fallback": false disables them); *error* is set when none is available.
+    *rate* is the request's speaking rate, already checked by _parse_rate.
+    """
+    fallback = data.get("fallback", _FALLBACK_ENGINES.get(engine, []))
+    fallback = [fallback] if isinstance(fallback, str) else list(fallback or [])
+    candidates, unavailable = [], []
+    voice = None
+    for name in dict.fromkeys([engine, *fallback]):
+        name_voice, synthesize, error = _engine_candidate(name, data, text, rate)
+        if error:
+            unavailable.append(error)
+            continue
+        if name == engine:
+            voice = name_voice
+        candidates.append((name, synthesize))
+    if not candidates:
+        return None, [], None, unavailable[0]
+    if candidates[0][0] != engine:
+        job.fields["fallback_errors"] = [f"{engine}: {unavailable[0]}"]
+
+    hedge_after = data.get("hedge_after")
+    if hedge_after is None:
+        hedge_after = _HEDGE_SECONDS if candidates[0][0] == "edge-tts" else _HEDGE_LOCAL_SECONDS
+    else:
+        try:
+            hedge_after = float(hedge_after)
+        except (TypeError, ValueError):
+            return None, [], None, f"hedge_after must be a number, got {hedge_after!r}"
+        if not 0 <= hedge_after < float("inf"):
+            return None, [], None, "hedge_after must be a non-negative number of seconds"
+    return voice, candidates, hedge_after, None
+
+
+# ---------------------------------------------------------------------------
+# Admission control
+#
+# Each synthesis request is charged an estimated peak memory and compute
+# time from its engine and character count.  Requests run while they fit in
+# TTS_MEMORY_BUDGET_MB and TTS_MAX_CONCURRENT; the rest wait in a FIFO queue
+# for up to TTS_QUEUE_SECONDS and are then rejected with 429 + Retry-After,
+# so a burst of long selections can't push the machine into swap.
+# ---------------------------------------------------------------------------
+
+_MEMORY_BUDGET_BYTES = int(float(os.environ.get("TTS_MEMORY_BUDGET_MB", "512")) * 1024 * 1024)
+_MAX_CONCURRENT = int(os.environ.get("TTS_MAX_CONCURRENT", "4"))
+_QUEUE_SECONDS = float(os.environ.get("TTS_QUEUE_SECONDS", "30"))
+
+# Speech runs at roughly 4 characters per second
+_AUDIO_SECONDS_PER_CHAR = 0.25
+# engine -> (bytes held per second of audio in the chunk being synthesized,
+#            result bytes per second of audio, compute seconds per audio second).
+# Local engines hold a chunk's float32 waveform and int16 PCM and write the
+# rest to disk as a 16-bit WAV; Edge TTS streams its ~48 kbit/s MP3 to disk.
+_ENGINE_COSTS = {
+    "chattts": (24000 * (4 + 2), 48000, 1.0),
+    "index-tts": (24000 * (4 + 2), 48000, 1.5),
+    "edge-tts": (0, 6000, 0.1),
+}
+
+
+class _Overloaded(Exception):
+    """A request was not admitted; carries the HTTP status and Retry-After."""
+
+    def __init__(self, message: str, status: int, retry_after: int):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _cost_parts(engine: str, chars: int, spool: bool | None = None,
+                chunked: bool = True) -> tuple[int, int, float]:
+    """(working-set bytes, inline-result bytes, compute seconds) for *chars* chars.
+
+    The working set is one chunk in flight (two with TTS_PIPELINE, where the
+    next chunk is inferred while the last one is converted), or all of the
+    audio for callers that infer their texts in a single call (*chunked*
+    False).  The finished result is only charged when _deliver() would
+    return it inline, as the file read back plus its base64 copy; *spool*
+    is the request's flag.
+    """
+    pcm_per_second, result_per_second, rtf = _ENGINE_COSTS.get(engine, _ENGINE_COSTS["chattts"])
+    working = 0
+    # Only calibrated local engines read the tuning file; Edge TTS never
+    # needs the (torch-probing) hardware fingerprint
+    if engine in _CALIBRATORS:
+        entry = _load_tuning().get(_hardware_fingerprint(), {}).get(engine)
+        if entry:
+            for result in entry["results"]:
+                if result["chunk_max"] == entry["chunk_max"] and result["throughput"] > 0:
+                    rtf = 1 / result["throughput"]
+        if chunked:
+            in_flight = 2 if _PIPELINE and engine == "chattts" else 1
+            held = min(chars, _chunk_max(engine)) * in_flight
+        else:
+            held = chars
+        working = int(held * _AUDIO_SECONDS_PER_CHAR * pcm_per_second)
+    seconds = chars * _AUDIO_SECONDS_PER_CHAR
+    result_bytes = int(seconds * result_per_second)
+    if spool is None:
+        spool = result_bytes > _SPOOL_THRESHOLD_BYTES
+    inline = 0 if spool else result_bytes * 7 // 3
+    return working, inline, seconds * rtf
+
+
+def _estimate_cost(engine: str, chars: int, spool: bool | None = None,
+                   chunked: bool = True) -> tuple[int, float]:
+    """Estimated (peak bytes, compute seconds) of synthesizing *chars* chars."""
+    working, inline, seconds = _cost_parts(engine, chars, spool, chunked)
+    return working + inline, seconds
+
+
+class _Admission:
+    """Memory and concurrency budget shared by all synthesis requests."""
+
+    def __init__(self, budget_bytes: int, max_concurrent: int):
+        from collections import deque
+
+        self.budget_bytes = budget_bytes
+        self.max_concurrent = max_concurrent
+        self._cond = threading.Condition()
+        # Keyed by job object: the attempts of a hedged request share its ID
+        self._active: dict[_Job, dict] = {}
+        self._queue: deque[_Job] = deque()
+        self.admitted = 0
+        self.rejected = 0
+
+    def _fits(self, cost: int) -> bool:
+        used = sum(a["bytes"] for a in self._active.values())
+        return len(self._active) < self.max_concurrent and used + cost <= self.budget_bytes
+
+    def _retry_after(self) -> int:
+        """Seconds until the first active request is expected to finish."""
+        now = time.monotonic()
+        remaining = [a["started"] + a["seconds"] - now for a in self._active.values()]
+        return max(1, int(min(remaining, default=1) + 0.999))
+
+    @contextmanager
+    def admit(self, job: _Job, cost: tuple[int, float], wait: float = _QUEUE_SECONDS):
+        """Hold budget for *job* while the block runs, waiting up to *wait* s."""
+        cost_bytes, cost_seconds = cost
+        if cost_bytes > self.budget_bytes:
+            with self._cond:
+                self.rejected += 1
+            raise _Overloaded(
+                f"Request too large: ~{cost_bytes / 1048576:.0f} MB exceeds the "
+                f"{self.budget_bytes / 1048576:.0f} MB budget; spool the result "
+                f"(\"spool\": true), split the text or use /export",
+                413, 0)
+
+        queued_at = time.monotonic()
+        deadline = queued_at + wait
+        with self._cond:
+            self._queue.append(job)
+            try:
+                while not (self._queue[0] is job and self._fits(cost_bytes)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise _Overloaded("Server busy, try again later", 429, self._retry_after())
+                    self._cond.wait(remaining)
+            finally:
+                self._queue.remove(job)
+                self._cond.notify_all()
+            self._active[job] = {
+                "bytes": cost_bytes, "seconds": cost_seconds, "started": time.monotonic()}
+            self.admitted += 1
+        job.fields["admission_wait_ms"] = round((time.monotonic() - queued_at) * 1000, 1)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active.pop(job, None)
+                self._cond.notify_all()
+
+    def status(self) -> dict:
+        with self._cond:
+            return {
+                "memory_used_mb": round(sum(a["bytes"] for a in self._active.values()) / 1048576, 1),
+                "memory_budget_mb": round(self.budget_bytes / 1048576, 1),
+                "active": len(self._active),
+                "max_concurrent": self.max_concurrent,
+                "queued": len(self._queue),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+            }
+
+
+_ADMISSION = _Admission(_MEMORY_BUDGET_BYTES, _MAX_CONCURRENT)
+
+
+def _overloaded_response(e: _Overloaded):
+    resp = jsonify({"error": str(e)})
+    if e.status == 429:
+        resp.headers["Retry-After"] = str(e.retry_after)
+    return resp, e.status
+
+
+# ---------------------------------------------------------------------------
+# Streamed responses
+#
+# With "stream": true, /tts answers with a WAV of unknown length (sizes set
+# to 0xFFFFFFFF) and sends each chunk as soon as the engine emits it, so
+# playback can start after the first chunk instead of the whole text.
+# ---------------------------------------------------------------------------
+
+# Engines that emit audio as they go (see _Job.emit_pcm): Index-TTS chunk by
+# chunk, ChatTTS piece by piece within a chunk via its streaming inference
+_STREAMING_ENGINES = {"index-tts", "chattts"}
+
+
+def _stream_response(job: _Job, engine: str, synthesize, wait: float, stretch: float = 1.0):
+    """Run *synthesize* on a thread and stream its PCM chunks as a WAV.
+
+    With *stretch* set, the chunks are re-timed as one continuous signal.
+    """
+    sink: queue.Queue = queue.Queue()
+    job.pcm_sink = sink
+    outcome: dict = {}
+
+    def run() -> None:
+        job.publish("started", chars=job.chars)
+        try:
+            with _ADMISSION.admit(job, _estimate_cost(engine, job.chars, spool=True), wait):
+                body, status = synthesize(job)
+            if status == 200:
+                _RESULTS.discard(body.pop("result_id"))
+        except _Overloaded as e:
+            outcome["overloaded"] = e
+            body, status = {"error": str(e)}, e.status
+        except Exception as e:
+            body, status = {"error": str(e)}, 500
+        outcome.update(body=body, status=status)
+        sink.put(None)
+        job.publish("done" if status == 200 else "error", status=status)
+        if status == 200:
+            job.log(status, stream=True)
+        else:
+            job.log(status, stream=True, error=body.get("error"))
+
+    threading.Thread(target=run, name=f"tts-stream-{job.request_id}", daemon=True).start()
+
+    # Errors before the first chunk still get a proper status code
+    first = sink.get()
+    if first is None:
+        if "overloaded" in outcome:
+            return _overloaded_response(outcome["overloaded"])
+        return jsonify(outcome["body"]), outcome["status"]
+
+    def generate():
+        try:
+            rate, pcm = first
+            yield _wav_header(None, rate)
+            if abs(stretch - 1.0) < 1e-3:
+                yield pcm.tobytes()
+                while (item := sink.get()) is not None:
+                    yield item[1].tobytes()
+                return
+            stretcher = _Stretcher(stretch, rate)
+            yield stretcher.feed(pcm).tobytes()
+            while (item := sink.get()) is not None:
+                yield stretcher.feed(item[1]).tobytes()
+            yield stretcher.flush().tobytes()
+        finally:
+            job.cancel.set()  # client went away: stop after the current chunk
+
+    resp = Response(generate(), mimetype="audio/wav")
+    resp.headers["X-Request-ID"] = job.request_id
+    resp.headers["X-TTS-Engine"] = engine
+    return resp
+
+
+@app.route("/tts", methods=["POST"])
+def tts():
+    data = request.get_json(silent=True) or {}
+    text = data.get("text", "").strip()
+    engine = data.get("engine", "chattts")  # "chattts", "edge-tts", or "index-tts"
+    if not text:
+        return jsonify({"error": "No text provided"}), 400
+    try:
+        stretch = _parse_rate(data.get("rate", 1.0))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Clients may pick the ID up front to match /events progress to this call
+    request_id = str(data.get("request_id") or uuid.uuid4().hex[:12])
+    job = _Job(request_id, engine, len(text))
+    job.request = ("tts", data)
+
+    voice, candidates, hedge_after, error = _plan_engines(engine, data, text, job, stretch)
+    if error:
+        return jsonify({"error": error}), 400
+    # "queue": false rejects at once instead of waiting for budget
+    wait = _QUEUE_SECONDS if data.get("queue", True) else 0.0
+    if data.get("stream"):
+        # Streamed audio can't switch engines midway, so no hedging here
+        stream_engine, stream_synthesize = candidates[0]
+        if stream_engine not in _STREAMING_ENGINES:
+            return jsonify({"error": "Streaming is supported for: "
+                                     + ", ".join(sorted(_STREAMING_ENGINES))}), 400
+        _stat_incr("requests")
+        return _stream_response(job, stream_engine, stream_synthesize, wait, stretch)
+    synthesize = lambda: _run_hedged(job, candidates, hedge_after, wait,  # noqa: E731
+                                     profile=True)
+
+    spool = data.get("spool")
+
+    def run() -> tuple[dict, int]:
+        job.publish("started", chars=len(text))
+        try:
+            with _ADMISSION.admit(job, _estimate_cost(candidates[0][0], len(text), spool), wait):
+                body, status = synthesize()
+                if status == 200:
+                    body = _deliver(_stretch_result(body, stretch, job), spool, job)
+        except _Overloaded as e:
+            body, status = {"error": str(e), "retry_after": e.retry_after}, e.status
+        except Exception as e:
+            import traceback
+            body, status = {"error": str(e), "traceback": traceback.format_exc()}, 500
+        job.publish("done" if status == 200 else "error", status=status)
+        return body, status
+
+    _stat_incr("requests")
+    body, status = _single_flight(_request_key(engine, voice, data, text), run, job)
+    with job.span("json"):
+        resp = jsonify(body)
+    if status == 200:
+        job.log(status, bytes=body.get("bytes") or len(body.get("audio", "")) * 3 // 4)
+    else:
+        job.log(status, error=body.get("error"), traceback=body.get("traceback"))
+    resp.headers["X-Request-ID"] = request_id
+    resp.headers["Server-Timing"] = job.server_timing()
+    if body.get("engine"):
+        resp.headers["X-TTS-Engine"] = body["engine"]
+    if status == 429:
+        resp.headers["Retry-After"] = str(body["retry_after"])
+    return resp, status
+
+
+# ---------------------------------------------------------------------------
+# Batch synthesis
+#
+# POST /tts/batch takes many texts in one request.  ChatTTS items are
+# scheduled together: their sentence segments are pooled so repeated
+# sentences are synthesized once and short items share infer calls.  Other
+# engines run on a small worker pool with the same fallback rules as /tts.
+# ---------------------------------------------------------------------------
+
+_BATCH_MAX_ITEMS = int(os.environ.get("TTS_BATCH_MAX_ITEMS", "200"))
+# Concurrent Edge TTS items per batch (network-bound); Index-TTS runs one at a time
+_BATCH_WORKERS = int(os.environ.get("TTS_BATCH_WORKERS", "4"))
+
+
+def _synthesize_chattts_batch(texts: list[str], job: _Job) -> list[tuple[dict, int]]:
+    """ChatTTS for several texts at once; returns (body, status) per text.
+
+    Each item's WAV is written as soon as its last segment is final, and a
+    segment's PCM is dropped once every item using it has been written.
+    """
+    with job.span("model_load"):
+        get_chat()
+
+    with job.span("split"):
+        per_item = [_split_segments(_normalize_text(t), _chunk_max("chattts")) for t in texts]
+    unique = list(dict.fromkeys(seg for segments in per_item for seg in segments))
+    index = {seg: u for u, seg in enumerate(unique)}
+    item_segments = [[index[seg] for seg in segments] for segments in per_item]
+    job.fields["segments_shared"] = sum(map(len, per_item)) - len(unique)
+
+    # Items by the segment that completes them, and items still using each segment
+    ready_at: dict[int, list[int]] = {}
+    users = [0] * len(unique)
+    for k, us in enumerate(item_segments):
+        if us:
+            ready_at.setdefault(max(us), []).append(k)
+        for u in set(us):
+            users[u] += 1
+
+    failed = ({"error": "ChatTTS failed to generate audio for all chunks"}, 500)
+    results: list[tuple[dict, int]] = [failed] * len(texts)
+    pcm_by_segment: dict[int, object] = {}
+
+    def on_segment(u: int, pcm16) -> None:
+        pcm_by_segment[u] = pcm16
+        for k in ready_at.get(u, []):
+            all_pcm = [pcm_by_segment[i] for i in item_segments[k]
+                       if pcm_by_segment[i] is not None]
+            if all_pcm:
+                results[k] = ({
+                    "result_id": _write_wav_result(all_pcm, job),
+                    "format": "wav",
+                    "engine": "chattts",
+                    "segments": len(item_segments[k]),
+                }, 200)
+            for i in set(item_segments[k]):
+                users[i] -= 1
+                if not users[i]:
+                    del pcm_by_segment[i]
+
+    try:
+        _chattts_segments_pcm(unique, job, on_segment=on_segment, keep=False)
+    except BaseException:
+        for body, status in results:
+            if status == 200:
+                _RESULTS.discard(body["result_id"])
+        raise
+    return results
+
+
+def _synthesize_batch_item(item_id: str, data: dict) -> tuple[dict, int, _Job]:
+    """One non-batched item: the /tts path (fallback, hedging) without coalescing."""
+    engine = data.get("engine", "chattts")
+    job = _Job(item_id, engine, len(data["text"]))
+    _, candidates, hedge_after, error = _plan_engines(engine, data, data["text"], job,
+                                                      data.get("rate", 1.0))
+    if error:
+        return {"error": error}, 400, job
+    try:
+        body, status = _run_hedged(job, candidates, hedge_after)
+    except Exception as e:
+        body, status = {"error": str(e)}, 500
+    return body, status, job
+
+
+@app.route("/tts/batch", methods=["POST"])
+def tts_batch():
+    """Synthesize many texts in one request.
+
+    POST {"items": ["text", {"text": "...", "engine": "edge-tts"}, ...],
+          "engine": "chattts", "spool": true, ...}
+    Top-level params apply to every item; an item's own keys override them.
+    Returns {"request_id", "results": [...]} in item order, each result
+    carrying its own "status" and either audio/url or "error".
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get("items", data.get("texts"))
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "No items provided"}), 400
+    if len(items) > _BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Too many items ({len(items)} > {_BATCH_MAX_ITEMS})"}), 400
+
+    shared = {k: v for k, v in data.items() if k not in ("items", "texts", "request_id")}
+    params = [{**shared, **(item if isinstance(item, dict) else {"text": item})} for item in items]
+    for p in params:
+        p["text"] = str(p.get("text") or "").strip()
+    request_id = str(data.get("request_id") or uuid.uuid4().hex[:12])
+    job = _Job(request_id, "batch", sum(len(p["text"]) for p in params))
+    job.request = ("batch", data)
+    # Items are synthesized a chunk at a time, but every inline result is
+    # held until the response is sent
+    parts = [_cost_parts(p.get("engine", "chattts"), len(p["text"]), p.get("spool"))
+             for p in params]
+    cost = (max(w for w, _, _ in parts) + sum(i for _, i, _ in parts),
+            sum(s for _, _, s in parts))
+    try:
+        with _ADMISSION.admit(job, cost,
+                              _QUEUE_SECONDS if data.get("queue", True) else 0.0):
+            return _run_batch(job, params)
+    except _Overloaded as e:
+        job.log(e.status, items=len(params), error=str(e))
+        return _overloaded_response(e)
+
+
+def _run_batch(job: _Job, params: list[dict]):
+    """Synthesize the items of an admitted /tts/batch request."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    request_id = job.request_id
+    job.publish("started", chars=job.chars, items=len(params))
+    _stat_incr("batch_items", len(params))
+
+    results: list[dict | None] = [None] * len(params)
+
+    def finish(i: int, body: dict, status: int, item_job: _Job) -> None:
+        if status == 200:
+            try:
+                body = _stretch_result(body, params[i].get("rate", 1.0), item_job)
+                body = _deliver(body, params[i].get("spool"), item_job)
+            except Exception as e:
+                body, status = {"error": str(e)}, 500
+        results[i] = {"index": i, "status": status, **body}
+        job.publish("item_done", index=i, status=status)
+
+    joint, edge, local = [], [], []
+    for i, p in enumerate(params):
+        engine = p.get("engine", "chattts")
+        try:
+            p["rate"] = _parse_rate(p.get("rate", 1.0))
+        except ValueError as e:
+            finish(i, {"error": str(e)}, 400, job)
+            continue
+        if not p["text"]:
+            finish(i, {"error": "No text provided"}, 400, job)
+        elif engine == "chattts" and _CHATTTS_AVAILABLE:
+            joint.append(i)
+        else:
+            (edge if engine == "edge-tts" else local).append(i)
+
+    def run_items(indices: list[int]) -> None:
+        for i in indices:
+            finish(i, *_synthesize_batch_item(f"{request_id}.{i}", params[i]))
+
+    with ThreadPoolExecutor(max_workers=_BATCH_WORKERS,
+                            thread_name_prefix=f"tts-batch-{request_id}") as pool:
+        futures = [pool.submit(run_items, [i]) for i in edge]
+        if local:
+            futures.append(pool.submit(run_items, local))
+        if joint:
+            try:
+                joint_results = _synthesize_chattts_batch([params[i]["text"] for i in joint], job)
+            except Exception as e:
+                joint_results = [({"error": str(e)}, 500)] * len(joint)
+            for i, (body, status) in zip(joint, joint_results):
+                finish(i, body, status, job)
+        for future in futures:
+            future.result()
+
+    failed = sum(r["status"] != 200 for r in results)
+    job.publish("done" if not failed else "error", status=200, failed=failed)
+    with job.span("json"):
+        resp = jsonify({"request_id": request_id, "results": results})
+    job.log(200, items=len(results), failed=failed)
+    resp.headers["X-Request-ID"] = request_id
+    resp.headers["Server-Timing"] = job.server_timing()
+    return resp, 200
+
+
+# ---------------------------------------------------------------------------
+# Chunk-size calibration
+#
+# The best chunk length for real-time factor and failure rate depends on the
+# engine and the hardware (CPU vs GPU, thread count).  Calibration runs a
+# fixed corpus at several chunk sizes, measures throughput, time to first
+# audio and the empty-output rate, and stores the winner per engine and
+# hardware fingerprint in _TUNING_PATH.  TTS_CHUNK_MAX overrides it.
+# ---------------------------------------------------------------------------
+
+_TUNING_PATH = os.environ.get("TTS_TUNING_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "tts_tuning.json")
+_CALIBRATE_SIZES = (40, 60, 80, 100, 150, 200)
+# Sizes whose first audio takes longer than this are only picked if none is faster
+_CALIBRATE_TTFA_BUDGET = float(os.environ.get("TTS_CALIBRATE_TTFA_SECONDS", "3"))
+# Sizes within this empty-output rate of the most reliable size are eligible
+_CALIBRATE_EMPTY_SLACK = 0.02
+
+# Fixed corpus: dialogue-heavy text like the reader's selections, with short
+# lines, long run-on sentences and mixed punctuation.
+_CALIBRATION_CORPUS = (
+    "“你终于来了。”她放下手里的书，抬头看着门口。“我还以为你不会来了。”",
+    "雨下了整整一夜，街道上的积水映着路灯昏黄的光，远处偶尔传来几声汽车的喇叭，"
+    "整座城市仿佛都在等待着什么，却又说不清究竟在等待什么。",
+    "快跑！他们追上来了！",
+    "第二天早上，村子里的人都聚集在广场上。村长站在台阶上，清了清嗓子，说道："
+    "“从今天开始，每家每户都要派一个人去山上守夜，直到找到那只怪物为止。”"
+    "人群中顿时响起了一阵议论声。",
+    "我不明白。为什么是我？明明还有那么多人可以选择，为什么偏偏是我？",
+    "老人笑了笑，没有回答，只是把那枚古旧的铜钱轻轻放在桌上，推到了少年面前。",
+)
+
+_TUNING_LOCK = threading.Lock()
+_TUNING: dict | None = None
+_FINGERPRINT: str | None = None
+
+
+def _hardware_fingerprint() -> str:
+    """Identify the machine class that calibration results apply to."""
+    global _FINGERPRINT
+    if _FINGERPRINT is None:
+        import platform
+
+        parts = [platform.system(), platform.machine(), f"{os.cpu_count()}cpu"]
+        try:
+            import torch
+
+            parts.append(f"{torch.get_num_threads()}thr")
+            parts.append(torch.cuda.get_device_name(0) if torch.cuda.is_available() else "cpu")
+        except ImportError:
+            pass
+        _FINGERPRINT = "/".join(parts)
+    return _FINGERPRINT
+
+
+def _load_tuning() -> dict:
+    global _TUNING
+    with _TUNING_LOCK:
+        if _TUNING is None:
+            try:
+                with open(_TUNING_PATH, encoding="utf-8") as f:
+                    _TUNING = json.load(f)
+            except (OSError, ValueError):
+                _TUNING = {}
+        return _TUNING
+
+
+def _save_tuning(engine: str, entry: dict) -> None:
+    tuning = _load_tuning()
+    with _TUNING_LOCK:
+        tuning.setdefault(_hardware_fingerprint(), {})[engine] = entry
+        tmp = _TUNING_PATH + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(tuning, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, _TUNING_PATH)
+
+
+def _chunk_max(engine: str) -> int:
+    """Chunk size for *engine*: env override, else calibrated, else default."""
+    if os.environ.get("TTS_CHUNK_MAX"):
+        return int(os.environ["TTS_CHUNK_MAX"])
+    entry = _load_tuning().get(_hardware_fingerprint(), {}).get(engine)
+    return entry["chunk_max"] if entry else _TTS_CHUNK_MAX
+
+
+def _calibrate_chattts(text: str, chunk_max: int, on_audio) -> tuple[int, int, int]:
+    """Synthesize *text* the way /tts does, with chunks of *chunk_max* chars.
+
+    The sentence cache is bypassed.  Calls *on_audio(seconds)* for each
+    segment as it is finished; returns (chunks, segments, skipped segments).
+    """
+    segments = _split_segments(_normalize_text(text), chunk_max)
+    job = _SilentJob("calibrate", "chattts", len(text))
+
+    def on_segment(i: int, pcm16) -> None:
+        if pcm16 is not None:
+            on_audio(len(pcm16) / 24000)
+
+    _chattts_segments_pcm(segments, job, cache=False, on_segment=on_segment, keep=False,
+                          chunk_max=chunk_max)
+    return len(job.fields["chunks"]), len(segments), job.fields["skipped_segments"]
+
+
+def _calibrate_indextts(text: str, chunk_max: int, on_audio) -> tuple[int, int, int]:
+    """Synthesize *text* with the default voice the way /tts does.
+
+    Calls *on_audio(seconds)* for each chunk; returns (chunks, chunks, empty chunks).
+    """
+    chunks = _split_text(text, chunk_max)
+    empty = 0
+    for chunk in chunks:
+        rate, pcm = _INDEXTTS_WORKER.synthesize(
+            chunk, _DEFAULT_VOICE_PATH, _SilentJob("calibrate", "index-tts", len(chunk)))
+        if len(pcm):
+            on_audio(len(pcm) / rate)
+        else:
+            empty += 1
+    return len(chunks), len(chunks), empty
+
+
+# engine -> function(text, chunk_max, on_audio) -> (chunks, units, empty units)
+_CALIBRATORS = {"chattts": _calibrate_chattts, "index-tts": _calibrate_indextts}
+
+
+def _calibrate(engine: str, sizes=_CALIBRATE_SIZES, rounds: int = 1,
+               on_result=None) -> dict:
+    """Measure each chunk size on the corpus and persist the best one.
+
+    Each size runs the engine's production path, so "empty_rate" is the
+    share of segments (Index-TTS: chunks) that still produced no audio.
+    *on_result(result)* is called with each size's measurements as they finish.
+    """
+    synth = _CALIBRATORS[engine]
+    # Warm-up: model load, kernels, caches
+    synth(_CALIBRATION_CORPUS[0], _TTS_CHUNK_MAX, lambda seconds: None)
+    results = []
+    for size in sizes:
+        wall = audio = ttfa = 0.0
+        chunks = units = empty = 0
+        for _ in range(rounds):
+            for text in _CALIBRATION_CORPUS:
+                start = time.perf_counter()
+                first: list[float] = []
+
+                def on_audio(seconds: float) -> None:
+                    nonlocal audio
+                    if not first:
+                        first.append(time.perf_counter() - start)
+                    audio += seconds
+
+                n_chunks, n_units, n_empty = synth(text, size, on_audio)
+                wall += time.perf_counter() - start
+                ttfa += first[0] if first else time.perf_counter() - start
+                chunks += n_chunks
+                units += n_units
+                empty += n_empty
+        texts = rounds * len(_CALIBRATION_CORPUS)
+        result = {
+            "chunk_max": size,
+            "throughput": round(audio / wall, 3) if wall else 0.0,  # audio s per wall s
+            "ttfa": round(ttfa / texts, 3),
+            "empty_rate": round(empty / units, 3) if units else 1.0,
+            "chunks": chunks,
+        }
+        print(f"[TTS] calibrate {engine} chunk_max={size}: {result['throughput']}x realtime, "
+              f"first audio {result['ttfa']}s, empty {result['empty_rate']:.1%}", flush=True)
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    # Most reliable sizes first, then the ones that start playing quickly,
+    # then the highest throughput among those
+    reliable = min(r["empty_rate"] for r in results) + _CALIBRATE_EMPTY_SLACK
+    eligible = [r for r in results if r["empty_rate"] <= reliable]
+    eligible = [r for r in eligible if r["ttfa"] <= _CALIBRATE_TTFA_BUDGET] or eligible
+    best = max(eligible, key=lambda r: r["throughput"])
+    entry = {
+        "chunk_max": best["chunk_max"],
+        "calibrated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    _save_tuning(engine, entry)
+    print(f"[TTS] calibrate {engine}: using chunk_max={best['chunk_max']} "
+          f"on {_hardware_fingerprint()}", flush=True)
+    return {"engine": engine, "fingerprint": _hardware_fingerprint(), **entry}
+
+
+def _bench_pipeline(rounds: int = 1) -> dict:
+    """Time ChatTTS synthesis of the corpus with TTS_PIPELINE off and on.
+
+    The sentence cache is bypassed so every run infers everything.  "tail"
+    is the wall time not spent in inference: conversion, WAV encoding and
+    base64, which the pipeline overlaps with the next chunk's inference.
+    """
+    global _PIPELINE, _SEGMENTS
+    text = "".join(_CALIBRATION_CORPUS)
+    saved = _PIPELINE, _SEGMENTS
+    _SEGMENTS = _SegmentCache(0)
+    _synthesize_chattts(_CALIBRATION_CORPUS[0], _SilentJob("warmup", "chattts", 0))
+    report = {"fingerprint": _hardware_fingerprint(), "chars": len(text)}
+    try:
+        for pipeline in (False, True):
+            _PIPELINE = pipeline
+            wall = infer = 0.0
+            for n in range(rounds):
+                job = _SilentJob(f"bench-{n}", "chattts", len(text))
+                t0 = time.perf_counter()
+                body, status = _synthesize_chattts(text, job)
+                if status != 200:
+                    raise RuntimeError(f"bench synthesis failed: {body.get('error')}")
+                _deliver(body, False, job)
+                wall += time.perf_counter() - t0
+                infer += sum(ms for name, ms in job.spans if name.startswith("infer_")) / 1000
+            mode = "pipelined" if pipeline else "serial"
+            report[mode] = {"wall": round(wall / rounds, 3),
+                            "tail": round((wall - infer) / rounds, 3)}
+            print(f"[TTS] bench {mode}: {report[mode]['wall']}s total, "
+                  f"{report[mode]['tail']}s outside inference", flush=True)
+    finally:
+        _PIPELINE, _SEGMENTS = saved
+    report["speedup"] = round(report["serial"]["wall"] / report["pipelined"]["wall"], 3)
+    print(f"[TTS] bench: pipeline speedup {report['speedup']}x on {_hardware_fingerprint()}",
+          flush=True)
+    return report
+
+
+_CALIBRATE_MAX_SIZE = 1000
+_CALIBRATE_MAX_ROUNDS = 10
+
+
+class _Calibration:
+    """One calibration run on a background thread (it takes minutes)."""
+
+    def __init__(self, calibration_id: str, engine: str, sizes: list[int], rounds: int):
+        self.calibration_id = calibration_id
+        self.engine = engine
+        self.sizes = sizes
+        self.rounds = rounds
+        self.state = "running"
+        self.results: list[dict] = []
+        self.result: dict | None = None
+        self.error = None
+        self.started = time.monotonic()
+
+    def run(self) -> None:
+        try:
+            self.result = _calibrate(self.engine, self.sizes, self.rounds,
+                                     on_result=self.results.append)
+            self.state = "done"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "error"
+
+    def status(self) -> dict:
+        return {
+            "calibration_id": self.calibration_id,
+            "engine": self.engine,
+            "state": self.state,
+            "error": self.error,
+            "sizes": self.sizes,
+            "rounds": self.rounds,
+            "progress": round(len(self.results) / len(self.sizes), 4),
+            "results": list(self.results),
+            "result": self.result,
+            "elapsed": round(time.monotonic() - self.started, 1),
+        }
+
+
+_CALIBRATIONS: dict[str, _Calibration] = {}
+_CALIBRATIONS_LOCK = threading.Lock()
+
+
+@app.route("/calibrate", methods=["POST"])
+def calibrate():
+    """Start chunk-size calibration; poll GET /calibrate/<id> for the result.
+
+    POST {"engine": "chattts", "sizes": [40, 60, 80, 100, 150], "rounds": 1}
+    Only one calibration runs per engine; starting another returns the
+    running one.
+    """
+    data = request.get_json(silent=True) or {}
+    engine = data.get("engine", "chattts")
+    if engine not in _CALIBRATORS:
+        return jsonify({"error": f"Calibration supports: {', '.join(_CALIBRATORS)}"}), 400
+    if engine == "chattts" and not _CHATTTS_AVAILABLE:
+        return jsonify({"error": "ChatTTS is not available"}), 400
+    if engine == "index-tts" and not (_INDEXTTS_AVAILABLE and os.path.isfile(_DEFAULT_VOICE_PATH)):
+        return jsonify({"error": "Index-TTS or its default voice is not available"}), 400
+    sizes = data.get("sizes") or list(_CALIBRATE_SIZES)
+    rounds = data.get("rounds", 1)
+    if (not isinstance(sizes, list)
+            or not all(type(n) is int and 0 < n <= _CALIBRATE_MAX_SIZE for n in sizes)):
+        return jsonify({"error": "sizes must be a list of chunk sizes "
+                                 f"between 1 and {_CALIBRATE_MAX_SIZE}"}), 400
+    if type(rounds) is not int or not 0 < rounds <= _CALIBRATE_MAX_ROUNDS:
+        return jsonify({"error": f"rounds must be between 1 and {_CALIBRATE_MAX_ROUNDS}"}), 400
+
+    with _CALIBRATIONS_LOCK:
+        for current in _CALIBRATIONS.values():
+            if current.engine == engine and current.state == "running":
+                return jsonify(current.status()), 202
+        job = _Calibration(uuid.uuid4().hex[:12], engine, sorted(set(sizes)), rounds)
+        _CALIBRATIONS[job.calibration_id] = job
+    threading.Thread(target=job.run, name=f"tts-calibrate-{job.calibration_id}",
+                     daemon=True).start()
+    return jsonify(job.status()), 202
+
+
+@app.route("/calibrate/<calibration_id>", methods=["GET"])
+def calibrate_status(calibration_id: str):
+    job = _CALIBRATIONS.get(calibration_id)
+    if job is None:
+        return jsonify({"error": "Unknown calibration"}), 404
+    return jsonify(job.status())
+
+
+# ---------------------------------------------------------------------------
+# Audiobook export (whole .txt / .md files)
+#
+# POST /export starts a background job that streams a text file through the
+# normalizer and segmenter block by block and appends the encoded audio to an
+# output file on disk.  After every block a checkpoint (<output>.export.json)
+# records the source byte offset and output length, so re-posting the same
+# export after an interruption resumes where it stopped.  Only one block of
+# text and audio is held in memory at a time, however large the book is.
+# ---------------------------------------------------------------------------
+
+# Characters of source text synthesized (and checkpointed) per block
+_EXPORT_BLOCK_CHARS = 600
+_WAV_HEADER_BYTES = 44
+
+
+def _wav_header(data_bytes: int | None, rate: int) -> bytes:
+    """44-byte header for mono 16-bit PCM WAV with *data_bytes* of samples.
+
+    ``None`` writes the maximum sizes, the convention for a stream of
+    unknown length.
+    """
+    import struct
+
+    riff_bytes = 0xFFFFFFFF if data_bytes is None else 36 + data_bytes
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", riff_bytes, b"WAVE",
+        b"fmt ", 16, 1, 1, rate, rate * 2, 2, 16,
+        b"data", 0xFFFFFFFF if data_bytes is None else data_bytes,
+    )
+
+
+_MD_MARKUP = [
+    (re.compile(r"^\s*(#{1,6}|>|[-*+]|\d+\.)\s+", re.M), ""),  # headings, quotes, lists
+    (re.compile(r"!?\[([^\]]*)\]\([^)]*\)"), r"\1"),           # links / images -> text
+    (re.compile(r"^\s*(```|~~~).*$|^\s*([-*_]\s*){3,}$", re.M), ""),  # fences, rules
+    (re.compile(r"[*_`~|]+"), ""),                               # emphasis, code, tables
+]
+
+
+class _SilentJob(_Job):
+    """A _Job whose per-chunk events are not published (export blocks)."""
+
+    def publish(self, state: str, **extra) -> None:
+        pass
+
+    def progress(self, done: int, total: int) -> None:
+        pass
+
+
+class _ExportJob:
+    """One audiobook export running on a background thread."""
+
+    def __init__(self, export_id: str, source: str, output: str, engine: str, voice):
+        self.export_id = export_id
+        self.source = source
+        self.output = output
+        self.checkpoint_path = output + ".export.json"
+        self.engine = engine
+        self.voice = voice
+        self.format = "mp3" if engine == "edge-tts" else "wav"
+        self.state = "pending"
+        self.error = None
+        self.cancel = threading.Event()
+        self.source_size = os.path.getsize(source)
+        self.source_mtime = os.path.getmtime(source)
+        self.offset = 0            # source bytes fully synthesized
+        self.output_bytes = 0      # valid bytes in the output file
+        self.sample_rate = 24000
+        self.blocks_done = 0
+        self.chars_done = 0
+        self.resumed_from = 0
+        self.started = time.monotonic()
+
+    # -- checkpointing -----------------------------------------------------
+
+    def _identity(self) -> dict:
+        return {
+            "source": os.path.abspath(self.source),
+            "source_size": self.source_size,
+            "source_mtime": self.source_mtime,
+            "engine": self.engine,
+            "voice": self.voice,
+        }
+
+    def load_checkpoint(self) -> bool:
+        """Restore progress from a checkpoint of the same source/settings."""
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                cp = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if any(cp.get(k) != v for k, v in self._identity().items()):
+            return False
+        if not os.path.exists(self.output) or os.path.getsize(self.output) < cp["output_bytes"]:
+            return False
+        self.offset = cp["offset"]
+        self.output_bytes = cp["output_bytes"]
+        self.sample_rate = cp.get("sample_rate", self.sample_rate)
+        self.blocks_done = cp.get("blocks_done", 0)
+        self.chars_done = cp.get("chars_done", 0)
+        self.resumed_from = self.offset
+        return True
+
+    def _save_checkpoint(self) -> None:
+        cp = {
+            **self._identity(),
+            "offset": self.offset,
+            "output_bytes": self.output_bytes,
+            "sample_rate": self.sample_rate,
+            "blocks_done": self.blocks_done,
+            "chars_done": self.chars_done,
+        }
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cp, f, ensure_ascii=False)
+        os.replace(tmp, self.checkpoint_path)
+
+    # -- source streaming --------------------------------------------------
+
+    def _blocks(self):
+        """Yield (text, end_offset) blocks of about _EXPORT_BLOCK_CHARS chars.
+
+        Blocks end at line boundaries where possible; *end_offset* is the
+        source byte offset just past the block, used as the resume point.
+        """
+        import codecs
+
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with open(self.source, "rb") as f:
+            f.seek(self.offset)
+            if self.offset == 0 and f.read(3) != codecs.BOM_UTF8:
+                f.seek(0)
+            parts: list[str] = []
+            size = 0
+            while True:
+                raw = f.readline(_EXPORT_BLOCK_CHARS * 4)
+                if raw:
+                    line = decoder.decode(raw)
+                    parts.append(line)
+                    size += len(line)
+                if size and (not raw or size >= _EXPORT_BLOCK_CHARS):
+                    # Bytes of a split multi-byte char stay with the next block
+                    pending = len(decoder.getstate()[0])
+                    yield "".join(parts), f.tell() - pending
+                    parts, size = [], 0
+                if not raw:
+                    return
+
+    def _clean(self, text: str) -> str:
+        if self.source.lower().endswith(".md"):
+            for pattern, repl in _MD_MARKUP:
+                text = pattern.sub(repl, text)
+        return _normalize_text(text)
+
+    # -- synthesis -----------------------------------------------------------
+
+    def _append_block(self, out, text: str) -> None:
+        """Synthesize one cleaned block and append its audio to *out*."""
+        job = _SilentJob(self.export_id, self.engine, len(text))
+        if self.engine == "edge-tts":
+            self.output_bytes += _edge_tts_synthesize(text, self.voice, out)
+            return
+
+        if self.engine == "index-tts":
+            pcm_blocks = []
+            for chunk in _split_text(text, _chunk_max("index-tts")):
+                self.sample_rate, pcm = _INDEXTTS_WORKER.synthesize(chunk, self.voice, job)
+                pcm_blocks.append(pcm.tobytes())
+        else:
+            seg_pcm, _ = _chattts_segments_pcm(
+                _split_segments(text, _chunk_max("chattts")), job, cache=False)
+            pcm_blocks = [pcm.tobytes() for pcm in seg_pcm if pcm is not None]
+
+        for pcm in pcm_blocks:
+            out.write(pcm)
+            self.output_bytes += len(pcm)
+
+    def run(self) -> None:
+        self.state = "running"
+        self._publish()
+        try:
+            mode = "r+b" if self.output_bytes else "wb"
+            with open(self.output, mode) as out:
+                if self.output_bytes:
+                    # Drop anything written after the last checkpoint
+                    out.truncate(self.output_bytes)
+                    out.seek(self.output_bytes)
+                elif self.format == "wav":
+                    out.write(_wav_header(0, self.sample_rate))
+                    self.output_bytes = _WAV_HEADER_BYTES
+
+                for text, end_offset in self._blocks():
+                    if self.cancel.is_set():
+                        self.state = "cancelled"
+                        break
+                    cleaned = self._clean(text)
+                    if cleaned:
+                        self._append_block(out, cleaned)
+                    if self.format == "wav":
+                        out.seek(0)
+                        out.write(_wav_header(self.output_bytes - _WAV_HEADER_BYTES,
+                                              self.sample_rate))
+                        out.seek(self.output_bytes)
+                    out.flush()
+                    self.offset = end_offset
+                    self.blocks_done += 1
+                    self.chars_done += len(text)
+                    self._save_checkpoint()
+                    self._publish()
+                else:
+                    self.state = "done"
+            if self.state == "done":
+                os.unlink(self.checkpoint_path)
+        except Exception as e:
+            import traceback
+
+            self.state = "error"
+            self.error = str(e)
+            _log.info(json.dumps({
+                "event": "export_error", "export_id": self.export_id,
+                "error": str(e), "traceback": traceback.format_exc(),
+            }, ensure_ascii=False))
+        self._publish()
+
+    # -- reporting -----------------------------------------------------------
+
+    def status(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        done_now = self.offset - self.resumed_from
+        remaining = self.source_size - self.offset
+        eta = elapsed / done_now * remaining if done_now > 0 and self.state == "running" else None
+        audio_bytes = self.output_bytes - (_WAV_HEADER_BYTES if self.format == "wav" else 0)
+        return {
+            "export_id": self.export_id,
+            "state": self.state,
+            "error": self.error,
+            "source": self.source,
+            "output": self.output,
+            "engine": self.engine,
+            "format": self.format,
+            "progress": round(self.offset / self.source_size, 4) if self.source_size else 1.0,
+            "source_offset": self.offset,
+            "source_size": self.source_size,
+            "resumed_from": self.resumed_from,
+            "blocks_done": self.blocks_done,
+            "chars_done": self.chars_done,
+            "output_bytes": self.output_bytes,
+            "audio_seconds": (round(max(0, audio_bytes) / (2 * self.sample_rate), 1)
+                              if self.format == "wav" else None),
+            "elapsed": round(elapsed, 1),
+            "eta": round(eta, 1) if eta is not None else None,
+        }
+
+    def _publish(self) -> None:
+        # Subscribers get file names only, not where they live on disk
+        status = self.status()
+        status.update(source=os.path.basename(self.source), output=os.path.basename(self.output))
+        _EVENTS.publish("export", status)
+
+
+_EXPORTS: dict[str, _ExportJob] = {}
+_EXPORTS_LOCK = threading.Lock()
+
+
+@app.route("/export", methods=["POST"])
+def export_start():
+    """Start (or resume) exporting a text file to audio.
+
+    POST {"path": "book.txt", "engine": "chattts", "output": "book.wav"}
+    """
+    data = request.get_json(silent=True) or {}
+    source = data.get("path", "")
+    engine = data.get("engine", "chattts")
+    if not os.path.isfile(source):
+        return jsonify({"error": f"Source file not found: {source}"}), 400
+
+    if engine == "edge-tts":
+        if not _EDGE_TTS_AVAILABLE:
+            return None, None, "Edge TTS is not installed (pip install edge-tts)."
+        voice = data.get("voice", _EDGE_TTS_VOICE)
+    elif engine == "index-tts":
+        if not _INDEXTTS_AVAILABLE:
+            return jsonify({"error": "Index-TTS is not available"}), 400
+        voice = data.get("voice_path", _DEFAULT_VOICE_PATH)
+        if not os.path.isfile(voice):
+            return jsonify({"error": f"Voice reference file not found: {voice}"}), 400
+    else:
         if not _CHATTTS_AVAILABLE:
-            return jsonify({
-                "error": "ChatTTS is not available. Use Edge TTS, "
-                         "or install Python + requirements.txt for ChatTTS."
-            }), 400
+            return jsonify({"error": "ChatTTS is not available"}), 400
+        engine, voice = "chattts", _VOICE_SEED
 
-        import wave
+    ext = "mp3" if engine == "edge-tts" else "wav"
+    output = os.path.abspath(data.get("output") or os.path.splitext(source)[0] + "." + ext)
+    export_id = uuid.uuid5(uuid.NAMESPACE_URL, output).hex[:12]
 
-        import ChatTTS as ChatTTSModule
-        import numpy as np
+    with _EXPORTS_LOCK:
+        current = _EXPORTS.get(export_id)
+        if current is not None and current.state in ("pending", "running"):
+            return jsonify(current.status()), 202
+        job = _ExportJob(export_id, source, output, engine, voice)
+        job.load_checkpoint()
+        _EXPORTS[export_id] = job
+    threading.Thread(target=job.run, name=f"tts-export-{export_id}", daemon=True).start()
+    return jsonify(job.status()), 202
 
-        chat_instance = get_chat()
 
-        # Clean text for ChatTTS: remove characters it can't handle
-        text = re.sub(r"\r\n?", "\n", text)          # normalize line endings
-        text = text.replace("\u3000", " ")             # full-width space → normal space
-        text = re.sub(r"[^\S ]+", " ", text)           # collapse whitespace to space
-        text = re.sub(r"[""''「」『』【】]", "", text)  # remove fancy quotes/brackets
-        text = re.sub(r"[a-zA-Z0-9]+", lambda m: " " + m.group() + " ", text)  # pad alphanumeric
-        text = re.sub(r"([。！？!?]){2,}", r"\1", text)  # deduplicate ending punctuation
-        text = re.sub(r"\s+", " ", text).strip()       # collapse multiple spaces
+@app.route("/export/<export_id>", methods=["GET"])
+def export_status(export_id: str):
+    job = _EXPORTS.get(export_id)
+    if job is None:
+        return jsonify({"error": "Unknown export"}), 404
+    return jsonify(job.status())
 
-        # Split long text into manageable chunks for faster, more reliable inference
-        chunks = _split_text(text)
-        print(f"[TTS] ChatTTS: {len(chunks)} chunk(s), total {len(text)} chars",
-              flush=True)
 
-        # Build inference params with female voice
-        params = ChatTTSModule.Chat.InferCodeParams(
-            spk_emb=_spk_emb,
-            temperature=0.42,
-            top_P=0.40,
-            top_K=28,
-            prompt="[speed_5]",
-        )
+@app.route("/export/<export_id>/cancel", methods=["POST"])
+def export_cancel(export_id: str):
+    """Stop after the current block; the checkpoint allows resuming later."""
+    job = _EXPORTS.get(export_id)
+    if job is None:
+        return jsonify({"error": "Unknown export"}), 404
+    job.cancel.set()
+    return jsonify(job.status())
 
-        # Infer one chunk at a time with retry to avoid batch failures
-        print(f"[TTS]   chunks: {[len(c) for c in chunks]} chars each", flush=True)
-        all_pcm: list[np.ndarray] = []
-        max_retries = 3
-        for ci, chunk in enumerate(chunks):
-            wav_ok = None
-            for attempt in range(max_retries):
-                result = chat_instance.infer(
-                    [chunk],
-                    skip_refine_text=True,
-                    params_infer_code=params,
+
+@app.route("/exports", methods=["GET"])
+def export_list():
+    return jsonify([job.status() for job in list(_EXPORTS.values())])
+
+
+# ---------------------------------------------------------------------------
+# On-demand profiling (debug only: set TTS_DEBUG=1)
+#
+# POST /debug/profile arms the profiler for the next N /tts requests or for a
+# time window.  Each profiled request runs under cProfile and, once torch is
+# loaded, the PyTorch profiler (operator-level CPU times).  Results are read
+# back from GET /debug/profile and /debug/profile/download without
+# restarting the sidecar.
+# ---------------------------------------------------------------------------
+
+_DEBUG = os.environ.get("TTS_DEBUG") == "1"
+
+
+class _Profiler:
+    """Collects cProfile and torch profiler results across armed requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # cProfile allows one active profiler at a time; profiled requests
+        # therefore run one after another
+        self._run_lock = threading.Lock()
+        self.remaining = 0
+        self.deadline = None
+        self.use_torch = True
+        self.profiled = 0
+        self.stats = None
+        self.torch_tables: list[str] = []
+        self.torch_stacks: list[str] = []
+
+    def arm(self, requests: int, seconds: float | None, use_torch: bool) -> None:
+        with self._lock:
+            self.remaining = requests
+            self.deadline = time.monotonic() + seconds if seconds else None
+            self.use_torch = use_torch
+            self.profiled = 0
+            self.stats = None
+            self.torch_tables = []
+            self.torch_stacks = []
+
+    def armed(self) -> bool:
+        if self.deadline is not None:
+            return time.monotonic() < self.deadline
+        return self.remaining > 0
+
+    def _claim(self) -> bool:
+        with self._lock:
+            if not self.armed():
+                return False
+            if self.deadline is None:
+                self.remaining -= 1
+            return True
+
+    @contextmanager
+    def maybe_profile(self, job: _Job):
+        """Profile the enclosed block if a profiling session is armed."""
+        if not _DEBUG or not self._claim():
+            yield
+            return
+
+        import cProfile
+        import pstats
+
+        torch = sys.modules.get("torch") if self.use_torch else None
+        with self._run_lock:
+            profile = cProfile.Profile()
+            torch_prof = None
+            if torch is not None and hasattr(torch, "profiler"):
+                torch_prof = torch.profiler.profile(
+                    activities=[torch.profiler.ProfilerActivity.CPU], with_stack=True,
                 )
-                if result and len(result) > 0 and result[0] is not None and len(result[0]) > 0:
-                    wav_ok = result[0]
-                    break
-                print(f"[TTS]   chunk {ci} attempt {attempt+1}/{max_retries} failed, retrying...",
-                      flush=True)
-            if wav_ok is None:
-                print(f"[TTS]   chunk {ci} skipped after {max_retries} retries", flush=True)
-                continue
-            audio_data = np.clip(wav_ok, -1.0, 1.0)
-            pcm16 = (audio_data * 32767).astype(np.int16)
-            all_pcm.append(pcm16)
+                torch_prof.__enter__()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                if torch_prof is not None:
+                    torch_prof.__exit__(None, None, None)
+                with self._lock:
+                    self.profiled += 1
+                    if self.stats is None:
+                        self.stats = pstats.Stats(profile)
+                    else:
+                        self.stats.add(profile)
+                    if torch_prof is not None:
+                        self._collect_torch(torch_prof, job)
+                job.fields["profiled"] = True
 
-        if not all_pcm:
-            return jsonify({"error": "ChatTTS failed to generate audio for all chunks"}), 500
+    def _collect_torch(self, torch_prof, job: _Job) -> None:
+        averages = torch_prof.key_averages()
+        self.torch_tables.append(
+            f"request {job.request_id}\n"
+            + averages.table(sort_by="self_cpu_time_total", row_limit=30)
+        )
+        fd, path = tempfile.mkstemp(suffix=".stacks")
+        os.close(fd)
+        try:
+            torch_prof.export_stacks(path, "self_cpu_time_total")
+            with open(path, encoding="utf-8") as f:
+                self.torch_stacks.append(f.read())
+        finally:
+            os.unlink(path)
 
-        # Concatenate all chunks
-        combined = np.concatenate(all_pcm) if len(all_pcm) > 1 else all_pcm[0]
+    def summary(self, limit: int = 40) -> str:
+        if self.stats is None:
+            return ""
+        buf = io.StringIO()
+        self.stats.stream = buf
+        self.stats.sort_stats("cumulative").print_stats(limit)
+        return buf.getvalue()
 
-        # Encode as WAV using stdlib wave module
-        buf = io.BytesIO()
-        with wave.open(buf, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)  # 16-bit
-            wf.setframerate(24000)
-            wf.writeframes(combined.tobytes())
-        audio_bytes = buf.getvalue()
-        audio_b64 = base64.b64encode(audio_bytes).decode("utf-8")
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "armed": self.armed(),
+                "remaining": self.remaining if self.deadline is None else None,
+                "seconds_left": (round(max(0.0, self.deadline - time.monotonic()), 1)
+                                 if self.deadline is not None else None),
+                "profiled_requests": self.profiled,
+                "summary": self.summary(),
+                "torch_ops": "\n\n".join(self.torch_tables),
+            }
 
-        return jsonify({"audio": audio_b64, "format": "wav"})
-    except Exception as e:
-        import traceback
-        tb = traceback.format_exc()
-        print(f"[TTS] Error: {tb}", flush=True)
-        return jsonify({"error": str(e), "traceback": tb}), 500
+    def export(self, fmt: str) -> bytes | None:
+        """Serialized results: "pstats" (marshal, as cProfile's dump_stats)
+        or "stacks" (torch collapsed stacks)."""
+        import marshal
+
+        with self._lock:
+            if fmt == "stacks" and self.torch_stacks:
+                return "".join(self.torch_stacks).encode("utf-8")
+            if fmt == "pstats" and self.stats is not None:
+                return marshal.dumps(self.stats.stats)
+        return None
+
+
+_PROFILER = _Profiler()
+
+
+@app.route("/debug/profile", methods=["GET", "POST"])
+def debug_profile():
+    if not _DEBUG:
+        return jsonify({"error": "Not found"}), 404
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        seconds = data.get("seconds")
+        _PROFILER.arm(
+            requests=int(data.get("requests", 1)),
+            seconds=float(seconds) if seconds else None,
+            use_torch=bool(data.get("torch", True)),
+        )
+    return jsonify(_PROFILER.status())
+
+
+@app.route("/debug/profile/download", methods=["GET"])
+def debug_profile_download():
+    """Download results: ?format=pstats (cProfile, for snakeviz/flameprof)
+    or ?format=stacks (torch collapsed stacks, for flamegraph.pl/speedscope)."""
+    if not _DEBUG:
+        return jsonify({"error": "Not found"}), 404
+    fmt = request.args.get("format", "pstats")
+    payload = _PROFILER.export(fmt)
+    if payload is None:
+        return jsonify({"error": "No profile collected"}), 404
+    if fmt == "stacks":
+        name, mimetype = "tts_torch.stacks", "text/plain"
+    else:
+        name, mimetype = "tts.prof", "application/octet-stream"
+    return send_file(io.BytesIO(payload), mimetype=mimetype,
+                     as_attachment=True, download_name=name)
+
+
+_PAYLOAD_MAX_BYTES = 256 * 1024 * 1024
+
+
+@app.route("/debug/payload", methods=["GET"])
+def debug_payload():
+    """?bytes=N of zeros with a Content-Length, sized like a spooled result."""
+    if not _DEBUG:
+        return jsonify({"error": "Not found"}), 404
+    n = request.args.get("bytes", 1024 * 1024, type=int)
+    if not 0 <= n <= _PAYLOAD_MAX_BYTES:
+        return jsonify({"error": f"bytes must be 0..{_PAYLOAD_MAX_BYTES}"}), 400
+    return Response(bytes(n), mimetype="application/octet-stream")
+
+
+# ---------------------------------------------------------------------------
+# Listeners
+#
+# The server always listens on TCP 127.0.0.1:9966.  --uds PATH (or
+# TTS_UDS_PATH) adds a Unix domain socket serving the same routes, which
+# skips the loopback TCP stack for local clients.  Both listeners keep
+# HTTP/1.1 connections alive, so a client reusing a connection pays the
+# connect cost once instead of once per request.
+# ---------------------------------------------------------------------------
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+from werkzeug.wsgi import LimitedStream
+
+_UDS_PATH = os.environ.get("TTS_UDS_PATH") or None
+_KEEPALIVE_SECONDS = float(os.environ.get("TTS_KEEPALIVE_SECONDS", "60"))
+
+
+class _NoRead:
+    """Stands in for rfile while the app runs: Werkzeug drains whatever is
+    left on the socket after each response, which on a kept-alive
+    connection would swallow the client's next request."""
+
+    @staticmethod
+    def read(*_args) -> bytes:
+        return b""
+
+
+class _KeepAliveHandler(WSGIRequestHandler):
+    """Werkzeug's handler, minus the unconditional `Connection: close`.
+
+    The app reads its body through a LimitedStream, which is drained after
+    the response so a route that ignores its body doesn't leave bytes
+    behind to be parsed as the next request.  Idle connections are closed
+    after TTS_KEEPALIVE_SECONDS.
+    """
+
+    protocol_version = "HTTP/1.1"
+    timeout = _KEEPALIVE_SECONDS
+
+    def setup(self):
+        super().setup()
+        if self.connection.family != getattr(socket, "AF_UNIX", None):
+            # Headers and body go out in separate writes; without this a
+            # reused connection stalls on Nagle + delayed ACK (~40 ms)
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def make_environ(self):
+        environ = super().make_environ()
+        if not environ.get("wsgi.input_terminated"):
+            length = int(self.headers.get("Content-Length") or 0)
+            self._body = LimitedStream(self.rfile, length)
+            environ["wsgi.input"] = self._body
+        self.rfile = _NoRead()
+        return environ
+
+    def run_wsgi(self):
+        rfile, self._body = self.rfile, None
+        try:
+            super().run_wsgi()
+        except BaseException:
+            self.close_connection = True
+            raise
+        finally:
+            self.rfile = rfile
+        if self._body is None:
+            # Chunked request bodies aren't length-delimited; don't guess
+            self.close_connection = True
+        else:
+            self._body.exhaust()
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == "connection" and value.lower() == "close":
+            if not self.close_connection:
+                return
+        super().send_header(keyword, value)
+
+
+def _serve(host: str, port: int, uds: str | None = None) -> None:
+    """Serve on TCP, plus a Unix socket at *uds*, until interrupted."""
+    servers = [make_server(host, port, app, threaded=True,
+                           request_handler=_KeepAliveHandler)]
+    if uds:
+        # Werkzeug replaces a stale socket file left by an earlier run
+        servers.append(make_server(f"unix://{uds}", 0, app, threaded=True,
+                                   request_handler=_KeepAliveHandler))
+        os.chmod(uds, 0o600)
+    for server in servers[1:]:
+        threading.Thread(target=server.serve_forever, daemon=True,
+                         name="tts-uds").start()
+    try:
+        servers[0].serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.server_close()
+        if uds:
+            try:
+                os.unlink(uds)
+            except OSError:
+                pass
+
+
+def _mount_webui() -> None:
+    """Mount the voice-tuning web UI blueprint at /webui."""
+    # When run as a script this module is __main__; alias it so tts_webui's
+    # `import tts_server` reuses this instance (and its loaded model).
+    sys.modules.setdefault("tts_server", sys.modules[__name__])
+    import tts_webui
+
+    app.register_blueprint(tts_webui.webui, url_prefix="/webui")
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="TTS HTTP server for Comic Viewer")
+    parser.add_argument("--calibrate", metavar="ENGINE", choices=sorted(_CALIBRATORS),
+                        help="measure the best chunk size for ENGINE on this machine and exit")
+    parser.add_argument("--sizes", default=",".join(map(str, _CALIBRATE_SIZES)),
+                        help="comma-separated chunk sizes to try with --calibrate")
+    parser.add_argument("--rounds", type=int, default=1,
+                        help="passes over the calibration corpus per size / benchmark mode")
+    parser.add_argument("--bench-pipeline", action="store_true",
+                        help="compare pipelined and serial ChatTTS post-processing and exit")
+    parser.add_argument("--port", type=int, default=9966, help="TCP port to listen on")
+    parser.add_argument("--uds", metavar="PATH", default=_UDS_PATH,
+                        help="also serve on a Unix domain socket at PATH (or TTS_UDS_PATH)")
+    parser.add_argument("--pin-checkpoint", metavar="DIR", nargs="?", const=_CHECKPOINT_DIR,
+                        help="copy and verify the ChatTTS checkpoint into DIR for offline, "
+                             f"memory-mapped loading (default {_CHECKPOINT_DIR}) and exit")
+    args = parser.parse_args()
+
+    if args.pin_checkpoint:
+        if os.path.abspath(args.pin_checkpoint) != os.path.abspath(_CHECKPOINT_DIR):
+            print(f"  Set TTS_CHATTTS_CHECKPOINT_DIR={args.pin_checkpoint} to use it", flush=True)
+        _pin_checkpoint(args.pin_checkpoint)
+        sys.exit(0)
+
+    if args.calibrate:
+        _calibrate(args.calibrate, [int(n) for n in args.sizes.split(",")], args.rounds)
+        sys.exit(0)
+
+    if args.bench_pipeline:
+        try:
+            _bench_pipeline(args.rounds)
+        except RuntimeError as e:
+            sys.exit(f"[TTS] {e}")
+        sys.exit(0)
+
     print("TTS server starting...", flush=True)
     if _CHATTTS_AVAILABLE:
         print("  ChatTTS: available (model loads on first use)", flush=True)
+        _mount_webui()
+        print(f"  Voice tuning UI: http://127.0.0.1:{args.port}/webui/", flush=True)
     else:
         print("  ChatTTS: not installed (Edge TTS only mode)", flush=True)
-    try:
-        import edge_tts  # noqa: F401
+    if _EDGE_TTS_AVAILABLE:
         print("  Edge TTS: available", flush=True)
-    except ImportError:
+    else:
         print("  Edge TTS: not installed (pip install edge-tts)", flush=True)
     if _INDEXTTS_AVAILABLE:
         print(f"  Index-TTS: available (venv at {_INDEXTTS_DIR})", flush=True)
         print(f"  Index-TTS python: {_INDEXTTS_VERIFIED_PYTHON}", flush=True)
     else:
         print(f"  Index-TTS: not found (expected venv at {_INDEXTTS_DIR})", flush=True)
-    print(f"  Listening on http://127.0.0.1:9966", flush=True)
+    if args.uds and not hasattr(socket, "AF_UNIX"):
+        print("[TTS] --uds: Unix domain sockets are not supported on this platform", flush=True)
+        sys.exit(2)
+    print(f"  Listening on http://127.0.0.1:{args.port}", flush=True)
+    if args.uds:
+        print(f"  Listening on unix://{args.uds}", flush=True)
 
-    app.run(host="127.0.0.1", port=9966)
+    _serve("127.0.0.1", args.port, args.uds)
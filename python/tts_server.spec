@@ -42,6 +42,9 @@ a = Analysis(
     excludes=[
         # Exclude ChatTTS, Index-TTS and heavy ML dependencies (not needed for Edge TTS)
         "ChatTTS",
+        "chattts_onnx",
+        "onnx",
+        "onnxruntime",
         "indextts",
         "torch",
         "torchaudio",
@@ -1,7 +1,14 @@
 """
 ChatTTS Voice Tuning Web UI
 
-Usage:
+The UI is a Flask blueprint.  tts_server.py mounts it at /webui, so voice
+tuning shares the reader app's model, inference scheduling and speaker
+embeddings:
+
+  python tts_server.py
+  # open http://127.0.0.1:9966/webui/
+
+Standalone usage (own process, same code path):
   cd D:\\gitcode\\comic-viewer\\python
   python tts_webui.py
 
@@ -10,33 +17,23 @@ Then open http://127.0.0.1:9977 in your browser.
 
 # Import tts_server first to trigger all compatibility patches
 # (base16384 shim, transformers v5 encode_plus, DynamicCache fix)
-import tts_server  # noqa: F401
+import tts_server
 
-import base64
-import io
-import random
+import os
+import uuid
 import wave
 
-import ChatTTS as ChatTTSModule
-import numpy as np
-import torch
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, jsonify, request, send_file
 
-app = Flask(__name__)
-chat = None
+webui = Blueprint("webui", __name__)
 
-
-def get_chat():
-    global chat
-    if chat is None:
-        chat = ChatTTSModule.Chat()
-        use_gpu = torch.cuda.is_available()
-        chat.load(compile=use_gpu)
-        if use_gpu:
-            print(f"[WebUI] Using GPU: {torch.cuda.get_device_name(0)}", flush=True)
-        else:
-            print("[WebUI] Using CPU", flush=True)
-    return chat
+# Generated clips are kept on disk and referenced by URL from the page, so
+# auditioning many seeds doesn't pile base64 audio up in the browser tab
+_MAX_CLIPS = int(os.environ.get("TTS_WEBUI_MAX_CLIPS", "200"))
+_CLIPS = tts_server._ResultStore(os.path.join(tts_server._RESULT_DIR, "webui"),
+                                 tts_server._RESULT_TTL_SECONDS, max_entries=_MAX_CLIPS)
+# Texts per batched infer call in a seed sweep
+_SWEEP_BATCH = int(os.environ.get("TTS_SWEEP_BATCH", "8"))
 
 
 HTML_PAGE = """<!DOCTYPE html>
@@ -93,12 +90,12 @@ HTML_PAGE = """<!DOCTYPE html>
   .seed-row {
     display: flex; gap: 10px; align-items: center;
   }
-  input[type="number"] {
+  input[type="number"], input[type="text"] {
     flex: 1; background: #0f3460; border: 1px solid #1a3a6e;
     border-radius: 8px; color: #eee; padding: 8px 12px; font-size: 1em;
     outline: none;
   }
-  input[type="number"]:focus { border-color: #4a9eff; }
+  input[type="number"]:focus, input[type="text"]:focus { border-color: #4a9eff; }
 
   .btn {
     padding: 10px 20px; border: none; border-radius: 8px;
@@ -217,11 +214,29 @@ HTML_PAGE = """<!DOCTYPE html>
     </button>
   </div>
 
+  <!-- Seed Sweep -->
+  <div class="card">
+    <label>批量試聽 Seeds（例如 1-50 或 3,7,42；使用上方參數）</label>
+    <div class="seed-row">
+      <input type="text" id="sweepSeeds" value="1-20">
+      <button class="btn btn-secondary" id="sweepBtn" onclick="sweep()">批量試聽</button>
+    </div>
+  </div>
+
   <!-- Status & Audio -->
   <div class="card">
     <div class="status" id="status">準備就緒，請點擊「生成語音」</div>
     <div class="audio-section" id="audioSection" style="display:none">
       <audio id="audioPlayer" controls></audio>
+      <div class="param-group">
+        <div class="param-label">
+          <span>語速倍率（不重新生成）</span>
+          <span class="param-value" id="rateVal">1.00</span>
+        </div>
+        <input type="range" id="rate" min="0.5" max="2" step="0.05" value="1"
+               oninput="document.getElementById('rateVal').textContent=parseFloat(this.value).toFixed(2)"
+               onchange="restretch()">
+      </div>
     </div>
   </div>
 
@@ -268,6 +283,17 @@ function copyParams() {
 }
 
 let historyItems = [];
+// Last generated clip at its original rate; re-timing always starts from it
+let lastClip = null;
+
+function currentParams() {
+  return {
+    temperature: parseFloat(document.getElementById('temperature').value),
+    top_P: parseFloat(document.getElementById('topP').value),
+    top_K: parseInt(document.getElementById('topK').value),
+    speed: parseInt(document.getElementById('speed').value),
+  };
+}
 
 async function generate() {
   const btn = document.getElementById('genBtn');
@@ -293,7 +319,7 @@ async function generate() {
   updateParamsDisplay();
 
   try {
-    const resp = await fetch('/generate', {
+    const resp = await fetch('generate', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({ text, seed, temperature, top_P: topP, top_K: topK, speed })
@@ -305,7 +331,7 @@ async function generate() {
       return;
     }
 
-    const audioSrc = 'data:audio/wav;base64,' + data.audio;
+    const audioSrc = data.url;
     audioPlayer.src = audioSrc;
     audioSection.style.display = 'block';
     audioPlayer.play();
@@ -314,6 +340,10 @@ async function generate() {
 
     // Add to history
     addHistory(seed, temperature, topP, topK, speed, audioSrc);
+    renderHistory();
+    lastClip = { seed, temperature, topP, topK, speed, url: audioSrc };
+    document.getElementById('rate').value = 1;
+    document.getElementById('rateVal').textContent = '1.00';
 
   } catch (e) {
     status.textContent = '請求失敗: ' + e.message;
@@ -324,21 +354,111 @@ async function generate() {
   }
 }
 
+async function restretch() {
+  if (!lastClip) return;
+  const status = document.getElementById('status');
+  const rate = parseFloat(document.getElementById('rate').value);
+  const audioPlayer = document.getElementById('audioPlayer');
+  if (rate === 1) { audioPlayer.src = lastClip.url; audioPlayer.play(); return; }
+  try {
+    const resp = await fetch('stretch', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ clip: lastClip.url, rate })
+    });
+    const data = await resp.json();
+    if (data.error) {
+      status.textContent = '錯誤: ' + data.error;
+      status.className = 'status error';
+      return;
+    }
+    audioPlayer.src = data.url;
+    audioPlayer.play();
+    status.textContent = `seed=${lastClip.seed} 語速 ×${rate.toFixed(2)}`;
+    status.className = 'status';
+    const c = lastClip;
+    addHistory(c.seed, c.temperature, c.topP, c.topK, `${c.speed} ×${rate.toFixed(2)}`, data.url);
+    renderHistory();
+  } catch (e) {
+    status.textContent = '請求失敗: ' + e.message;
+    status.className = 'status error';
+  }
+}
+
+function parseSeeds(spec) {
+  const seeds = [];
+  for (const part of spec.split(/[,\\s]+/).filter(Boolean)) {
+    const m = part.match(/^(\\d+)-(\\d+)$/);
+    if (m) {
+      for (let s = parseInt(m[1]); s <= parseInt(m[2]); s++) seeds.push(s);
+    } else if (/^\\d+$/.test(part)) {
+      seeds.push(parseInt(part));
+    }
+  }
+  return seeds;
+}
+
+async function sweep() {
+  const btn = document.getElementById('sweepBtn');
+  const status = document.getElementById('status');
+  const text = document.getElementById('text').value.trim();
+  const seeds = parseSeeds(document.getElementById('sweepSeeds').value);
+
+  if (!text) { status.textContent = '請輸入測試文字'; status.className = 'status error'; return; }
+  if (!seeds.length) { status.textContent = '請輸入 seeds'; status.className = 'status error'; return; }
+
+  btn.disabled = true;
+  status.textContent = `正在生成 ${seeds.length} 個 seed...`;
+  status.className = 'status loading';
+
+  try {
+    const resp = await fetch('sweep', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ text, seeds, params: [currentParams()] })
+    });
+    const data = await resp.json();
+    if (data.error) {
+      status.textContent = '錯誤: ' + data.error;
+      status.className = 'status error';
+      return;
+    }
+    data.clips.slice().reverse().forEach(c =>
+      addHistory(c.seed, c.temperature, c.top_P, c.top_K, c.speed, c.url));
+    renderHistory();
+    status.textContent = `${data.clips.length} 個片段生成完成！點擊 seed 套用`;
+    status.className = 'status';
+  } catch (e) {
+    status.textContent = '請求失敗: ' + e.message;
+    status.className = 'status error';
+  } finally {
+    btn.disabled = false;
+  }
+}
+
+function useSeed(seed) {
+  document.getElementById('seed').value = seed;
+  updateParamsDisplay();
+}
+
 function addHistory(seed, temp, topP, topK, speed, audioSrc) {
+  // Clips live on the server (bounded store); the page only keeps their URLs
   historyItems.unshift({ seed, temp, topP, topK, speed, audioSrc });
-  if (historyItems.length > 20) historyItems.pop();
+  if (historyItems.length > 200) historyItems.pop();
+}
 
+function renderHistory() {
   const container = document.getElementById('history');
   container.innerHTML = '';
   historyItems.forEach((item, idx) => {
     const div = document.createElement('div');
     div.className = 'history-item';
     div.innerHTML = `
-      <span class="seed-tag">seed ${item.seed}</span>
+      <span class="seed-tag" onclick="useSeed(${item.seed})">seed ${item.seed}</span>
       <span style="font-size:0.75em;color:#a0a0c0">
         t=${item.temp} P=${item.topP} K=${item.topK} spd=${item.speed}
       </span>
-      <audio src="${item.audioSrc}" controls style="flex:1;height:32px"></audio>
+      <audio src="${item.audioSrc}" controls preload="none" style="flex:1;height:32px"></audio>
     `;
     container.appendChild(div);
   });
@@ -348,13 +468,71 @@ function addHistory(seed, temp, topP, topK, speed, audioSrc) {
 </html>"""
 
 
-@app.route("/")
+@webui.route("/")
 def index():
     return HTML_PAGE
 
 
-@app.route("/generate", methods=["POST"])
+def _sampling_params(data: dict, defaults: dict | None = None) -> dict:
+    """temperature / top_P / top_K / speed from a request (or *defaults*)."""
+    defaults = defaults or {}
+    return {
+        "temperature": float(data.get("temperature", defaults.get("temperature", 0.3))),
+        "top_P": float(data.get("top_P", defaults.get("top_P", 0.7))),
+        "top_K": int(data.get("top_K", defaults.get("top_K", 20))),
+        "speed": int(data.get("speed", defaults.get("speed", 5))),
+    }
+
+
+def _store_clip(wav) -> str:
+    """Save a float (or int16) waveform as a 24 kHz WAV clip; returns its relative URL."""
+    import numpy as np
+
+    if wav.dtype == np.int16:
+        pcm16 = wav
+    else:
+        pcm16 = (np.clip(wav, -1.0, 1.0) * 32767).astype(np.int16)
+    clip_id, path = _CLIPS.create("wav")
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(24000)
+        wf.writeframes(pcm16.tobytes())
+    return f"clips/{clip_id}.wav"
+
+
+@webui.route("/clips/<name>")
+def clips(name: str):
+    entry = _CLIPS.get(name.partition(".")[0])
+    if entry is None:
+        return jsonify({"error": "Clip not found or expired"}), 404
+    return send_file(entry["path"], mimetype="audio/wav", conditional=True, max_age=0)
+
+
+@webui.route("/stretch", methods=["POST"])
+def stretch():
+    """Re-time a clip without resynthesizing: {"clip": "clips/<id>.wav", "rate": 1.2}."""
+    import numpy as np
+
+    data = request.get_json(silent=True) or {}
+    entry = _CLIPS.get(os.path.basename(str(data.get("clip", ""))).partition(".")[0])
+    if entry is None:
+        return jsonify({"error": "Clip not found or expired"}), 404
+    try:
+        rate = tts_server._parse_rate(data.get("rate", 1.0))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with wave.open(entry["path"], "rb") as wf:
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    return jsonify({"url": _store_clip(tts_server._time_stretch(pcm, rate)),
+                    "format": "wav", "rate": rate})
+
+
+@webui.route("/generate", methods=["POST"])
 def generate():
+    import ChatTTS as ChatTTSModule
+
     data = request.get_json(silent=True) or {}
     text = data.get("text", "").strip()
     seed = int(data.get("seed", 2))
@@ -367,11 +545,8 @@ def generate():
         return jsonify({"error": "No text provided"}), 400
 
     try:
-        chat_instance = get_chat()
-
-        # Generate speaker embedding from seed
-        torch.manual_seed(seed)
-        spk_emb = chat_instance.sample_random_speaker()
+        # Speaker embedding from seed (cached and shared with the TTS server)
+        spk_emb = tts_server.speaker_for_seed(seed)
 
         # Build inference params
         params = ChatTTSModule.Chat.InferCodeParams(
@@ -385,20 +560,96 @@ def generate():
         print(f"[WebUI] Generating: seed={seed} temp={temperature} "
               f"top_P={top_P} top_K={top_K} speed={speed}", flush=True)
 
-        wavs = chat_instance.infer([text], params_infer_code=params)
-        audio_data = np.clip(wavs[0], -1.0, 1.0)
-        pcm16 = (audio_data * 32767).astype(np.int16)
+        wavs = tts_server.chattts_infer([text], params_infer_code=params)
+        return jsonify({"url": _store_clip(wavs[0]), "format": "wav", "seed": seed})
+
+    except Exception as e:
+        import traceback
+        tb = traceback.format_exc()
+        print(f"[WebUI] Error: {tb}", flush=True)
+        return jsonify({"error": str(e), "traceback": tb}), 500
+
+
+@webui.route("/sweep", methods=["POST"])
+def sweep():
+    """Generate one clip per seed x parameter set.
 
-        buf = io.BytesIO()
-        with wave.open(buf, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(24000)
-            wf.writeframes(pcm16.tobytes())
+    POST {"text": "...", "seeds": [1, 2, 3],
+          "params": [{"temperature": 0.3, "top_P": 0.7, "top_K": 20, "speed": 5}]}
+    "params" defaults to a single set read from the top-level fields.
 
-        audio_b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
-        return jsonify({"audio": audio_b64, "format": "wav", "seed": seed})
+    The text is refined once and shared by every clip ("refine": false skips
+    refinement).  ChatTTS takes one speaker and one set of sampling
+    parameters per infer call, so each seed needs calls of its own; clips
+    that share both (differing only in the speed prompt) are synthesized
+    together in batches of up to _SWEEP_BATCH texts.  The refinement and
+    each infer call are admitted separately by the server's admission
+    control, so a sweep's size is bounded by _MAX_CLIPS, not the budget.
+    """
+    import ChatTTS as ChatTTSModule
 
+    data = request.get_json(silent=True) or {}
+    text = data.get("text", "").strip()
+    try:
+        seeds = [int(seed) for seed in data.get("seeds", [])]
+        base = _sampling_params(data)
+        param_sets = [_sampling_params(p, base) for p in data.get("params") or [{}]]
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid seeds or params: {e}"}), 400
+    combos = [(seed, p) for p in param_sets for seed in seeds]
+
+    if not text:
+        return jsonify({"error": "No text provided"}), 400
+    if not combos:
+        return jsonify({"error": "No seeds provided"}), 400
+    if len(combos) > _MAX_CLIPS:
+        return jsonify({"error": f"Too many clips ({len(combos)} > {_MAX_CLIPS})"}), 400
+
+    job = tts_server._Job(uuid.uuid4().hex[:12], "chattts", len(text) * len(combos))
+
+    def admitted(texts: int):
+        # Clips go straight to disk; the batch's texts are inferred in one call
+        cost = tts_server._estimate_cost("chattts", len(text) * texts, spool=True, chunked=False)
+        return tts_server._ADMISSION.admit(job, cost)
+
+    try:
+        if data.get("refine", True):
+            with admitted(1):
+                text = tts_server.chattts_infer([text], refine_text_only=True,
+                                                split_text=False)[0]
+
+        # Speaker, temperature, top_P and top_K are per infer call; speed
+        # is a text prompt
+        groups: dict[tuple, list[int]] = {}
+        for i, (seed, p) in enumerate(combos):
+            key = (seed, p["temperature"], p["top_P"], p["top_K"])
+            groups.setdefault(key, []).append(i)
+
+        print(f"[WebUI] Sweep: {len(combos)} clips in {len(groups)} infer groups",
+              flush=True)
+        urls: list[str | None] = [None] * len(combos)
+        for (seed, temperature, top_P, top_K), members in groups.items():
+            params = ChatTTSModule.Chat.InferCodeParams(
+                spk_emb=tts_server.speaker_for_seed(seed),
+                temperature=temperature,
+                top_P=top_P,
+                top_K=top_K,
+                prompt="",
+            )
+            for start in range(0, len(members), _SWEEP_BATCH):
+                batch = members[start:start + _SWEEP_BATCH]
+                with admitted(len(batch)):
+                    wavs = tts_server.chattts_infer(
+                        [f"[speed_{combos[i][1]['speed']}]{text}" for i in batch],
+                        skip_refine_text=True, split_text=False, params_infer_code=params)
+                for i, wav in zip(batch, wavs):
+                    urls[i] = _store_clip(wav)
+
+        clips = [{"seed": seed, **p, "url": url} for (seed, p), url in zip(combos, urls)]
+        return jsonify({"text": text, "clips": clips})
+
+    except tts_server._Overloaded as e:
+        return tts_server._overloaded_response(e)
     except Exception as e:
         import traceback
         tb = traceback.format_exc()
@@ -406,12 +657,21 @@ def generate():
         return jsonify({"error": str(e), "traceback": tb}), 500
 
 
+def create_app() -> Flask:
+    """Build a standalone Flask app serving the web UI at the root."""
+    app = Flask(__name__)
+    app.register_blueprint(webui)
+    return app
+
+
 if __name__ == "__main__":
     print("=" * 50, flush=True)
     print("ChatTTS Voice Tuning Web UI", flush=True)
     print("Open http://127.0.0.1:9977 in your browser", flush=True)
+    print("(also available at http://127.0.0.1:9966/webui/ when tts_server.py runs)",
+          flush=True)
     print("=" * 50, flush=True)
     print("Loading model...", flush=True)
-    get_chat()
+    tts_server.get_chat()
     print("Model loaded. Ready!", flush=True)
-    app.run(host="127.0.0.1", port=9977)
+    create_app().run(host="127.0.0.1", port=9977)
@@ -5,10 +5,10 @@ use serde::Serialize;
 use sha2::{Digest, Sha256};
 use std::collections::HashMap;
 use std::fs;
-use std::io::Read;
+use std::io::{Read, Write};
 use std::path::{Path, PathBuf};
 use std::process::{Child, Command};
-use std::sync::Mutex;
+use std::sync::{Mutex, OnceLock};
 use tauri::{Manager, State};
 use zip::ZipArchive;
 
@@ -471,6 +471,14 @@ pub async fn get_text_info(path: String) -> Result<TextInfo, String> {
 
 // ---------- Tauri Commands: TTS ----------
 
+const TTS_SERVER_URL: &str = "http://127.0.0.1:9966";
+
+/// Shared HTTP client, so TTS calls reuse the server's keep-alive connections.
+fn tts_client() -> &'static reqwest::Client {
+    static CLIENT: OnceLock<reqwest::Client> = OnceLock::new();
+    CLIENT.get_or_init(reqwest::Client::new)
+}
+
 #[tauri::command]
 pub async fn tts_start(
     state: State<'_, Mutex<TtsState>>,
@@ -545,9 +553,8 @@ pub async fn tts_status(state: State<'_, Mutex<TtsState>>) -> Result<String, Str
     }; // MutexGuard dropped here
 
     if should_ping {
-        let client = reqwest::Client::new();
-        match client
-            .get("http://127.0.0.1:9966/health")
+        match tts_client()
+            .get(format!("{}/health", TTS_SERVER_URL))
             .timeout(std::time::Duration::from_secs(1))
             .send()
             .await
@@ -565,8 +572,78 @@ pub async fn tts_status(state: State<'_, Mutex<TtsState>>) -> Result<String, Str
     Ok(tts.status.clone())
 }
 
+/// Spooled results kept in the local cache; older ones are deleted.
+const TTS_CACHE_KEEP: usize = 20;
+
+/// Local copy of the spooled result at `url`: `<app cache>/tts/<file name>`.
+fn tts_cache_path(app: &tauri::AppHandle, url: &str) -> Result<PathBuf, String> {
+    let name = url
+        .rsplit('/')
+        .next()
+        .filter(|n| !n.is_empty() && !n.contains(".."))
+        .ok_or_else(|| "Invalid result URL".to_string())?;
+    let cache_dir = app.path().app_cache_dir().map_err(|e| e.to_string())?;
+    Ok(cache_dir.join("tts").join(name))
+}
+
+/// Stream the body of `url` into a file at `path`.
+async fn download_to(url: &str, path: &Path) -> Result<(), String> {
+    let mut resp = tts_client()
+        .get(url)
+        .send()
+        .await
+        .map_err(|e| format!("Failed to fetch audio: {}", e))?;
+    if !resp.status().is_success() {
+        return Err(format!("Failed to fetch audio: HTTP {}", resp.status()));
+    }
+    let mut file = fs::File::create(path).map_err(|e| format!("Failed to write file: {}", e))?;
+    while let Some(chunk) = resp
+        .chunk()
+        .await
+        .map_err(|e| format!("Failed to fetch audio: {}", e))?
+    {
+        file.write_all(&chunk)
+            .map_err(|e| format!("Failed to write file: {}", e))?;
+    }
+    Ok(())
+}
+
+/// Delete all but the newest TTS_CACHE_KEEP files in the TTS cache.
+fn prune_tts_cache(dir: &Path) {
+    let Ok(entries) = fs::read_dir(dir) else {
+        return;
+    };
+    let mut files: Vec<(std::time::SystemTime, PathBuf)> = entries
+        .flatten()
+        .filter_map(|e| Some((e.metadata().ok()?.modified().ok()?, e.path())))
+        .collect();
+    files.sort_by(|a, b| b.0.cmp(&a.0));
+    for (_, path) in files.into_iter().skip(TTS_CACHE_KEEP) {
+        let _ = fs::remove_file(path);
+    }
+}
+
+/// Copy a spooled result into the local cache as soon as it exists, so it can
+/// still be saved after the server's copy expires or the server restarts.
+async fn cache_tts_result(app: tauri::AppHandle, url: String) -> Result<(), String> {
+    let path = tts_cache_path(&app, &url)?;
+    let dir = path.parent().ok_or_else(|| "Invalid cache path".to_string())?;
+    fs::create_dir_all(dir).map_err(|e| e.to_string())?;
+    prune_tts_cache(dir);
+    // Written under a temporary name, so a half-downloaded file is never used
+    let part = path.with_extension("part");
+    match download_to(&url, &part).await {
+        Ok(()) => fs::rename(&part, &path).map_err(|e| e.to_string()),
+        Err(e) => {
+            let _ = fs::remove_file(&part);
+            Err(e)
+        }
+    }
+}
+
 #[tauri::command]
 pub async fn tts_speak(
+    app: tauri::AppHandle,
     state: State<'_, Mutex<TtsState>>,
     text: String,
     engine: Option<String>,
@@ -581,14 +658,16 @@ pub async fn tts_speak(
 
     let engine_name = engine.unwrap_or_else(|| "chattts".to_string());
 
-    let mut payload = serde_json::json!({ "text": text, "engine": engine_name });
+    // Ask the server to spool the result to disk; we get back a URL that the
+    // audio element can stream and seek with Range requests.
+    let mut payload =
+        serde_json::json!({ "text": text, "engine": engine_name, "spool": true });
     if let Some(vp) = voice_path {
         payload["voice_path"] = serde_json::Value::String(vp);
     }
 
-    let client = reqwest::Client::new();
-    let resp = client
-        .post("http://127.0.0.1:9966/tts")
+    let resp = tts_client()
+        .post(format!("{}/tts", TTS_SERVER_URL))
         .json(&payload)
         .timeout(std::time::Duration::from_secs(300))
         .send()
@@ -612,6 +691,14 @@ pub async fn tts_speak(
         }
     }
 
+    if let Some(url) = body["url"].as_str() {
+        // The server only keeps results for a while; keep our own copy for
+        // tts_save_audio while the audio element streams from the server.
+        let url = format!("{}{}", TTS_SERVER_URL, url);
+        tauri::async_runtime::spawn(cache_tts_result(app, url.clone()));
+        return Ok(url);
+    }
+
     let audio_b64 = body["audio"]
         .as_str()
         .ok_or("No audio field in TTS response")?;
@@ -628,12 +715,54 @@ pub async fn tts_speak(
     Ok(format!("data:{};base64,{}", mime, audio_b64))
 }
 
+/// Open the native save dialog for an audio file with the given extension.
+fn pick_audio_save_path(
+    app: &tauri::AppHandle,
+    ext: &str,
+    filter_name: &str,
+) -> Result<PathBuf, String> {
+    use tauri_plugin_dialog::DialogExt;
+
+    let file_path = app
+        .dialog()
+        .file()
+        .add_filter(filter_name, &[ext])
+        .set_file_name(&format!("tts_audio.{}", ext))
+        .blocking_save_file();
+
+    match file_path {
+        Some(path) => path
+            .as_path()
+            .map(Path::to_path_buf)
+            .ok_or_else(|| "Invalid save path".to_string()),
+        None => Err("Save cancelled".to_string()),
+    }
+}
+
 #[tauri::command]
 pub async fn tts_save_audio(
     app: tauri::AppHandle,
     audio_data_uri: String,
 ) -> Result<String, String> {
-    use tauri_plugin_dialog::DialogExt;
+    // Spooled result on the TTS server: copy the local cache of it, or
+    // stream it from the server if it isn't cached (yet)
+    if audio_data_uri.starts_with(TTS_SERVER_URL) {
+        let (ext, filter_name) = if audio_data_uri.ends_with(".mp3") {
+            ("mp3", "MP3 Audio")
+        } else {
+            ("wav", "WAV Audio")
+        };
+        let path = pick_audio_save_path(&app, ext, filter_name)?;
+
+        let cached = tts_cache_path(&app, &audio_data_uri).ok().filter(|p| p.is_file());
+        match cached {
+            Some(cached) => {
+                fs::copy(&cached, &path).map_err(|e| format!("Failed to write file: {}", e))?;
+            }
+            None => download_to(&audio_data_uri, &path).await?,
+        }
+        return Ok(path.to_string_lossy().to_string());
+    }
 
     // Detect format from data URI prefix and strip it
     let (b64, ext, filter_name) = if audio_data_uri.starts_with("data:audio/mpeg;base64,") {
@@ -648,21 +777,7 @@ pub async fn tts_save_audio(
         .decode(b64)
         .map_err(|e| format!("Failed to decode audio: {}", e))?;
 
-    // Open native file save dialog
-    let file_path = app
-        .dialog()
-        .file()
-        .add_filter(filter_name, &[ext])
-        .set_file_name(&format!("tts_audio.{}", ext))
-        .blocking_save_file();
-
-    match file_path {
-        Some(path) => {
-            let p = path.as_path().ok_or("Invalid save path")?;
-            fs::write(p, &audio_bytes)
-                .map_err(|e| format!("Failed to write file: {}", e))?;
-            Ok(p.to_string_lossy().to_string())
-        }
-        None => Err("Save cancelled".to_string()),
-    }
+    let path = pick_audio_save_path(&app, ext, filter_name)?;
+    fs::write(&path, &audio_bytes).map_err(|e| format!("Failed to write file: {}", e))?;
+    Ok(path.to_string_lossy().to_string())
 }
@@ -2,6 +2,8 @@ import { useState, useRef, useCallback, useEffect } from "react";
 import { invoke } from "@tauri-apps/api/core";
 import type { TtsStatus, TtsEngine } from "../types";
 
+const TTS_EVENTS_URL = "http://127.0.0.1:9966/events";
+
 export function useTts() {
   const [status, setStatus] = useState<TtsStatus>("stopped");
   const [isSpeaking, setIsSpeaking] = useState(false);
@@ -12,19 +14,30 @@ export function useTts() {
   const [voicePath, setVoicePath] = useState<string | null>(null);
   const audioRef = useRef<HTMLAudioElement | null>(null);
   const pollingRef = useRef<ReturnType<typeof setInterval> | null>(null);
+  const eventsRef = useRef<EventSource | null>(null);
+
+  const stopWatching = useCallback(() => {
+    if (pollingRef.current) {
+      clearInterval(pollingRef.current);
+      pollingRef.current = null;
+    }
+    if (eventsRef.current) {
+      eventsRef.current.close();
+      eventsRef.current = null;
+    }
+  }, []);
 
   const startServer = useCallback(async () => {
     setError(null);
     try {
       await invoke("tts_start");
       setStatus("starting");
-      pollingRef.current = setInterval(async () => {
+      const checkStatus = async () => {
         try {
           const s = await invoke<string>("tts_status");
           setStatus(s as TtsStatus);
           if (s === "ready" || s === "error") {
-            if (pollingRef.current) clearInterval(pollingRef.current);
-            pollingRef.current = null;
+            stopWatching();
             if (s === "error") {
               setError("TTS server failed to start");
             }
@@ -32,19 +45,24 @@ export function useTts() {
         } catch {
           // Ignore polling errors
         }
-      }, 2000);
+      };
+      // The server pushes its state as soon as /events connects, so readiness
+      // is picked up immediately; polling remains as a fallback.
+      const events = new EventSource(TTS_EVENTS_URL);
+      events.addEventListener("state", () => {
+        checkStatus();
+      });
+      eventsRef.current = events;
+      pollingRef.current = setInterval(checkStatus, 2000);
     } catch (err) {
       console.error("Failed to start TTS server:", err);
       setStatus("error");
       setError(String(err));
     }
-  }, []);
+  }, [stopWatching]);
 
   const stopServer = useCallback(async () => {
-    if (pollingRef.current) {
-      clearInterval(pollingRef.current);
-      pollingRef.current = null;
-    }
+    stopWatching();
     try {
       await invoke("tts_stop");
     } catch {
@@ -57,7 +75,7 @@ export function useTts() {
       audioRef.current = null;
     }
     setIsPlaying(false);
-  }, []);
+  }, [stopWatching]);
 
   const pickVoice = useCallback(async () => {
     const { open } = await import("@tauri-apps/plugin-dialog");
@@ -154,10 +172,8 @@ export function useTts() {
   const clearError = useCallback(() => setError(null), []);
 
   useEffect(() => {
-    return () => {
-      if (pollingRef.current) clearInterval(pollingRef.current);
-    };
-  }, []);
+    return stopWatching;
+  }, [stopWatching]);
 
   return {
     status,